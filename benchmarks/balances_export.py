@@ -0,0 +1,102 @@
+"""
+Micro-benchmark of the balances export: the former row-by-row builder (`iterrows()` and a `format_date()` call per row)
+against the column-wise `Balances._generate_balances_df()`.
+
+The former builder takes minutes for large exports, so it is measured on the first `--former-rows` transactions (where
+both outputs are also compared) and its time for `--rows` transactions is extrapolated.
+
+Usage:
+    python benchmarks/balances_export.py --rows 1000000 --former-rows 50000
+"""
+import argparse
+
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from poktbot.telegram.rbac.atomic.balances import Balances
+from poktbot.utils.formatting import format_date
+
+
+CURRENCY = "eur"
+CURRENCY_ALIAS = "Euro"
+TIMEZONE = "Europe/Madrid"
+DATE_FORMAT = "%d/%m/%Y %H:%M:%S %z"
+
+
+def build_transactions(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    amount = rng.integers(1, 20000, rows) * 0.0001
+
+    return pd.DataFrame({
+        "wallet": pd.Categorical([f"{i:040x}" for i in rng.integers(0, 1000, rows)]),
+        "hash": [f"{i:064X}" for i in range(rows)],
+        "type": pd.Categorical(["claim"] * rows),
+        "chain_id": pd.Categorical(rng.choice(["Ethereum", "Polygon", "Gnosis Chain", ""], rows)),
+        "height": np.arange(rows),
+        "time": pd.date_range("2021-01-01", periods=rows, freq="31s", tz="UTC"),
+        "amount": amount,
+        "confirmed": True,
+        f"amount_price_{CURRENCY}": amount * rng.uniform(0.05, 2.5, rows),
+    })
+
+
+def generate_balances_df_rows(transactions_df, currency, currency_alias, timezone, date_format):
+    # Former implementation of `Balances._generate_balances_df`
+    columns = ["Type", "Buy Amount", "Buy Cur.", "Sell Amount", "Sell Cur.", "Fee Amount (optional)",
+               "Fee Cur. (optional)", "Exchange (optional)", "Trade Group (optional)", "Comment (optional)",
+               "Date", "Tx-ID", f"Buy Amount {currency_alias}", "Wallet", "Chain_id", "Confirmed"]
+    content = []
+
+    for row_index, row_content in transactions_df.iterrows():
+        content.append([
+            "Minning",
+            str(row_content["amount"]).replace(".", ","),
+            "POKT", "", "", "", "", "Pocket", "", "",
+            format_date(row_content["time"], timezone=timezone, date_format=date_format),
+            row_content["hash"],
+            str(row_content[f"amount_price_{currency}"]).replace(".", ","),
+            row_content["wallet"],
+            row_content["chain_id"],
+            row_content["confirmed"],
+        ])
+
+    return pd.DataFrame(content, columns=columns)
+
+
+def measure(func):
+    start = timer()
+    result = func()
+    return (timer() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--former-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    transactions_df = build_transactions(args.rows)
+    former_df = transactions_df.iloc[:args.former_rows]
+
+    rows_elapsed, rows_balances_df = measure(lambda: generate_balances_df_rows(former_df, CURRENCY, CURRENCY_ALIAS,
+                                                                               TIMEZONE, DATE_FORMAT))
+    columns_elapsed, columns_balances_df = measure(lambda: Balances._generate_balances_df(
+        former_df, CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT))
+
+    pd.testing.assert_frame_equal(rows_balances_df, columns_balances_df, check_dtype=False, check_categorical=False)
+
+    print(f"{former_df.shape[0]} rows: row builder {rows_elapsed:10.2f} ms; "
+          f"column-wise builder {columns_elapsed:8.2f} ms (x{rows_elapsed / columns_elapsed:.0f})")
+
+    full_elapsed, _ = measure(lambda: Balances._generate_balances_df(transactions_df, CURRENCY, CURRENCY_ALIAS,
+                                                                     TIMEZONE, DATE_FORMAT))
+    extrapolated_elapsed = rows_elapsed * args.rows / former_df.shape[0]
+
+    print(f"{args.rows} rows: row builder ~{extrapolated_elapsed:10.2f} ms (extrapolated); "
+          f"column-wise builder {full_elapsed:8.2f} ms (x{extrapolated_elapsed / full_elapsed:.0f})")
+
+
+if __name__ == "__main__":
+    main()
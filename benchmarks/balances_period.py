@@ -0,0 +1,87 @@
+"""
+Benchmark of the balances exports limited to a period (for example, a fiscal year) of a long history: the former full
+scan (a mask over the time of every transaction) against the time-sorted index of `RelayDB`, and the size of the
+exported file against the whole history export.
+
+Usage:
+    python benchmarks/balances_period.py --nodes 20 --rows 2000000 --year 2022
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from timeit import default_timer as timer
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from balances_export import CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT
+from balances_streaming import build_relay_db
+from poktbot.storage.relay_db import RelayDB
+from poktbot.telegram.rbac.atomic.balances import Balances
+
+
+def scan_transactions(relay_db, start, end):
+    # Former implementation of the date range filter of `RelayDB.iter_transactions`
+    for wallet in sorted(relay_db.keys()):
+        transactions_df = relay_db[wallet]["transactions"]
+        yield transactions_df[RelayDB._transactions_mask(transactions_df, start, end, types=["claim"])]
+
+
+def indexed_transactions(relay_db, start, end):
+    yield from relay_db.iter_transactions(wallets=sorted(relay_db.keys()), start=start, end=end, types=["claim"])
+
+
+def measure(func, repeat=5):
+    elapsed = []
+
+    for _ in range(repeat):
+        start = timer()
+        result = func()
+        elapsed.append(timer() - start)
+
+    return min(elapsed) * 1000, result
+
+
+def export_size(relay_db, start, end):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Balances._export_balances(relay_db, list(relay_db.keys()), os.path.join(tmp_dir, "balances.csv"), "csv",
+                                         CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT, decimal_separator=",",
+                                         chunk_size=50000, gzip_size=None, start=start, end=end)
+        return os.path.getsize(path) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--year", type=int, default=2021)
+    args = parser.parse_args()
+
+    relay_db = build_relay_db(args.nodes, args.rows)
+    start, end = Balances._parse_period(str(args.year), timezone=TIMEZONE)
+
+    # The indexes are built once per chunk of each node (and kept while the chunk is stored)
+    index_elapsed, _ = measure(lambda: [relay_db._time_indexes_of(wallet, relay_db[wallet]["transactions"])
+                                        for wallet in relay_db.keys()], repeat=1)
+
+    scan_elapsed, scan_rows = measure(lambda: sum(df.shape[0] for df in scan_transactions(relay_db, start, end)))
+    indexed_elapsed, indexed_rows = measure(lambda: sum(df.shape[0] for df in indexed_transactions(relay_db, start,
+                                                                                                   end)))
+
+    assert scan_rows == indexed_rows
+
+    history = pd.concat([relay_db[wallet]["transactions"]["time"] for wallet in relay_db.keys()])
+
+    print(f"{args.rows} rows ({history.min()} - {history.max()}), year {args.year}: {indexed_rows} rows")
+    print(f"  full scan {scan_elapsed:9.2f} ms | time index {indexed_elapsed:9.2f} ms "
+          f"(x{scan_elapsed / indexed_elapsed:.1f}; index built once in {index_elapsed:.2f} ms)")
+
+    print(f"  CSV file: whole history {export_size(relay_db, None, None):8.1f} MB | "
+          f"year {args.year} {export_size(relay_db, start, end):8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark of the peak memory of the balances exports: the former exports (the whole balances dataframe and the whole
+file built in memory) against the streamed `Balances._export_balances()`.
+
+Histories of `--nodes` nodes are generated for each of the `--rows` total sizes, and the peak memory allocated by each
+export is measured with tracemalloc (numpy and pandas buffers included).
+
+Usage:
+    python benchmarks/balances_streaming.py --nodes 20 --rows 100000 400000 --format csv
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from io import BytesIO
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from balances_export import build_transactions, CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT
+from poktbot.storage.relay_db import RelayDB
+from poktbot.telegram.rbac.atomic.balances import Balances
+from poktbot.utils.formatting import df_to_xlsx
+
+
+def build_relay_db(nodes, rows):
+    transactions_df = build_transactions(rows)
+    transactions_df["wallet"] = [f"{i % nodes:040x}" for i in range(rows)]
+    relay_db = RelayDB()
+
+    for wallet, node_transactions_df in transactions_df.groupby("wallet"):
+        relay_db[wallet] = {"transactions": node_transactions_df.reset_index(drop=True)}
+
+    return relay_db
+
+
+def export_in_memory(relay_db, file_format):
+    # Former implementation of `Balances.send_csv` and `Balances.send_xlsx`
+    transactions_df = relay_db.query_transactions(wallets=list(relay_db.keys()), types=["claim"])
+    balances_df = Balances._generate_balances_df(transactions_df, CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT)
+
+    with BytesIO() as b:
+        if file_format == "xlsx":
+            df_to_xlsx(balances_df, b, sheet_name="Balances")
+        else:
+            balances_df.to_csv(b)
+
+        return len(b.getvalue())
+
+
+def export_streamed(relay_db, file_format, chunk_size):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Balances._export_balances(relay_db, list(relay_db.keys()),
+                                         os.path.join(tmp_dir, f"balances.{file_format}"), file_format,
+                                         CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT, decimal_separator=",",
+                                         chunk_size=chunk_size, gzip_size=None)
+        return os.path.getsize(path)
+
+
+def measure(func):
+    # tracemalloc slows down allocations, so the time is measured in a separate run
+    start = timer()
+    size = func()
+    elapsed = timer() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed * 1000, peak / 1024 ** 2, size / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 400000])
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        relay_db = build_relay_db(args.nodes, rows)
+
+        memory_elapsed, memory_peak, memory_size = measure(lambda: export_in_memory(relay_db, args.format))
+        streamed_elapsed, streamed_peak, streamed_size = measure(lambda: export_streamed(relay_db, args.format,
+                                                                                         args.chunk_size))
+
+        print(f"{rows:8d} rows ({args.format}): in memory {memory_elapsed:9.0f} ms, peak {memory_peak:7.1f} MB "
+              f"({memory_size:.1f} MB file) | streamed {streamed_elapsed:9.0f} ms, peak {streamed_peak:7.1f} MB "
+              f"({streamed_size:.1f} MB file)")
+
+
+if __name__ == "__main__":
+    main()
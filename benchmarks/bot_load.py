@@ -0,0 +1,103 @@
+"""
+Load test of the bot event loop: concurrent users opening the menu while other users request stats, with the stats
+rendered inline in the event loop (former behaviour) or offloaded to the `ActionWorkers` pools.
+
+Menu requests are simulated as light coroutines arriving every `--menu-interval` seconds, and stats requests compute
+and render the stats of `--nodes` nodes (without cache). The latency of each request is measured from its arrival to
+its completion.
+
+Usage:
+    python benchmarks/bot_load.py --nodes 1000 --stats-users 4 --menu-users 20 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fleet_stats import build_rollups, CURRENCY
+from poktbot.stats import FleetStats
+from poktbot.telegram.rbac.atomic.stats import Stats
+from poktbot.telegram.workers import ActionWorkers
+
+
+LAST_DAYS_COUNT = 15
+
+
+async def menu_user(latencies, deadline, interval):
+    while timer() < deadline:
+        await asyncio.sleep(random.uniform(0, 2 * interval))
+        start = timer()
+
+        # A menu request only awaits telegram (simulated) and builds a few buttons
+        await asyncio.sleep(0)
+        [f"button {i}" for i in range(20)]
+
+        latencies.append(timer() - start)
+
+
+async def stats_user(latencies, deadline, rollups, workers):
+    while timer() < deadline:
+        start = timer()
+
+        if workers is None:
+            Stats._render_stats(rollups, CURRENCY, LAST_DAYS_COUNT)
+        else:
+            await workers.run("stats", Stats._render_stats, rollups, CURRENCY, LAST_DAYS_COUNT, process=True)
+
+        latencies.append(timer() - start)
+        await asyncio.sleep(random.uniform(0, 0.5))
+
+
+async def load_test(rollups, workers, stats_users, menu_users, menu_interval, duration):
+    menu_latencies = []
+    stats_latencies = []
+    deadline = timer() + duration
+
+    await asyncio.gather(*([menu_user(menu_latencies, deadline, menu_interval) for _ in range(menu_users)] +
+                           [stats_user(stats_latencies, deadline, rollups, workers) for _ in range(stats_users)]))
+
+    return np.asarray(menu_latencies) * 1000, np.asarray(stats_latencies) * 1000
+
+
+def report(name, menu_latencies, stats_latencies):
+    print(f"{name:10s} menu: {len(menu_latencies):5d} requests; p50 {np.percentile(menu_latencies, 50):8.2f} ms; "
+          f"p99 {np.percentile(menu_latencies, 99):8.2f} ms | stats: {len(stats_latencies):3d} requests; "
+          f"p50 {np.percentile(stats_latencies, 50):8.2f} ms; p99 {np.percentile(stats_latencies, 99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--stats-users", type=int, default=4)
+    parser.add_argument("--menu-users", type=int, default=20)
+    parser.add_argument("--menu-interval", type=float, default=0.1)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--stats-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    rollups = FleetStats.concat_rollups(build_rollups(args.nodes, args.days))
+    workers = ActionWorkers(max_threads=4, max_processes=args.processes,
+                            action_concurrency={"stats": args.stats_concurrency})
+
+    # Worker processes are spawned (and import pandas/matplotlib) once, before measuring
+    asyncio.run(workers.run("stats", Stats._render_stats, None, CURRENCY, LAST_DAYS_COUNT, process=True))
+
+    for name, action_workers in [("inline", None), ("offloaded", workers)]:
+        menu_latencies, stats_latencies = asyncio.run(load_test(rollups, action_workers, args.stats_users,
+                                                                args.menu_users, args.menu_interval, args.duration))
+        report(name, menu_latencies, stats_latencies)
+
+    workers.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark of the bulk operations of the joblib RelayDB (WAL mode) while the DB is read from other threads: the former
+bulk operation (the whole DB copied into an auxiliary RelayDB, the records mutated in place and the DB lock held during
+the whole operation) against the `RelayDBTransaction` (copy-on-write records, swapped at once when it ends).
+
+A database of `--nodes` nodes is generated. Then, `--cycles` store cycles append claims to `--changed` nodes, while a
+reader thread checks that every record it reads is consistent (its "last_height" matches its transactions), and a
+locker thread measures how long it waits for the DB lock (as the WAL flusher and single-key writes do).
+
+Usage:
+    python benchmarks/bulk_op_snapshot.py --nodes 5000 --changed 50 --cycles 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from relaydb_wal import build_transactions
+
+
+def store_node(db, wallet):
+    node_db_persistence = db[wallet]
+    node_db_persistence["transactions"] = pd.concat([node_db_persistence["transactions"],
+                                                     build_transactions(wallet, 1, 3)])
+    # Some work between the mutations of the record (as building the daily rollups)
+    time.sleep(0.001)
+    node_db_persistence["last_height"] = node_db_persistence["transactions"].shape[0]
+    db[wallet] = node_db_persistence
+
+
+def former_cycle(relay_db, changed):
+    # Former bulk operation: the whole DB is copied and its records are mutated in place, holding the DB lock
+    aux_rdb = dict(relay_db)
+
+    with relay_db._lock:
+        for wallet in changed:
+            store_node(aux_rdb, wallet)
+
+        relay_db.update({wallet: aux_rdb[wallet] for wallet in changed})
+
+    relay_db._commit(list(changed))
+
+
+def transaction_cycle(relay_db, changed):
+    with relay_db.bulk_op() as db:
+        for wallet in changed:
+            store_node(db, wallet)
+
+
+def reader(relay_db, wallets, stop, stats):
+    rng = np.random.default_rng(0)
+
+    while not stop.is_set():
+        node_db_persistence = relay_db[wallets[rng.integers(len(wallets))]]
+        transactions_df = node_db_persistence["transactions"]
+        stats["reads"] += 1
+        stats["inconsistent"] += int(node_db_persistence["last_height"] != transactions_df.shape[0])
+
+
+def locker(relay_db, stop, stats):
+    while not stop.is_set():
+        start = timer()
+
+        with relay_db._lock:
+            stats["max_wait"] = max(stats["max_wait"], timer() - start)
+
+        time.sleep(0.001)
+
+
+def run(tmp_dir, cycle, args):
+    from poktbot.config import get_config
+    from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+
+    config_path = os.path.join(tmp_dir, f"config_{cycle.__name__}.yaml")
+
+    with open(config_path, "w") as f:
+        yaml.dump({"TELEGRAM_API": {"api_id": 0, "api_hash": "", "bot_token": ""},
+                   "SERVER": {"database_wal": True, "database_wal_max_mutations": args.cycles * 2,
+                              "database_wal_flush_interval": 3600}}, f)
+
+    get_config(config_path)
+
+    relay_db = RelayDBjl(os.path.join(tmp_dir, f"transactions_{cycle.__name__}.db"))
+    wallets = [f"{i:040x}" for i in range(args.nodes)]
+
+    with relay_db.bulk_op() as db:
+        for wallet in wallets:
+            transactions_df = build_transactions(wallet, args.days, 4)
+            db[wallet] = {"transactions": transactions_df, "last_height": transactions_df.shape[0], "in_staking": 1}
+
+    stop = threading.Event()
+    stats = {"reads": 0, "inconsistent": 0, "max_wait": 0}
+    threads = [threading.Thread(target=reader, args=(relay_db, wallets[:args.changed], stop, stats)),
+               threading.Thread(target=locker, args=(relay_db, stop, stats))]
+
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+
+    for i in range(args.cycles):
+        start = timer()
+        cycle(relay_db, wallets[:args.changed])
+        latencies.append(timer() - start)
+
+    stop.set()
+
+    for thread in threads:
+        thread.join()
+
+    return np.asarray(latencies) * 1000, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--changed", type=int, default=50)
+    parser.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for cycle in [former_cycle, transaction_cycle]:
+            latencies, stats = run(tmp_dir, cycle, args)
+            print(f"{cycle.__name__:17s}: per-cycle p50 {np.percentile(latencies, 50):8.2f} ms | DB lock max wait "
+                  f"{stats['max_wait'] * 1000:8.2f} ms | {stats['inconsistent']} inconsistent reads out of "
+                  f"{stats['reads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the appends of new transactions to the history of a node: the former concatenation (every cycle copies the
+whole history to append the new transactions) against the `ChunkedTable` (every cycle adds the new transactions as a
+chunk, and only the trailing chunks are consolidated once there are too many).
+
+A history of `--rows` transactions is appended `--cycles` cycles of `--new` transactions (a year of hourly cycles by
+default). It reports the time per cycle and the rows copied overall, and the time to build the DataFrame view of the
+resulting table.
+
+Usage:
+    python benchmarks/chunked_append.py --rows 1000000 --cycles 8760 --new 20
+"""
+import argparse
+import os
+import sys
+
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_transactions import build_transactions
+from poktbot.storage import chunked
+from poktbot.storage.chunked import ChunkedTable
+from poktbot.storage.compact import concat_tables, encode_transactions
+
+
+WALLET = f"{0:040x}"
+
+
+def former_appends(history_df, cycles_df, new):
+    stored_df = history_df
+    copied_rows = 0
+    start = timer()
+
+    for offset in range(0, cycles_df.shape[0], new):
+        stored_df = concat_tables([stored_df, cycles_df.iloc[offset:offset + new]])
+        copied_rows += stored_df.shape[0]
+
+    return stored_df, timer() - start, copied_rows
+
+
+def chunked_appends(history_df, cycles_df, new):
+    table = ChunkedTable([history_df])
+    copied_rows = 0
+    former_concat_tables = chunked.concat_tables
+
+    # Rows copied by the consolidations are counted
+    def counting_concat_tables(tables):
+        nonlocal copied_rows
+        copied_rows += sum(table.shape[0] for table in tables)
+        return former_concat_tables(tables)
+
+    chunked.concat_tables = counting_concat_tables
+    start = timer()
+
+    try:
+        for offset in range(0, cycles_df.shape[0], new):
+            table = table.append(cycles_df.iloc[offset:offset + new])
+    finally:
+        elapsed = timer() - start
+        chunked.concat_tables = former_concat_tables
+
+    return table, elapsed, copied_rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--cycles", type=int, default=8760)
+    parser.add_argument("--new", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    history_df = encode_transactions(build_transactions(WALLET, args.rows, rng))
+    cycles_df = encode_transactions(build_transactions(WALLET, args.cycles * args.new, rng))
+
+    chunked_table, chunked_elapsed, chunked_copied = chunked_appends(history_df, cycles_df, args.new)
+
+    start = timer()
+    chunked_df = chunked_table.frame
+    view_elapsed = timer() - start
+
+    former_df, former_elapsed, former_copied = former_appends(history_df, cycles_df, args.new)
+
+    assert former_df["hash"].tolist() == chunked_df["hash"].tolist()
+
+    print(f"former : {former_elapsed / args.cycles * 1000:8.3f} ms/cycle | {former_copied / 1e6:10.1f} M rows copied")
+    print(f"chunked: {chunked_elapsed / args.cycles * 1000:8.3f} ms/cycle | {chunked_copied / 1e6:10.1f} M rows copied "
+          f"| {len(chunked_table.chunks)} chunks; DataFrame view built in {view_elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
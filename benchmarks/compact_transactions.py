@@ -0,0 +1,113 @@
+"""
+Benchmark of the representation of the stored transactions: the former frames (wallet, hash, type, chain_id and memo as
+object strings, as they end up after concatenating the transactions of each cycle, and int64 heights) against the
+compact representation of `encode_transactions()`.
+
+A history of `--rows` transactions of `--nodes` nodes is generated. For each representation, it measures the memory
+allocated by the frames (with tracemalloc, so that shared strings are counted once), the size of their joblib lz4 dump (as the joblib RelayDB stores them), and the time to dump, load and read
+them back decoded through `RelayDB.iter_transactions()`.
+
+Usage:
+    python benchmarks/compact_transactions.py --nodes 20 --rows 2000000
+"""
+import argparse
+import binascii
+import os
+import tempfile
+import tracemalloc
+
+from timeit import default_timer as timer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from poktbot.storage.compact import encode_transactions
+from poktbot.storage.relay_db import RelayDB
+
+
+CHAINS = ["Ethereum", "Polygon", "Gnosis Chain", "Harmony Shard 0", "Solana"]
+
+
+def build_transactions(wallet, rows, rng):
+    hashes = np.frombuffer(binascii.hexlify(rng.bytes(32 * rows)).upper(), dtype="S64").astype(str).astype(object)
+    amount = rng.integers(1, 20000, rows) * 0.0001
+
+    # Former frames: every column built by `parse_rewards()` as object strings after concatenating the cycles
+    return pd.DataFrame({
+        "wallet": np.full(rows, wallet, dtype=object),
+        "hash": hashes,
+        "type": np.full(rows, "claim", dtype=object),
+        "chain_id": np.array(CHAINS, dtype=object)[rng.integers(0, len(CHAINS), rows)],
+        "height": np.arange(rows, dtype="int64"),
+        "time": pd.date_range("2021-01-01", periods=rows, freq="31s", tz="UTC"),
+        "amount": amount,
+        "memo": np.full(rows, "", dtype=object),
+        "confirmed": True,
+        "in_staking": np.ones(rows, dtype="int8"),
+        "price_eur": rng.uniform(0.05, 2.5, rows),
+        "amount_price_eur": amount * rng.uniform(0.05, 2.5, rows),
+    })
+
+
+def measure(name, relay_db, memory, tmp_dir, rows):
+    filename = os.path.join(tmp_dir, f"{name}.jl")
+    start = timer()
+    joblib.dump(dict(relay_db), filename, compress=("lz4", 1))
+    dump_elapsed = timer() - start
+    file_size = os.path.getsize(filename)
+
+    start = timer()
+    joblib.load(filename)
+    load_elapsed = timer() - start
+
+    start = timer()
+    read_rows = sum(chunk_df.shape[0] for chunk_df in relay_db.iter_transactions(chunk_size=50000))
+    read_elapsed = timer() - start
+    assert read_rows == rows
+
+    print(f"{name:7s}: memory {memory / 1024 ** 2:8.1f} MB ({memory / rows:6.1f} B/row) | lz4 dump "
+          f"{file_size / 1024 ** 2:8.1f} MB | dump {dump_elapsed:6.2f} s; load {load_elapsed:6.2f} s; "
+          f"decoded read {read_elapsed:6.2f} s")
+
+    return file_size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=2000000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows_per_node = args.rows // args.nodes
+    former_db = RelayDB()
+    compact_db = RelayDB()
+
+    tracemalloc.start()
+
+    for i in range(args.nodes):
+        wallet = f"{i:040x}"
+        former_db[wallet] = {"transactions": build_transactions(wallet, rows_per_node, rng)}
+
+    former_memory = tracemalloc.get_traced_memory()[0]
+    start = timer()
+
+    for wallet, record in former_db.items():
+        compact_db[wallet] = {"transactions": encode_transactions(record["transactions"])}
+
+    encode_elapsed = timer() - start
+    compact_memory = tracemalloc.get_traced_memory()[0] - former_memory
+    tracemalloc.stop()
+
+    print(f"Encoded {rows_per_node * args.nodes} transactions in {encode_elapsed:.2f} s")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        former_size = measure("former", former_db, former_memory, tmp_dir, rows_per_node * args.nodes)
+        compact_size = measure("compact", compact_db, compact_memory, tmp_dir, rows_per_node * args.nodes)
+
+    print(f"Savings: memory x{former_memory / compact_memory:.2f}; file size x{former_size / compact_size:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Micro-benchmark of the fleet stats: the former per-node computation (daily totals of each node, concatenated and
+filtered again for each figure) against the single-pass `FleetStats`.
+
+Daily rollups of `--nodes` nodes with up to `--days` days of history are generated in memory, so only the computation
+of the stats is measured.
+
+Usage:
+    python benchmarks/fleet_stats.py --nodes 1000 --days 365
+"""
+import argparse
+
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from poktbot.stats import FleetStats
+from poktbot.storage.daily_rollup import daily_totals
+
+
+CURRENCY = "eur"
+TODAY = pd.Timestamp("2022-06-15")
+
+
+def build_rollups(nodes, days, seed=0):
+    rng = np.random.default_rng(seed)
+    fiat_column = f"amount_price_{CURRENCY}"
+    rollups = {}
+
+    for i in range(nodes):
+        node_days = int(rng.integers(1, days + 1))
+        index = pd.date_range(end=TODAY, periods=node_days, freq="D", name="date")
+        claims = rng.integers(0, 30, node_days)
+
+        # Some days without transactions, and some nodes out of staking for a while
+        keep = rng.random(node_days) > 0.1
+        keep[0] = True
+        staking = np.ones(node_days, dtype=bool)
+
+        if node_days > 20 and rng.random() < 0.2:
+            unstake_day = int(rng.integers(1, node_days - 10))
+            staking[unstake_day:unstake_day + 10] = False
+
+        amount = np.where(staking, claims * rng.uniform(5, 15), 0)
+
+        rollups[f"{i:040x}"] = pd.DataFrame({
+            "amount": amount,
+            fiat_column: amount * rng.uniform(0.1, 2),
+            "claims": np.where(staking, claims, 0),
+            "staking": staking,
+            "last_staking": staking,
+        }, index=index)[keep]
+
+    return rollups
+
+
+def stats_per_node(rollups):
+    # Former implementation of `Stats._compute_all_nodes_totals_df` and `Stats._generate_rewards_stats_df`
+    total_amounts = []
+    total_amounts_eur = []
+
+    for node_address, rollup_df in rollups.items():
+        total_amount, total_amount_eur = daily_totals(rollup_df, CURRENCY, until=TODAY)
+        total_amount.name = node_address
+        total_amount_eur.name = node_address
+        total_amounts.append(total_amount)
+        total_amounts_eur.append(total_amount_eur)
+
+    total_amounts_df = pd.concat(total_amounts, axis=1)
+    total_amounts_eur_df = pd.concat(total_amounts_eur, axis=1)
+
+    today = TODAY.date()
+    this_month = TODAY.to_period("M").to_timestamp()
+    figures = {}
+
+    for suffix, amounts_df in [("", total_amounts_df), ("_fiat", total_amounts_eur_df)]:
+        avg_day = amounts_df.mean(axis=1, skipna=True)
+        total_day = amounts_df.sum(axis=1, skipna=True)
+        avg_day.index = pd.DatetimeIndex(avg_day.index)
+        total_day.index = pd.DatetimeIndex(total_day.index)
+
+        avg_day_filtered = avg_day[avg_day.index < this_month]
+        this_month_filter = (avg_day.index.year == today.year) & (avg_day.index.month == today.month)
+
+        figures[f"avg_daily{suffix}"] = avg_day[avg_day.index.date < today].mean(skipna=True)
+        figures[f"avg_today{suffix}"] = avg_day.reindex([TODAY]).fillna(0).iloc[0]
+        figures[f"avg_monthly{suffix}"] = avg_day_filtered.groupby(
+            [avg_day_filtered.index.year, avg_day_filtered.index.month]).sum().mean()
+        figures[f"avg_this_month{suffix}"] = avg_day[this_month_filter].sum()
+        figures[f"total_today{suffix}"] = total_day.reindex([TODAY]).fillna(0).iloc[0]
+        figures[f"total_this_month{suffix}"] = total_day[this_month_filter].fillna(0).sum()
+        figures[f"total_alltime{suffix}"] = total_day.fillna(0).sum()
+
+    return pd.Series(figures)
+
+
+def stats_fleet(rollups):
+    return FleetStats(currency=CURRENCY).compute(rollups, today=TODAY).summary
+
+
+def measure(func, repeat):
+    elapsed = []
+
+    for _ in range(repeat):
+        start = timer()
+        result = func()
+        elapsed.append(timer() - start)
+
+    return min(elapsed) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for nodes in sorted({10, 100, args.nodes}):
+        rollups = build_rollups(nodes, args.days)
+
+        per_node_elapsed, per_node_summary = measure(lambda: stats_per_node(rollups), args.repeat)
+        fleet_elapsed, fleet_summary = measure(lambda: stats_fleet(rollups), args.repeat)
+
+        pd.testing.assert_series_equal(per_node_summary, fleet_summary[per_node_summary.index])
+
+        print(f"{nodes:5d} nodes, up to {args.days} days: per node {per_node_elapsed:9.2f} ms; "
+              f"single pass {fleet_elapsed:8.2f} ms (x{per_node_elapsed / fleet_elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
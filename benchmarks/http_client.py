@@ -0,0 +1,107 @@
+"""
+Benchmark of an update cycle of the rewards fetchers with bare `requests.get()` calls against the shared `HTTPClient`.
+
+A local stub server answers a rewards-like JSON payload. As it is plain HTTP on localhost, the cost of a TCP+TLS
+handshake against a remote host is emulated with a delay of `--handshake-ms` on each new connection. Each cycle
+requests `--nodes` URLs with `--pool-size` concurrent workers, as the nodes observer does.
+
+Usage:
+    python benchmarks/http_client.py --nodes 300 --pool-size 8 --handshake-ms 30
+"""
+import argparse
+import gzip
+import json
+import os
+import socket
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from timeit import default_timer as timer
+
+import requests
+import yaml
+
+
+def build_handler(handshake_ms, payload):
+    compressed_payload = gzip.compress(payload)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Event().wait(handshake_ms / 1000)
+
+        def do_GET(self):
+            gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+            body = compressed_payload if gzipped else payload
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def run_cycle(get, urls, pool_size):
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        start = timer()
+        responses = list(pool.map(get, urls))
+        elapsed = timer() - start
+
+    assert all(response.status_code == 200 for response in responses)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=300)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=30)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = json.dumps({"data": [{"transactions": [{"hash": f"{i:064X}", "height": i, "num_relays": 1000,
+                                                      "pokt_per_relay": 0.0001, "chain_id": "0021",
+                                                      "time": "2022-02-12T06:29:06.492000", "is_confirmed": True}
+                                                     for i in range(100)]}]}).encode("utf-8")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), build_handler(args.handshake_ms, payload))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/node/{i:040x}/rewards" for i in range(args.nodes)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from poktbot.config import get_config
+        from poktbot.api.http_client import HTTPClient
+
+        config_path = os.path.join(tmp_dir, "config.yaml")
+
+        with open(config_path, "w") as f:
+            yaml.dump({"TELEGRAM_API": {"api_id": 0, "api_hash": "", "bot_token": ""}}, f)
+
+        get_config(config_path)
+        http_client = HTTPClient(pool_size=args.pool_size)
+
+        for name, get in [("requests.get()", requests.get), ("HTTPClient    ", http_client.get)]:
+            elapsed = [run_cycle(get, urls, args.pool_size) for _ in range(args.cycles)]
+            print(f"{name}: {args.nodes} requests per cycle; first cycle {elapsed[0] * 1000:8.1f} ms; "
+                  f"next cycles {sum(elapsed[1:]) / max(len(elapsed) - 1, 1) * 1000:8.1f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the deduplication of the transactions on ingest: the former approach (the history of the node is
+concatenated with the new transactions and deduplicated as a whole with `drop_duplicates()`) against the hash index of
+`RelayDB.drop_stored_transactions()`, which only looks up the new transactions.
+
+A history of `--rows` transactions of a node is stored, and `--cycles` cycles of `--new` transactions are ingested. Each
+cycle delivers again `--redelivered` transactions already stored (as after a rollback or a restart). Only the
+deduplication is timed: the concatenation of the new transactions is the same for both.
+
+Usage:
+    python benchmarks/ingest_dedup.py --rows 1000000 --cycles 20 --new 50 --redelivered 10
+"""
+import argparse
+import os
+import sys
+
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_transactions import build_transactions
+from poktbot.storage.compact import concat_tables, encode_transactions
+from poktbot.storage.relay_db import RelayDB
+
+
+WALLET = f"{0:040x}"
+
+
+def build_cycles(history_df, cycles, new, redelivered, rng):
+    rows = history_df.shape[0]
+    cycles_df = encode_transactions(build_transactions(WALLET, cycles * new, rng))
+    cycles_df["height"] = np.arange(rows, rows + cycles * new, dtype="int32")
+
+    # Transactions delivered again are picked from the whole history
+    return [concat_tables([history_df.iloc[np.sort(rng.choice(rows, redelivered, replace=False))],
+                           cycles_df.iloc[cycle * new:(cycle + 1) * new]])
+            for cycle in range(cycles)]
+
+
+def former_ingest(history_df, cycles):
+    stored_df = history_df
+    latencies = []
+
+    for transactions_df in cycles:
+        stored_df = concat_tables([stored_df, transactions_df])
+        start = timer()
+        stored_df = stored_df.drop_duplicates(subset="hash")
+        latencies.append(timer() - start)
+
+    return stored_df, latencies
+
+
+def indexed_ingest(history_df, cycles):
+    relay_db = RelayDB()
+    stored_df = history_df
+    latencies = []
+
+    for transactions_df in cycles:
+        start = timer()
+        new_transactions_df = relay_db.drop_stored_transactions(WALLET, stored_df, transactions_df)
+        latencies.append(timer() - start)
+        stored_df = concat_tables([stored_df, new_transactions_df])
+
+    return stored_df, latencies, relay_db._hash_indexes[WALLET]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--new", type=int, default=50)
+    parser.add_argument("--redelivered", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    history_df = encode_transactions(build_transactions(WALLET, args.rows, rng))
+    cycles = build_cycles(history_df, args.cycles, args.new, args.redelivered, rng)
+
+    former_df, former_latencies = former_ingest(history_df, cycles)
+    indexed_df, indexed_latencies, hash_index = indexed_ingest(history_df, cycles)
+
+    assert former_df.shape[0] == indexed_df.shape[0] == args.rows + args.cycles * args.new
+    assert former_df["hash"].tolist() == indexed_df["hash"].tolist()
+
+    print(f"former : first cycle {former_latencies[0] * 1000:8.1f} ms; next cycles "
+          f"{np.mean(former_latencies[1:]) * 1000:8.1f} ms")
+    print(f"indexed: first cycle {indexed_latencies[0] * 1000:8.1f} ms (index built); next cycles "
+          f"{np.mean(indexed_latencies[1:]) * 1000:8.1f} ms | index {hash_index.nbytes / 1024 ** 2:.1f} MB for "
+          f"{hash_index.rows} transactions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark of the files sent to the users: the former replies (every requester gets the stats graph and the balances
+export generated and uploaded again) against the `MediaCache` (the first reply uploads them, the rest are sent by their
+telegram reference).
+
+Telegram is simulated with a round trip of `--rtt` seconds per message and an upload bandwidth of `--bandwidth` MB/s.
+
+Usage:
+    python benchmarks/media_uploads.py --users 10 --nodes 20 --rows 400000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import types
+
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from balances_export import CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT
+from balances_streaming import build_relay_db
+from fleet_stats import build_rollups
+from poktbot.stats import FleetStats
+from poktbot.telegram.media_cache import MediaCache
+from poktbot.telegram.rbac.atomic.balances import Balances
+from poktbot.telegram.rbac.atomic.stats import Stats
+
+
+class FakeConversation:
+    """
+    Simulated telegram conversation: files are uploaded at `bandwidth` bytes per second, media are sent by reference.
+    """
+    def __init__(self, rtt, bandwidth):
+        self._rtt = rtt
+        self._bandwidth = bandwidth
+        self.uploaded_bytes = 0
+
+    async def send_file(self, file, **kwargs):
+        if isinstance(file, bytes) or isinstance(file, str):
+            size = len(file) if isinstance(file, bytes) else os.path.getsize(file)
+            self.uploaded_bytes += size
+            await asyncio.sleep(self._rtt + size / self._bandwidth)
+        else:
+            await asyncio.sleep(self._rtt)
+
+        return types.SimpleNamespace(media=object())
+
+
+def export_file(relay_db, tmp_dir):
+    return Balances._export_balances(relay_db, list(relay_db.keys()), os.path.join(tmp_dir, "balances.csv"), "csv",
+                                     CURRENCY, CURRENCY_ALIAS, TIMEZONE, DATE_FORMAT, decimal_separator=",",
+                                     chunk_size=50000, gzip_size=20 * 1024 ** 2)
+
+
+async def former_replies(conv, relay_db, graph_bytes, users):
+    latencies = []
+
+    for _ in range(users):
+        start = timer()
+        await conv.send_file(graph_bytes)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            await conv.send_file(export_file(relay_db, tmp_dir))
+
+        latencies.append(timer() - start)
+
+    return latencies
+
+
+async def cached_replies(conv, relay_db, graph_bytes, users):
+    media_cache = MediaCache(max_entries=32)
+    media_key = ("balances", 0, "balances.csv")
+    latencies = []
+
+    for _ in range(users):
+        start = timer()
+        await media_cache.send_file(conv, graph_bytes)
+
+        if await media_cache.send_cached(conv, media_key) is None:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                await media_cache.upload(conv, export_file(relay_db, tmp_dir), key=media_key)
+
+        latencies.append(timer() - start)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=400000)
+    parser.add_argument("--rtt", type=float, default=0.1)
+    parser.add_argument("--bandwidth", type=float, default=5, help="Upload bandwidth in MB/s")
+    args = parser.parse_args()
+
+    relay_db = build_relay_db(args.nodes, args.rows)
+    _, graph_bytes = Stats._render_stats(FleetStats.concat_rollups(build_rollups(args.nodes, 365)), CURRENCY, 15)
+
+    for name, replies in [("former", former_replies), ("cached", cached_replies)]:
+        conv = FakeConversation(args.rtt, args.bandwidth * 1024 ** 2)
+        latencies = asyncio.run(replies(conv, relay_db, graph_bytes, args.users))
+
+        print(f"{name:7s} {args.users} users: uploaded {conv.uploaded_bytes / 1024 ** 2:8.1f} MB | first reply "
+              f"{latencies[0] * 1000:8.0f} ms; next replies {sum(latencies[1:]) / max(len(latencies) - 1, 1) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
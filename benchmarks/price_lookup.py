@@ -0,0 +1,83 @@
+"""
+Benchmark of the price lookup of transactions: the former closest-value matrix of `CallbackStoreTransactions` against
+the binary search of `PriceLookup`, for growing numbers of transactions and hourly prices.
+
+The former implementation builds a `transactions x prices` matrix, so it is skipped for the sizes whose matrix exceeds
+`--max-matrix-mb`.
+
+Usage:
+    python benchmarks/price_lookup.py --max-matrix-mb 2048
+"""
+import argparse
+
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from poktbot.api.price.price_lookup import PriceLookup
+
+
+SIZES = [(1_000, 1_000), (5_000, 2_000), (10_000, 5_000), (50_000, 20_000), (200_000, 50_000), (1_000_000, 100_000)]
+
+
+def build_prices(size):
+    timestamps = pd.Timestamp("2022-01-01", tz="UTC").value // 10 ** 6 + np.arange(size, dtype="int64") * 3600 * 1000
+    return pd.DataFrame({"prices": np.random.rand(size)}, index=timestamps)
+
+
+def build_times(size, prices):
+    timestamps = np.sort(np.random.randint(prices.index[0], prices.index[-1], size=size))
+    return pd.Series(pd.to_datetime(timestamps, unit="ms", utc=True))
+
+
+def closest_value(datetimes, values_to_lookup):
+    # Former implementation of `CallbackStoreTransactions._get_closest_value`
+    values_to_lookup = values_to_lookup.index
+    transaction_times = (datetimes - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+    min_index = np.abs(
+        np.expand_dims(values_to_lookup, axis=0) - np.expand_dims(transaction_times, axis=1)
+    ).argmin(axis=1)
+
+    return values_to_lookup[min_index]
+
+
+def measure(func, repeat):
+    elapsed = []
+
+    for _ in range(repeat):
+        start = timer()
+        result = func()
+        elapsed.append(timer() - start)
+
+    return min(elapsed) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-matrix-mb", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for transactions_size, prices_size in SIZES:
+        prices = build_prices(prices_size)
+        times = build_times(transactions_size, prices)
+
+        lookup_elapsed, lookup_result = measure(lambda: PriceLookup(prices).lookup(times, method="nearest"),
+                                                args.repeat)
+        line = f"{transactions_size:>9} transactions x {prices_size:>7} prices: PriceLookup {lookup_elapsed:10.2f} ms"
+
+        matrix_mb = transactions_size * prices_size * 8 / 1024 ** 2
+
+        if matrix_mb <= args.max_matrix_mb:
+            matrix_elapsed, matrix_result = measure(lambda: closest_value(times, prices), args.repeat)
+            assert np.allclose(prices.loc[matrix_result, "prices"].values, lookup_result["price"].values)
+            line += f"; closest-value matrix {matrix_elapsed:10.2f} ms (x{matrix_elapsed / lookup_elapsed:.0f})"
+        else:
+            line += f"; closest-value matrix skipped ({matrix_mb:.0f} MB matrix)"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
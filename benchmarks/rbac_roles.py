@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the role resolution of every `/start` and `/menu` (`get_roles()`) and of the permission check of
+every action (`_check_preconditions()`): the former roles (layout files parsed on each instantiation, `IDS.*` params
+parsed on each check) against the layout registry and the ACL index.
+
+Usage:
+    python benchmarks/rbac_roles.py --ids 1000 --repeat 200
+"""
+import argparse
+
+from timeit import default_timer as timer
+
+import pkg_resources
+import yaml
+
+from poktbot.config import get_config
+from poktbot.telegram.rbac import get_roles
+from poktbot.telegram.rbac.composite import Admin
+from poktbot.telegram.rbac.registry import get_acl_index
+from poktbot.utils.telegram import build_layout
+
+
+class Entity:
+    def __init__(self, entity_id):
+        self.id = entity_id
+
+
+def former_get_roles(entity):
+    # Former implementation: each role parses its layout file and its IDs list (and each menu builds its buttons)
+    config = get_config()
+    roles = []
+
+    for name, key in [("sysadmin", "IDS.sysadmins_ids"), ("admin", "IDS.admins_ids"),
+                      ("investor", "IDS.investors_ids")]:
+        with open(pkg_resources.resource_filename("poktbot", f"telegram/layouts/{name}.yaml"), "r") as f:
+            layout = yaml.safe_load(f)
+
+        ids = config.get(key, [])
+        ids = ids if type(ids) is list else [ids]
+
+        if entity.id in [int(i) for i in ids if i != '']:
+            roles.append((layout, build_layout(layout["menu_main"])))
+
+    return roles
+
+
+def former_allowed(entity):
+    config = get_config()
+    ids = config.get("IDS.admins_ids", [])
+    ids = ids if type(ids) is list else [ids]
+
+    return entity.id in [int(i) for i in ids if i != '']
+
+
+def measure(func, repeat):
+    start = timer()
+
+    for _ in range(repeat):
+        func()
+
+    return (timer() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    config = get_config()
+    config["IDS.sysadmins_ids"] = list(range(0, args.ids))
+    config["IDS.admins_ids"] = list(range(args.ids, 2 * args.ids))
+    config["IDS.investors_ids"] = list(range(2 * args.ids, 3 * args.ids))
+    get_acl_index().invalidate()
+
+    # An admin close to the end of its list
+    entity = Entity(2 * args.ids - 1)
+    admin = Admin(conv=None, entity=entity)
+
+    assert [type(role) for role in get_roles(entity, conv=None)] == [Admin]
+    assert len(former_get_roles(entity)) == 1
+
+    former_roles_elapsed = measure(lambda: former_get_roles(entity), args.repeat)
+    roles_elapsed = measure(lambda: get_roles(entity, conv=None), args.repeat)
+    former_allowed_elapsed = measure(lambda: former_allowed(entity), args.repeat)
+    allowed_elapsed = measure(lambda: admin.allowed(), args.repeat)
+
+    print(f"get_roles: former {former_roles_elapsed:8.3f} ms | cached {roles_elapsed:8.3f} ms "
+          f"(x{former_roles_elapsed / roles_elapsed:.0f})")
+    print(f"allowed:   former {former_allowed_elapsed:8.3f} ms | indexed {allowed_elapsed:8.3f} ms "
+          f"(x{former_allowed_elapsed / allowed_elapsed:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the per-write latency of the joblib RelayDB with and without the write-ahead log mode.
+
+A database of `--nodes` nodes with `--days` days of claims is generated. Then, `--writes` store cycles are simulated,
+each one appending a few claims to a node inside a bulk operation, as `CallbackStoreTransactions` does.
+
+Usage:
+    python benchmarks/relaydb_wal.py --nodes 500 --days 365 --claims-per-day 4
+"""
+import argparse
+import os
+import tempfile
+
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+def build_transactions(wallet, days, claims_per_day):
+    rows = days * claims_per_day
+    return pd.DataFrame({
+        "wallet": wallet,
+        "hash": [f"{wallet}{i:024X}" for i in range(rows)],
+        "type": "claim",
+        "chain_id": "Ethereum",
+        "height": np.arange(rows),
+        "time": pd.date_range("2021-01-01", periods=rows, freq=pd.Timedelta(hours=24 / claims_per_day), tz="UTC"),
+        "amount": np.random.rand(rows) * 10,
+        "memo": "",
+        "confirmed": True,
+        "in_staking": 1,
+        "price_eur": np.random.rand(rows),
+        "amount_price_eur": np.random.rand(rows),
+    })
+
+
+def run(tmp_dir, wal, args):
+    from poktbot.config import get_config
+    from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+
+    config_path = os.path.join(tmp_dir, f"config_{wal}.yaml")
+
+    with open(config_path, "w") as f:
+        yaml.dump({"TELEGRAM_API": {"api_id": 0, "api_hash": "", "bot_token": ""},
+                   "SERVER": {"database_wal": wal, "database_wal_max_mutations": args.writes * 2}}, f)
+
+    get_config(config_path)
+
+    filename = os.path.join(tmp_dir, f"transactions_{wal}.db")
+    relay_db = RelayDBjl(filename)
+
+    with relay_db.bulk_op() as db:
+        for i in range(args.nodes):
+            wallet = f"{i:040x}"
+            db[wallet] = {"transactions": build_transactions(wallet, args.days, args.claims_per_day),
+                          "last_height": args.days * args.claims_per_day, "in_staking": 1}
+
+    latencies = []
+
+    for i in range(args.writes):
+        wallet = f"{i % args.nodes:040x}"
+        start = timer()
+
+        with relay_db.bulk_op() as db:
+            node_db_persistence = db[wallet]
+            new_transactions = build_transactions(wallet, 1, 3)
+            node_db_persistence["transactions"] = pd.concat([node_db_persistence["transactions"], new_transactions])
+            node_db_persistence["last_height"] += 3
+            db[wallet] = node_db_persistence
+
+        latencies.append(timer() - start)
+
+    return np.asarray(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--claims-per-day", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for wal in [False, True]:
+            latencies = run(tmp_dir, wal, args)
+            print(f"WAL {'on ' if wal else 'off'}: per-write latency p50 {np.percentile(latencies, 50):.2f} ms; "
+                  f"p99 {np.percentile(latencies, 99):.2f} ms; max {latencies.max():.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark of the parsing of a rewards API response: the former row-by-row parser against the columnar
+`PocketNodeTransactions.parse_rewards()`.
+
+The rewards API returns the whole history of the node on each request, so a payload of `--rows` rewards is parsed with
+`--new-rows` rewards above the last stored height, and also with every reward being new (first fetch).
+
+Usage:
+    python benchmarks/rewards_parsing.py --rows 100000 --new-rows 24
+"""
+import argparse
+import random
+
+from timeit import default_timer as timer
+
+import pandas as pd
+
+from poktbot.api.node.node_transactions import PocketNodeTransactions
+
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+CHAIN_IDS = {"0021": "Ethereum", "0027": "Gnosis Chain", "0009": "Polygon", "0004": "Binance Smart Chain"}
+
+
+def build_rewards(rows):
+    start = pd.Timestamp("2021-06-01")
+    return {"data": [{"transactions": [{
+        "hash": f"{i:064X}",
+        "height": i + 1,
+        "num_relays": random.randint(1, 20000),
+        "pokt_per_relay": 0.0001,
+        "chain_id": random.choice(list(CHAIN_IDS) + ["00FF"]),
+        "time": (start + pd.Timedelta(minutes=15 * i)).strftime(DATE_FORMAT),
+        "is_confirmed": True,
+    } for i in range(rows)]}]}
+
+
+def parse_rewards_rows(rewards, wallet, min_height, chain_ids, date_format):
+    # Former implementation of `PocketNodeTransactions._fetch_transactions`
+    rewards_parsed = []
+    for c in rewards['data']:
+        for tr in c['transactions']:
+            rewards_parsed.append({
+                "wallet": wallet,
+                "hash": tr["hash"],
+                "type": "claim",
+                "chain_id": chain_ids.get(tr["chain_id"], ''),
+                "height": tr["height"],
+                "time": pd.to_datetime(tr["time"], format=date_format),
+                "amount": tr['num_relays'] * tr['pokt_per_relay'],
+                "memo": "",
+                "confirmed": tr['is_confirmed'],
+            })
+
+    rewards_df = pd.DataFrame(rewards_parsed)
+    rewards_df = rewards_df[rewards_df['height'] > min_height]
+
+    transactions_df = rewards_df.sort_values("height").reset_index(drop=True)
+    transactions_df["in_staking"] = 1
+
+    return transactions_df
+
+
+def measure(func, repeat):
+    elapsed = []
+
+    for _ in range(repeat):
+        start = timer()
+        result = func()
+        elapsed.append(timer() - start)
+
+    return min(elapsed) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--new-rows", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rewards = build_rewards(args.rows)
+    wallet = f"{0:040x}"
+
+    for name, min_height in [(f"{args.new_rows} new rows", args.rows - args.new_rows), ("all rows new", 0)]:
+        rows_elapsed, rows_df = measure(lambda: parse_rewards_rows(rewards, wallet, min_height, CHAIN_IDS,
+                                                                   DATE_FORMAT), args.repeat)
+        columnar_elapsed, columnar_df = measure(lambda: PocketNodeTransactions.parse_rewards(
+            rewards, wallet, min_height, CHAIN_IDS, DATE_FORMAT), args.repeat)
+
+        pd.testing.assert_frame_equal(rows_df, columnar_df, check_dtype=False, check_categorical=False)
+
+        print(f"{args.rows} rows payload, {name}: row parser {rows_elapsed:10.2f} ms; "
+              f"columnar parser {columnar_elapsed:8.2f} ms (x{rows_elapsed / columnar_elapsed:.0f}); "
+              f"memory {rows_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB -> "
+              f"{columnar_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark of the store cycles of `CallbackStoreTransactions` over the joblib RelayDB, with and without the write-ahead
+log mode: the former bulk operation (every node record copied, committed and dumped on each cycle) against the dirty
+tracked one (only the nodes with new transactions are assigned, and nothing is written if there are none).
+
+A database of `--nodes` nodes with `--days` days of claims is generated. Then, `--cycles` store cycles are simulated
+for each number of changed nodes in `--changed`.
+
+Usage:
+    python benchmarks/store_cycles.py --nodes 500 --days 365 --changed 0 1 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from relaydb_wal import build_transactions
+
+
+def former_cycle(relay_db, wallets, changed):
+    from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+
+    # Former bulk operation: the whole DB is copied, every node is visited and every key is committed
+    aux_rdb = RelayDBjl(relay_db._filename, relay_db)
+
+    with relay_db._lock:
+        for wallet in wallets:
+            node_db_persistence = aux_rdb.setdefault(wallet, {})
+
+            if wallet in changed:
+                node_db_persistence["transactions"] = pd.concat([node_db_persistence["transactions"],
+                                                                 build_transactions(wallet, 1, 3)])
+
+        relay_db.update(aux_rdb)
+
+    relay_db._commit(list(aux_rdb.keys()))
+
+
+def dirty_cycle(relay_db, wallets, changed):
+    with relay_db.bulk_op() as db:
+        for wallet in changed:
+            node_db_persistence = db[wallet]
+            node_db_persistence["transactions"] = pd.concat([node_db_persistence["transactions"],
+                                                             build_transactions(wallet, 1, 3)])
+            db[wallet] = node_db_persistence
+
+
+def run(tmp_dir, wal, cycle, args):
+    from poktbot.config import get_config
+    from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+
+    config_path = os.path.join(tmp_dir, f"config_{wal}_{cycle.__name__}.yaml")
+
+    with open(config_path, "w") as f:
+        yaml.dump({"TELEGRAM_API": {"api_id": 0, "api_hash": "", "bot_token": ""},
+                   "SERVER": {"database_wal": wal,
+                              "database_wal_max_mutations": args.cycles * len(args.changed) * 2}}, f)
+
+    get_config(config_path)
+
+    relay_db = RelayDBjl(os.path.join(tmp_dir, f"transactions_{wal}_{cycle.__name__}.db"))
+    wallets = [f"{i:040x}" for i in range(args.nodes)]
+
+    with relay_db.bulk_op() as db:
+        for wallet in wallets:
+            db[wallet] = {"transactions": build_transactions(wallet, args.days, args.claims_per_day),
+                          "last_height": args.days * args.claims_per_day, "in_staking": 1}
+
+    results = {}
+
+    for changed_count in args.changed:
+        latencies = []
+
+        for i in range(args.cycles):
+            changed = set(wallets[i:i + changed_count])
+            start = timer()
+            cycle(relay_db, wallets, changed)
+            latencies.append(timer() - start)
+
+        results[changed_count] = np.asarray(latencies) * 1000
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--claims-per-day", type=int, default=4)
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--changed", type=int, nargs="+", default=[0, 1, 50])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for wal in [False, True]:
+            for cycle in [former_cycle, dirty_cycle]:
+                for changed_count, latencies in run(tmp_dir, wal, cycle, args).items():
+                    print(f"WAL {'on ' if wal else 'off'} {cycle.__name__:12s} {changed_count:4d} changed nodes: "
+                          f"per-cycle p50 {np.percentile(latencies, 50):9.2f} ms; max {latencies.max():9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark of the outbound messages of the bot: the former queue (drained once per second and sent one by one) against
+the `MessageDispatcher`, on a simulated Telegram that enforces flood limits (raising FloodWaitError).
+
+Bursts of notifications are queued from another thread to `--chats` chats (`--messages` each), and the latency of each
+message is measured from its queueing to its delivery (joined messages count as delivered with the message carrying
+them).
+
+Usage:
+    python benchmarks/telegram_dispatch.py --chats 50 --messages 3
+"""
+import argparse
+import asyncio
+import threading
+
+from collections import defaultdict, deque
+from timeit import default_timer as timer
+
+import numpy as np
+
+from telethon.errors import FloodWaitError
+
+from poktbot.telegram.dispatcher import MessageDispatcher
+
+
+class FakeTelegram:
+    """
+    Simulated Telegram: each message takes `latency` seconds, and more than `global_limit` messages per second (or
+    `chat_limit` messages per second to the same chat) are rejected with FloodWaitError.
+    """
+    def __init__(self, latency=0.03, global_limit=30, chat_limit=1):
+        self._latency = latency
+        self._global_limit = global_limit
+        self._chat_limit = chat_limit
+        self._global_sent = deque()
+        self._chat_sent = defaultdict(deque)
+        self.delivered = {}
+        self.sent = 0
+        self.floods = 0
+
+    @staticmethod
+    def _count(sent, now):
+        while len(sent) > 0 and sent[0] <= now - 1:
+            sent.popleft()
+
+        return len(sent)
+
+    async def send_message(self, entity, message):
+        await asyncio.sleep(self._latency)
+        now = timer()
+
+        if self._count(self._global_sent, now) >= self._global_limit or \
+                self._count(self._chat_sent[entity], now) >= self._chat_limit:
+            self.floods += 1
+            raise FloodWaitError(request=None, capture=1)
+
+        self._global_sent.append(now)
+        self._chat_sent[entity].append(now)
+        self.sent += 1
+
+        for line in message.split("\n\n"):
+            self.delivered[line] = now
+
+
+def queue_burst(put, chats, messages):
+    queued = {}
+
+    for message_idx in range(messages):
+        for chat in range(chats):
+            message = f"Node {chat} notification {message_idx}"
+            queued[message] = timer()
+            put(chat, message)
+
+    return queued
+
+
+async def former_bot(telegram, chats, messages, poll_interval=1):
+    # Former implementation of `TelegramBot`: a locked list drained once per second by the bot loop
+    lock = threading.Lock()
+    messages_queue = []
+
+    def send_message(entity, message):
+        with lock:
+            messages_queue.append((entity, message))
+
+    queued = {}
+    producer = threading.Thread(target=lambda: queued.update(queue_burst(send_message, chats, messages)))
+
+    # The burst arrives at a random point of the polling interval
+    await asyncio.sleep(np.random.default_rng(0).uniform(0, poll_interval))
+    producer.start()
+
+    while len(telegram.delivered) < len(queued) or producer.is_alive():
+        await asyncio.sleep(poll_interval)
+
+        with lock:
+            pending = list(messages_queue)
+            messages_queue.clear()
+
+        for entity, message in pending:
+            try:
+                await telegram.send_message(entity, message)
+            except FloodWaitError:
+                # The former bot crashed its loop here: the message is counted as lost
+                telegram.delivered[message] = None
+
+    return queued
+
+
+async def dispatcher_bot(telegram, chats, messages):
+    loop = asyncio.get_running_loop()
+    dispatcher = MessageDispatcher(telegram.send_message, global_rate=30, chat_rate=1)
+    task = asyncio.ensure_future(dispatcher.run())
+
+    queued = {}
+    producer = threading.Thread(target=lambda: queued.update(
+        queue_burst(lambda entity, message: dispatcher.put_threadsafe(loop, entity, message), chats, messages)))
+    producer.start()
+
+    while len(telegram.delivered) < len(queued) or producer.is_alive():
+        await asyncio.sleep(0.01)
+
+    task.cancel()
+    return queued
+
+
+def report(name, telegram, queued):
+    latencies = np.asarray([telegram.delivered[message] - queued_time for message, queued_time in queued.items()
+                            if telegram.delivered.get(message) is not None]) * 1000
+    lost = len(queued) - latencies.shape[0]
+
+    print(f"{name:10s} {len(queued)} messages in {telegram.sent:4d} sends | latency p50 {np.percentile(latencies, 50):8.1f} ms; "
+          f"first {latencies.min():8.1f} ms; p99 {np.percentile(latencies, 99):8.1f} ms | flood errors {telegram.floods:4d}; "
+          f"lost {lost}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, bot in [("former", former_bot), ("dispatcher", dispatcher_bot)]:
+        telegram = FakeTelegram()
+        queued = asyncio.run(bot(telegram, args.chats, args.messages))
+        report(name, telegram, queued)
+
+
+if __name__ == "__main__":
+    main()
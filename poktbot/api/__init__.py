@@ -1,4 +1,7 @@
+from poktbot.api.http_client import HTTPClient, get_http_client
 from poktbot.api.observer import Observer
+from poktbot.api.observer_async import AsyncObserver
+from poktbot.api.scheduler import Scheduler, get_scheduler
 from poktbot.config import get_config
 
 _OBSERVERS = {}
@@ -18,7 +21,14 @@ def get_observer(observer_name, update_interval=None):
 
     :param update_interval:
         Interval in seconds for the observer to update. If not provided, by default it will load the
-        update interval defined by the config file parameter `CONF.global_periodic_time`.
+        interval of the observer in the config file parameter `CONF.schedules`, or the update interval defined by the
+        config file parameter `CONF.global_periodic_time`.
+
+    The pool size of the observer (number of children updated concurrently) is loaded from the config file parameter
+    `CONF.observer_pool_sizes`, which maps observer names to pool sizes (1 if the observer is not listed).
+
+    If the config file parameter `CONF.async_observers` is enabled, observers are `AsyncObserver` objects, which update
+    their children concurrently from a single asyncio event loop.
 
     :returns:
         Observer of the given name.
@@ -29,12 +39,16 @@ def get_observer(observer_name, update_interval=None):
         config = get_config()
 
         if update_interval is None:
-            update_interval = config['CONF.global_periodic_time']
+            schedule = (config.get("CONF.schedules", None) or {}).get(observer_name, None) or {}
+            update_interval = schedule.get("interval", config['CONF.global_periodic_time'])
 
-        obs = Observer([], update_interval=update_interval, observer_name=observer_name)
+        pool_size = int((config.get("CONF.observer_pool_sizes", None) or {}).get(observer_name, 1))
+        observer_proto = AsyncObserver if str(config.get("CONF.async_observers", False)).lower() == "true" \
+            else Observer
+        obs = observer_proto([], update_interval=update_interval, observer_name=observer_name, pool_size=pool_size)
         _OBSERVERS[observer_name] = obs
 
     return obs
 
 
-__all__ = ["get_observer", "Observer"]
+__all__ = ["get_observer", "get_http_client", "get_scheduler", "HTTPClient", "Observer", "AsyncObserver", "Scheduler"]
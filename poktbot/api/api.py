@@ -1,13 +1,34 @@
+import asyncio
+
 import pandas as pd
 
 
 class API:
     def __init__(self):
         self._last_update = None
+        self._new_rows = 0
 
     def update(self):
         self._last_update = pd.Timestamp.now("UTC")
+        self._new_rows = 0
+
+    async def update_async(self):
+        """
+        Asyncio version of `update()`, invoked by an `AsyncObserver`.
+
+        By default, the blocking `update()` is executed in the default executor of the loop. Fetchers override this
+        method to request their APIs without blocking the loop.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.update)
 
     @property
     def last_update(self):
         return self._last_update
+
+    @property
+    def new_rows(self):
+        """
+        Number of new rows (transactions, prices, ...) fetched by the last update. Elements whose last update fetched
+        nothing new (or failed) report 0, so that consumers can skip them.
+        """
+        return self._new_rows
@@ -0,0 +1,170 @@
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPClient:
+    """
+    HTTP client shared by the API fetchers.
+
+    A keep-alive `requests.Session` is kept for each host, so that connections (and their TCP+TLS handshakes) are
+    reused between requests and update cycles. The connection pool of each session is sized to the concurrency of the
+    observers (see `ensure_pool_size()`), and every request is sent with the connect/read timeouts of the config
+    parameters `CONF.http_connect_timeout` and `CONF.http_read_timeout`.
+
+    Concurrent requests to the same host are capped by the config parameter `CONF.http_max_concurrency_per_host`, so
+    that observers with large pools don't hammer a single API.
+
+    Usage example:
+
+        >>> http_client = get_http_client()
+        >>> response = http_client.get("https://pypi.org/pypi/poktbot/json")
+    """
+    def __init__(self, connect_timeout=None, read_timeout=None, pool_size=1, max_concurrency_per_host=None):
+        """
+        Constructor of the class.
+
+        :param connect_timeout:
+            Timeout in seconds to establish a connection. By default, it is loaded from config param
+            CONF.http_connect_timeout.
+
+        :param read_timeout:
+            Timeout in seconds to wait for the server response. By default, it is loaded from config param
+            CONF.http_read_timeout.
+
+        :param pool_size:
+            Initial number of connections kept alive for each host.
+
+        :param max_concurrency_per_host:
+            Maximum number of requests in flight for each host. By default, it is loaded from config param
+            CONF.http_max_concurrency_per_host. None for no limit.
+        """
+        config = get_config()
+
+        self._logger = poktbot_logging.get_logger("HTTPClient")
+        self._connect_timeout = float(connect_timeout or config.get("CONF.http_connect_timeout", 10))
+        self._read_timeout = float(read_timeout or config.get("CONF.http_read_timeout", 60))
+        self._pool_size = pool_size
+        self._max_concurrency_per_host = max_concurrency_per_host or \
+            config.get("CONF.http_max_concurrency_per_host", None)
+        self._sessions = {}
+        self._semaphores = {}
+        self._lock = Lock()
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    @property
+    def timeout(self):
+        return self._connect_timeout, self._read_timeout
+
+    def _mount_adapter(self, session):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    def _build_session(self):
+        session = requests.Session()
+        session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self._mount_adapter(session)
+
+        return session
+
+    def ensure_pool_size(self, pool_size):
+        """
+        Grows the connection pool of each host to, at least, the given size. Observers invoke this method with their
+        pool size, so that each of their concurrent requests can keep its connection alive.
+        """
+        with self._lock:
+            if pool_size <= self._pool_size:
+                return
+
+            self._pool_size = pool_size
+
+            # Requests in progress keep using the former adapter, which is released once they finish
+            for session in self._sessions.values():
+                self._mount_adapter(session)
+
+        self._logger.debug(f"Connection pool size set to {pool_size}")
+
+    @staticmethod
+    def _host(url):
+        url_parts = urlsplit(url)
+        return url_parts.scheme, url_parts.netloc
+
+    def session(self, url):
+        """
+        Retrieves the session for the host of the given URL.
+        """
+        host = self._host(url)
+
+        with self._lock:
+            session = self._sessions.get(host)
+
+            if session is None:
+                session = self._build_session()
+                self._sessions[host] = session
+
+        return session
+
+    def _semaphore(self, url):
+        if self._max_concurrency_per_host is None:
+            return None
+
+        host = self._host(url)
+
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+
+            if semaphore is None:
+                semaphore = BoundedSemaphore(int(self._max_concurrency_per_host))
+                self._semaphores[host] = semaphore
+
+        return semaphore
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(url)
+        semaphore = self._semaphore(url)
+
+        if semaphore is None:
+            return session.request(method, url, **kwargs)
+
+        with semaphore:
+            return session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+
+            self._sessions = {}
+
+
+_http_client = None
+_http_client_lock = Lock()
+
+
+def get_http_client():
+    """
+    Global singleton for retrieving the HTTP client shared by the API fetchers.
+
+    :return:
+        The HTTPClient object
+    """
+    global _http_client
+
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HTTPClient()
+
+    return _http_client
@@ -0,0 +1,117 @@
+from threading import Lock
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+import asyncio
+import json
+
+import aiohttp
+
+
+class AsyncResponse:
+    """
+    Response of an `AsyncHTTPClient` request. The body is already read, so that the connection is released back to the
+    pool as soon as the request finishes.
+    """
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncHTTPClient:
+    """
+    Asyncio HTTP client shared by the API fetchers when they are updated by an `AsyncObserver`.
+
+    An `aiohttp.ClientSession` is kept for each event loop, with keep-alive connections capped to
+    `CONF.http_max_concurrency_per_host` per host, and with the connect/read timeouts of the config parameters
+    `CONF.http_connect_timeout` and `CONF.http_read_timeout`.
+
+    Usage example:
+
+        >>> http_client = get_async_http_client()
+        >>> response = await http_client.get("https://pypi.org/pypi/poktbot/json")
+    """
+    def __init__(self, connect_timeout=None, read_timeout=None, max_concurrency_per_host=None):
+        """
+        Constructor of the class.
+
+        :param connect_timeout:
+            Timeout in seconds to establish a connection. By default, it is loaded from config param
+            CONF.http_connect_timeout.
+
+        :param read_timeout:
+            Timeout in seconds to wait for the server response. By default, it is loaded from config param
+            CONF.http_read_timeout.
+
+        :param max_concurrency_per_host:
+            Maximum number of requests in flight for each host. By default, it is loaded from config param
+            CONF.http_max_concurrency_per_host. None for no limit.
+        """
+        config = get_config()
+
+        self._logger = poktbot_logging.get_logger("AsyncHTTPClient")
+        self._connect_timeout = float(connect_timeout or config.get("CONF.http_connect_timeout", 10))
+        self._read_timeout = float(read_timeout or config.get("CONF.http_read_timeout", 60))
+        self._max_concurrency_per_host = max_concurrency_per_host or \
+            config.get("CONF.http_max_concurrency_per_host", None)
+        self._sessions = {}
+        self._lock = Lock()
+
+    def session(self):
+        """
+        Retrieves the session for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            session = self._sessions.get(loop)
+
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(limit=0, limit_per_host=int(self._max_concurrency_per_host or 0))
+                timeout = aiohttp.ClientTimeout(sock_connect=self._connect_timeout, sock_read=self._read_timeout)
+                session = aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                                headers={"Accept-Encoding": "gzip, deflate"})
+                self._sessions[loop] = session
+
+        return session
+
+    async def request(self, method, url, **kwargs):
+        async with self.session().request(method, url, **kwargs) as response:
+            return AsyncResponse(response.status, await response.text())
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def close(self):
+        """
+        Closes the session of the running event loop.
+        """
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+
+        if session is not None:
+            await session.close()
+
+
+_async_http_client = None
+_async_http_client_lock = Lock()
+
+
+def get_async_http_client():
+    """
+    Global singleton for retrieving the asyncio HTTP client shared by the API fetchers.
+
+    :return:
+        The AsyncHTTPClient object
+    """
+    global _async_http_client
+
+    with _async_http_client_lock:
+        if _async_http_client is None:
+            _async_http_client = AsyncHTTPClient()
+
+    return _async_http_client
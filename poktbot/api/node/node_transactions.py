@@ -1,11 +1,16 @@
 
+from poktbot.api.http_client import get_http_client
+from poktbot.api.http_client_async import get_async_http_client
 from poktbot.api.node.node import PocketNode
 from poktbot.config import get_config
 from poktbot.log import poktbot_logging
 from poktbot.storage import get_relaydb
-from poktbot.utils.decorators import retry
+from poktbot.utils.decorators import retry, retry_async
 from poktbot.utils.formatting import format_date
 
+import aiohttp
+import asyncio
+import numpy as np
 import pandas as pd
 import requests
 
@@ -77,6 +82,7 @@ class PocketNodeTransactions(PocketNode):
     def rollback(self, height):
         self._last_height = height
         self._transactions_df = None
+        self._new_rows = 0
 
     @retry(max_attempts=3, attempt_interval=5, on_exception=requests.exceptions.RequestException)
     @retry(max_attempts=3, attempt_interval=5, on_exception=LookupError)
@@ -86,7 +92,23 @@ class PocketNodeTransactions(PocketNode):
         The rewards are the claim/proof transactions.
         """
         self._logger.debug(f"{self} Requesting rewards transactions")
-        response = requests.get(self._api_url)
+        response = get_http_client().get(self._api_url)
+
+        if response.status_code != 200:
+            raise LookupError(f"Not 200 status code; error: {response.status_code}")
+
+        self._logger.debug(f"{self} Response: {response.status_code}")
+
+        return response.json()
+
+    @retry_async(max_attempts=3, attempt_interval=5, on_exception=(aiohttp.ClientError, asyncio.TimeoutError))
+    @retry_async(max_attempts=3, attempt_interval=5, on_exception=LookupError)
+    async def _request_rewards_async(self):
+        """
+        Asyncio version of `_request_rewards()`.
+        """
+        self._logger.debug(f"{self} Requesting rewards transactions")
+        response = await get_async_http_client().get(self._api_url)
 
         if response.status_code != 200:
             raise LookupError(f"Not 200 status code; error: {response.status_code}")
@@ -106,60 +128,93 @@ class PocketNodeTransactions(PocketNode):
         This method overrides the .transactions dataframe with the last snapshot, which won't include the transactions
         from the previous snapshot.
         """
-        config = get_config()
-
-        date_format = config["SERVER.api_date_format"]
-
         self._logger.info(f"{self} Requesting transactions...")
 
         # 1. Request rewards transactions
         rewards = self._request_rewards()
 
         # 2. Give format to the rewards
-        rewards_parsed = []
-        for c in rewards['data']:
-            for tr in c['transactions']:
-                rewards_parsed.append(self._build_transaction_reward_element(tr, date_format))
+        self._process_rewards(rewards)
 
-        rewards_df = pd.DataFrame(rewards_parsed)
+    async def _fetch_transactions_async(self):
+        """
+        Asyncio version of `_fetch_transactions()`.
+        """
+        self._logger.info(f"{self} Requesting transactions...")
+        rewards = await self._request_rewards_async()
+        self._process_rewards(rewards)
 
-        # The rewards API does not filter by height, so we must ensure we don't pick rewards already stored
-        rewards_df = rewards_df[rewards_df['height'] > self._last_height]
+    def _process_rewards(self, rewards):
+        """
+        Builds the transactions DataFrame from the rewards retrieved from the API, keeping only the new ones.
+        """
+        config = get_config()
 
-        # We merge the rewards_df into the transactions_df
-        transactions_df = rewards_df.sort_values("height").reset_index(drop=True)
-        transactions_df["in_staking"] = 1  # Temporal workaround
+        # The rewards API does not filter by height, so we must ensure we don't pick rewards already stored
+        transactions_df = self.parse_rewards(rewards, wallet=self.address, min_height=self._last_height,
+                                             chain_ids=self._chain_ids, date_format=config["SERVER.api_date_format"])
 
         self._logger.info(f"{self} Found {transactions_df.shape[0]} new transactions")
 
         with self._lock:
             self._transactions_df = transactions_df
+            self._new_rows = transactions_df.shape[0]
 
             if transactions_df.shape[0] > 0:
                 self._last_height = transactions_df['height'].max()
                 self._in_staking = transactions_df['in_staking'].iloc[-1]
 
-    def _build_transaction_reward_element(self, transaction_reward_raw_item, date_format):
-        """
-        Builds the transaction element from the transaction item retrieved from rewards API
+    @staticmethod
+    def parse_rewards(rewards, wallet, min_height, chain_ids, date_format):
         """
-        transaction_time = pd.to_datetime(transaction_reward_raw_item["time"], format=date_format)
+        Builds the transactions DataFrame from the rewards retrieved from the API.
+
+        Rewards are parsed by columns: rows are filtered by height before parsing the rest of the fields, times are
+        converted in a single call and chain ids are mapped through their categories.
+
+        :param rewards:
+            JSON of the rewards API.
 
-        amount = transaction_reward_raw_item['num_relays'] * transaction_reward_raw_item['pokt_per_relay']
+        :param wallet:
+            Address of the node of the rewards.
 
-        transaction = {
-            "wallet": self.address,
-            "hash": transaction_reward_raw_item["hash"],
-            "type": "claim",
-            "chain_id": self._chain_ids.get(transaction_reward_raw_item["chain_id"], ''),
-            "height": transaction_reward_raw_item["height"],
-            "time": transaction_time,
-            "amount": amount,
+        :param min_height:
+            Only rewards above this height are kept.
+
+        :param chain_ids:
+            Dictionary mapping chain ids to chain names.
+
+        :param date_format:
+            Format of the times of the rewards.
+
+        :returns:
+            A pd.DataFrame sorted by height with the columns: wallet, hash, type, chain_id, height, time, amount, memo,
+            confirmed and in_staking.
+        """
+        items = [item for c in rewards['data'] for item in c['transactions']]
+
+        heights = np.fromiter((item["height"] for item in items), dtype="int64", count=len(items))
+        items = [items[i] for i in np.flatnonzero(heights > min_height)]
+        heights = heights[heights > min_height]
+
+        chain_id_codes = pd.Categorical([item["chain_id"] for item in items])
+        chain_names = np.array([chain_ids.get(chain_id, '') for chain_id in chain_id_codes.categories], dtype=object)
+
+        transactions_df = pd.DataFrame({
+            "wallet": wallet,
+            "hash": np.array([item["hash"] for item in items], dtype=object),
+            "type": pd.Categorical(["claim"] * len(items)),
+            "chain_id": pd.Categorical(chain_names[chain_id_codes.codes] if len(items) > 0 else []),
+            "height": heights,
+            "time": pd.to_datetime([item["time"] for item in items], format=date_format),
+            "amount": np.fromiter((item['num_relays'] for item in items), dtype="float64", count=len(items)) *
+                      np.fromiter((item['pokt_per_relay'] for item in items), dtype="float64", count=len(items)),
             "memo": "",
-            "confirmed": transaction_reward_raw_item['is_confirmed'],
-        }
+            "confirmed": np.fromiter((item['is_confirmed'] for item in items), dtype="bool", count=len(items)),
+            "in_staking": np.ones(len(items), dtype="int8"),  # Temporal workaround
+        })
 
-        return transaction
+        return transactions_df.sort_values("height", kind="stable").reset_index(drop=True)
 
     @property
     def transactions(self):
@@ -176,6 +231,13 @@ class PocketNodeTransactions(PocketNode):
         super().update()
         self._fetch_transactions()
 
+    async def update_async(self):
+        """
+        Asyncio version of `update()`.
+        """
+        super().update()
+        await self._fetch_transactions_async()
+
     def __str__(self):
         return f"[poktbot - Node {self.address} (transactions); last update: {format_date(self.last_update)}; " \
                f"transactions count: {self._transactions_df.shape[0] if self._transactions_df is not None else 0}; " \
@@ -1,9 +1,12 @@
 from threading import Lock, Thread, Event
 
 from poktbot.api.api import API
+from poktbot.api.http_client import get_http_client
 from poktbot.log import poktbot_logging
 
 from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+from datetime import timedelta
 import concurrent.futures
 
 
@@ -35,7 +38,7 @@ class Observer(API):
 
         :param pool_size:
             Size of the internal pool. If there are many elements to be observed, their observation can be parallelized
-            in a thread pool.
+            in a thread pool. The connection pool of the shared HTTP client is grown to this size.
 
         """
         super().__init__()
@@ -45,9 +48,12 @@ class Observer(API):
         self._elements = elements
         self._update_interval = float(update_interval)
         self._lock = Lock()
+        self._update_lock = Lock()
         self._event = Event()
 
+        self._pool_size = pool_size
         self._pool = ThreadPoolExecutor(max_workers=pool_size)
+        get_http_client().ensure_pool_size(pool_size)
         self._thread = None
         self._name = observer_name
 
@@ -119,10 +125,42 @@ class Observer(API):
     def __contains__(self, item):
         return item in self._elements
 
+    @property
+    def deltas(self):
+        """
+        Number of new rows fetched by each observed element in the last update.
+
+        :returns:
+            Dictionary {element: new rows}.
+        """
+        with self._lock:
+            elements = list(self._elements)
+
+        return {element: getattr(element, "new_rows", 0) for element in elements}
+
+    @property
+    def new_rows(self):
+        return sum(self.deltas.values())
+
     def update(self):
+        # Updates of the same observer never overlap (for example, a scheduled update and one forced by a callback)
+        with self._update_lock:
+            self._update()
+
+    def _update(self):
         self._logger.debug(f"{self} Update triggered")
+        start = timer()
+
         promises = [self._pool.submit(element.update) for element in self._elements]
         concurrent.futures.wait(promises)
+        end = timer()
+
+        self._logger.info(f"{self} Updated {len(promises)} elements with a pool of size {self._pool_size}; "
+                          f"{self.new_rows} new rows ({timedelta(seconds=end - start)} s)")
+
+        if end - start > self._update_interval:
+            self._logger.warning(f"{self} The update took longer than the update interval ({self._update_interval} s). "
+                                 f"Consider increasing its pool size in CONF.observer_pool_sizes.")
 
         for callback in self._callbacks:
             callback()
@@ -0,0 +1,108 @@
+from poktbot.api.http_client_async import get_async_http_client
+from poktbot.api.observer import Observer
+
+from timeit import default_timer as timer
+from datetime import timedelta
+import asyncio
+
+
+class AsyncObserver(Observer):
+    """
+    Observer that updates its elements concurrently from a single asyncio event loop.
+
+    Elements are updated through their `update_async()` method, so fetchers request their APIs without an OS thread per
+    request in flight. The number of elements updated at once is limited by the pool size. Nested async observers are
+    updated in the same event loop.
+
+    Callbacks are blocking (they store into databases), so they are executed in the default executor of the loop.
+    """
+    def __init__(self, elements, update_interval, on_update=None, observer_name=None, pool_size=1):
+        """
+        Constructor of the class.
+
+        In order to start the observer, call `start()` method. This will trigger updates of every contained API element
+        on each `update_interval` seconds.
+
+        :param elements:
+            List of API objects to observe.
+
+        :param update_interval:
+            Time in seconds of the interval to update. This triggers the `update_async()` method of each of the
+            contained elements.
+
+        :param on_update:
+            Function callback for the reception of the update notification (after has been updated).
+
+        :param observer_name:
+            Name of the observer. Important for logging purposes.
+
+        :param pool_size:
+            Maximum number of elements updated concurrently.
+        """
+        super().__init__(elements, update_interval, on_update=on_update, observer_name=observer_name,
+                         pool_size=pool_size)
+        self._loop = asyncio.new_event_loop()
+
+    def _thread_func(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._observe())
+        self._loop.run_until_complete(get_async_http_client().close())
+
+        with self._lock:
+            self._thread = None
+
+    async def _observe(self):
+        if self._initial_observation:
+            await self.update_async()
+
+        while not self._stop:
+            # The event is a threading.Event (set by other threads), so it is waited for out of the loop
+            triggered = await self._loop.run_in_executor(None, self._event.wait, self._update_interval)
+
+            if not self._stop:
+                await self.update_async()
+
+            if triggered:
+                self._event.clear()
+
+    def update(self):
+        """
+        Blocking update, for observers that are not started (or that are nested in a threaded observer).
+        """
+        with self._update_lock:
+            if self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self.update_async(), self._loop).result()
+            else:
+                self._loop.run_until_complete(self.update_async())
+
+    async def _update_element(self, semaphore, element):
+        async with semaphore:
+            try:
+                await element.update_async()
+            except Exception as e:
+                self._logger.error(f"{self} Exception {str(e)} updating {element}")
+
+    async def update_async(self):
+        self._logger.debug(f"{self} Update triggered")
+        start = timer()
+
+        semaphore = asyncio.Semaphore(self._pool_size)
+
+        with self._lock:
+            elements = list(self._elements)
+
+        await asyncio.gather(*[self._update_element(semaphore, element) for element in elements])
+        end = timer()
+
+        self._logger.info(f"{self} Updated {len(elements)} elements with up to {self._pool_size} concurrent updates; "
+                          f"{self.new_rows} new rows ({timedelta(seconds=end - start)} s)")
+
+        if end - start > self._update_interval:
+            self._logger.warning(f"{self} The update took longer than the update interval ({self._update_interval} s). "
+                                 f"Consider increasing its pool size in CONF.observer_pool_sizes.")
+
+        for callback in self._callbacks:
+            await asyncio.get_running_loop().run_in_executor(None, callback)
+
+    def __str__(self):
+        return f"[AsyncObserver {self._name}: {len(self._elements)} elements observed]"
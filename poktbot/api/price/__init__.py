@@ -1,4 +1,5 @@
 from poktbot.api.price.coingecko import Coingecko
+from poktbot.api.price.price_lookup import PriceLookup
 
 
-__all__ = ["Coingecko"]
+__all__ = ["Coingecko", "PriceLookup"]
@@ -1,12 +1,13 @@
 from poktbot.api.api import API
+from poktbot.api.http_client import get_http_client
+from poktbot.api.http_client_async import get_async_http_client
 from poktbot.config import get_config
 
-import requests
 import pandas as pd
 
 from poktbot.log import poktbot_logging
 from poktbot.storage import get_relaydb
-from poktbot.utils.decorators import retry
+from poktbot.utils.decorators import retry, retry_async
 from poktbot.utils.formatting import format_date
 
 HOUR = 3600 * 1000
@@ -79,6 +80,26 @@ class Coingecko(API):
                - 3 columns: prices, market_caps and total_volumes
                - 1 index: date_timestamp
         """
+        url = self._build_prices_url(start=start, end=end, cryptocurrency=cryptocurrency, currency=currency)
+        response = get_http_client().get(url)
+
+        return self._parse_prices(response, index_as_dates=index_as_dates)
+
+    @retry_async(attempt_interval=0.5)
+    async def fetch_prices_async(self, start=None, end=None, cryptocurrency="pocket-network", currency=None,
+                                 index_as_dates=False):
+        """
+        Asyncio version of `fetch_prices()`.
+        """
+        url = self._build_prices_url(start=start, end=end, cryptocurrency=cryptocurrency, currency=currency)
+        response = await get_async_http_client().get(url)
+
+        return self._parse_prices(response, index_as_dates=index_as_dates)
+
+    def _build_prices_url(self, start, end, cryptocurrency, currency):
+        """
+        Builds the URL of the API to fetch the prices between the specified range.
+        """
         config = get_config()
 
         if type(end) is str:
@@ -109,8 +130,12 @@ class Coingecko(API):
         self._logger.info(f"{self} Requesting prices from {start} to {end} in currency {currency}")
         self._logger.debug(f"{self} Requesting to url {url}")
 
-        response = requests.get(url)
+        return url
 
+    def _parse_prices(self, response, index_as_dates=False):
+        """
+        Builds the prices DataFrame from the response of the API.
+        """
         self._logger.debug(f"{self} Response: {response.status_code}; text: {response.text[:100]} (truncated to 100 characters)")
 
         if response.status_code != 200:
@@ -134,8 +159,22 @@ class Coingecko(API):
         super().update()
 
         new_prices = self.fetch_prices(start=self.start_date if self.start_date is not None else "2022-01-01")
+        self._append_prices(new_prices)
+
+    async def update_async(self):
+        """
+        Asyncio version of `update()`.
+        """
+        super().update()
+
+        new_prices = await self.fetch_prices_async(start=self.start_date if self.start_date is not None
+                                                   else "2022-01-01")
+        self._append_prices(new_prices)
+
+    def _append_prices(self, new_prices):
         self._logger.info(f"Retrieved {new_prices.shape[0] if new_prices is not None else 0} new prices from API.")
         self._prices = pd.concat([self._prices, new_prices], axis=0) if new_prices is not None else new_prices
+        self._new_rows = new_prices.shape[0] if new_prices is not None else 0
 
         max_date = self.prices.index.max()
 
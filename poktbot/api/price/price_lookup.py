@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+class PriceLookup:
+    """
+    Looks up the prices at given times in a price series indexed by timestamps in milliseconds, like
+    `Coingecko.prices`.
+
+    Lookups are solved with a binary search over the sorted timestamps, so their cost is O(N log M) for N times and M
+    prices. The following methods are supported:
+
+        - "nearest": price of the closest timestamp.
+        - "backward": price of the closest timestamp before (or at) the time.
+        - "interpolate": price linearly interpolated between the timestamps surrounding the time.
+
+    Usage example:
+
+        >>> price_lookup = PriceLookup(coingecko.prices, tolerance=3600 * 1000)
+        >>> price_lookup.lookup(transactions_df["time"], method="nearest")
+              price  distance  within_tolerance
+        0  1.745302    581207              True
+        1  1.706441   6211421             False
+        ...
+    """
+    METHODS = ["nearest", "backward", "interpolate"]
+
+    def __init__(self, prices, column="prices", tolerance=None):
+        """
+        Constructor of the class.
+
+        :param prices:
+            Series/DataFrame of prices indexed by timestamps in milliseconds.
+
+        :param column:
+            Column of the prices DataFrame to look up. Ignored if `prices` is a Series.
+
+        :param tolerance:
+            Maximum distance in milliseconds between a time and the closest price timestamp. Lookups further away are
+            flagged as not within the tolerance. None for no limit.
+        """
+        if isinstance(prices, pd.DataFrame):
+            prices = prices[column]
+
+        prices = prices.dropna()
+
+        if not prices.index.is_monotonic_increasing:
+            prices = prices.sort_index(kind="stable")
+
+        self._timestamps = np.asarray(prices.index, dtype="int64")
+        self._values = np.asarray(prices.values, dtype="float64")
+        self._tolerance = tolerance
+
+    def __len__(self):
+        return self._timestamps.shape[0]
+
+    @staticmethod
+    def to_timestamps(times):
+        """
+        Converts UTC datetimes into timestamps in milliseconds.
+        """
+        times = pd.Series(times)
+
+        if pd.api.types.is_datetime64_any_dtype(times):
+            times = (times - pd.Timestamp(0, tz=getattr(times.dt, "tz", None))) // pd.Timedelta(milliseconds=1)
+
+        return np.asarray(times, dtype="int64")
+
+    def lookup(self, times, method="nearest"):
+        """
+        Looks up the prices for the given times.
+
+        :param times:
+            List/array/series of UTC datetimes (or timestamps in milliseconds) to look up.
+
+        :param method:
+            Lookup method: "nearest", "backward" or "interpolate".
+
+        :returns:
+            A pd.DataFrame with one row per given time (in the same order) with the columns:
+               - price: the price found. NaN if there is no price for the time.
+               - distance: distance in milliseconds to the closest price timestamp used.
+               - within_tolerance: True if a price was found within the tolerance.
+        """
+        if method not in self.METHODS:
+            raise KeyError(f"Price lookup method {method} not available. Available methods: {self.METHODS}")
+
+        index = times.index if isinstance(times, pd.Series) else None
+        timestamps = self.to_timestamps(times)
+        size = self._timestamps.shape[0]
+
+        if size == 0:
+            prices = np.full(timestamps.shape[0], np.nan)
+            distances = np.full(timestamps.shape[0], np.iinfo("int64").max)
+
+        elif method == "backward":
+            positions = np.searchsorted(self._timestamps, timestamps, side="right") - 1
+            found = positions >= 0
+            positions = np.clip(positions, 0, size - 1)
+
+            prices = np.where(found, self._values[positions], np.nan)
+            distances = np.where(found, timestamps - self._timestamps[positions], np.iinfo("int64").max)
+
+        else:
+            right = np.clip(np.searchsorted(self._timestamps, timestamps, side="left"), 0, size - 1)
+            left = np.clip(right - 1, 0, size - 1)
+
+            left_distances = np.abs(timestamps - self._timestamps[left])
+            right_distances = np.abs(self._timestamps[right] - timestamps)
+            nearest = np.where(left_distances <= right_distances, left, right)
+            distances = np.minimum(left_distances, right_distances)
+
+            if method == "nearest":
+                prices = self._values[nearest]
+            else:
+                prices = np.interp(timestamps, self._timestamps, self._values)
+
+        within_tolerance = ~np.isnan(prices)
+
+        if self._tolerance is not None:
+            within_tolerance &= distances <= self._tolerance
+
+        return pd.DataFrame({
+            "price": prices,
+            "distance": distances,
+            "within_tolerance": within_tolerance,
+        }, index=index)
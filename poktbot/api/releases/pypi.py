@@ -1,14 +1,13 @@
 from json import JSONDecodeError
 
 from poktbot.api.api import API
+from poktbot.api.http_client import get_http_client
+from poktbot.api.http_client_async import get_async_http_client
 from poktbot.config import get_config
 from poktbot.log import poktbot_logging
 from poktbot.constants import __version__
 
 
-import requests
-
-
 class PyPI(API):
     """
     Checks at PyPI for new releases and notifies them in case.
@@ -25,8 +24,17 @@ class PyPI(API):
         self._logger.debug(f"Initiated PyPI hook for new PoktBot releases notification")
 
     def update(self):
-        response = requests.get(self._api_url)
+        response = get_http_client().get(self._api_url)
+        self._process_release(response)
+
+    async def update_async(self):
+        """
+        Asyncio version of `update()`.
+        """
+        response = await get_async_http_client().get(self._api_url)
+        self._process_release(response)
 
+    def _process_release(self, response):
         try:
             latest_version = response.json()['info']['version']
         except (JSONDecodeError, KeyError) as e:
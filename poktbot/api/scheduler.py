@@ -0,0 +1,236 @@
+from threading import Condition, Lock, Thread
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+from concurrent.futures import ThreadPoolExecutor
+from timeit import default_timer as timer
+import heapq
+import itertools
+import random
+
+
+class ScheduleEntry:
+    """
+    Schedule of an observer inside the `Scheduler`.
+    """
+    def __init__(self, observer, interval, jitter=0, priority=0):
+        self.observer = observer
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.priority = int(priority)
+        self.running = False
+        self.triggered = False
+        self.next_run = None
+
+    def reschedule(self, now):
+        self.next_run = now + max(self.interval + random.uniform(-self.jitter, self.jitter), 0)
+
+
+class Scheduler:
+    """
+    Updates several observers, each one on its own schedule.
+
+    Each observer has an interval, a jitter (a random amount of seconds added or subtracted to each interval, so that
+    requests of different sources don't synchronize) and a priority. When several observers are due and there are not
+    enough workers for all of them, observers with lower priority values are updated first. An observer is never
+    updated twice at the same time.
+
+    Usage example:
+
+        >>> scheduler = get_scheduler()
+        >>> scheduler.add(get_observer("prices"), interval=300, jitter=10, priority=0)
+        >>> scheduler.add(get_observer("nodes_transactions"), interval=3600, jitter=60, priority=1)
+        >>> scheduler.start()
+    """
+    def __init__(self, max_workers=None):
+        """
+        Constructor of the class.
+
+        :param max_workers:
+            Maximum number of observers updated at the same time. None for one worker per observer.
+        """
+        self._logger = poktbot_logging.get_logger("Scheduler")
+        self._max_workers = max_workers
+        self._entries = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._running_count = 0
+        self._condition = Condition(Lock())
+        self._pool = None
+        self._thread = None
+        self._stop = False
+
+    def add(self, observer, interval=None, jitter=None, priority=None):
+        """
+        Schedules the given observer. Parameters not provided are loaded from the config parameter `CONF.schedules`
+        for the observer name, and the interval defaults to `CONF.global_periodic_time`.
+
+        :param observer:
+            Observer to update periodically.
+
+        :param interval:
+            Time in seconds between updates of the observer.
+
+        :param jitter:
+            Maximum number of seconds randomly added or subtracted to each interval.
+
+        :param priority:
+            Priority of the observer when several of them are due. Lower values are updated first.
+        """
+        config = get_config()
+        schedule = (config.get("CONF.schedules", None) or {}).get(observer.name, None) or {}
+
+        entry = ScheduleEntry(observer,
+                              interval=interval if interval is not None else
+                              schedule.get("interval", config["CONF.global_periodic_time"]),
+                              jitter=jitter if jitter is not None else schedule.get("jitter", 0),
+                              priority=priority if priority is not None else schedule.get("priority", 0))
+
+        with self._condition:
+            self._entries[observer.name] = entry
+
+        self._logger.info(f"Scheduled {observer} every {entry.interval} s (jitter {entry.jitter} s; "
+                          f"priority {entry.priority})")
+
+    def start(self, initial_observation=True):
+        """
+        Starts updating the observers. If `initial_observation` is set, every observer is updated right away (by
+        priority); otherwise, they are updated after their first interval.
+        """
+        if self._thread is not None:
+            return
+
+        now = timer()
+
+        with self._condition:
+            self._stop = False
+            self._heap = []
+
+            for entry in self._entries.values():
+                if initial_observation:
+                    entry.next_run = now
+                else:
+                    entry.reschedule(now)
+
+                self._push(entry)
+
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers or max(len(self._entries), 1))
+
+        self._thread = Thread(target=self._thread_func, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+
+        self._thread = None
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def trigger_update(self, observer_name):
+        """
+        Updates the given observer as soon as possible (as soon as it finishes, if it is being updated).
+
+        This is a non-locking method.
+        """
+        with self._condition:
+            entry = self._entries[observer_name]
+
+            if entry.running:
+                entry.triggered = True
+            else:
+                entry.next_run = timer()
+                self._push(entry)
+
+            self._condition.notify_all()
+
+    def _push(self, entry):
+        heapq.heappush(self._heap, (entry.next_run, next(self._counter), entry))
+
+    def _due_entries(self, now):
+        """
+        Pops the entries that are due, sorted by priority. Entries outdated (rescheduled after being pushed) are
+        discarded. Must be invoked under the lock.
+        """
+        due_entries = []
+
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            next_run, _, entry = heapq.heappop(self._heap)
+
+            if next_run == entry.next_run and not entry.running and entry not in due_entries:
+                due_entries.append(entry)
+
+        return sorted(due_entries, key=lambda e: (e.priority, e.next_run))
+
+    def _thread_func(self):
+        with self._condition:
+            while not self._stop:
+                now = timer()
+                workers = self._max_workers or max(len(self._entries), 1)
+
+                for entry in self._due_entries(now):
+                    if self._running_count < workers:
+                        entry.running = True
+                        self._running_count += 1
+                        self._pool.submit(self._update, entry)
+                    else:
+                        # No free workers: the entry waits for the next one
+                        self._push(entry)
+
+                timeout = self._heap[0][0] - now if len(self._heap) > 0 else None
+
+                if self._running_count >= workers:
+                    timeout = None
+
+                self._condition.wait(timeout=timeout)
+
+    def _update(self, entry):
+        try:
+            entry.observer.update()
+        except Exception as e:
+            self._logger.error(f"Exception {str(e)} updating {entry.observer}")
+
+        with self._condition:
+            entry.running = False
+            self._running_count -= 1
+
+            # A trigger received during the update is honoured right away
+            if entry.triggered:
+                entry.triggered = False
+                entry.next_run = timer()
+            else:
+                entry.reschedule(timer())
+
+            self._push(entry)
+            self._condition.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = Lock()
+
+
+def get_scheduler():
+    """
+    Global singleton for retrieving the scheduler of the observers.
+
+    The number of observers updated at the same time is loaded from the config parameter `CONF.scheduler_workers`
+    (one worker per observer if not set).
+
+    :return:
+        The Scheduler object
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(max_workers=get_config().get("CONF.scheduler_workers", None))
+
+    return _scheduler
@@ -17,7 +17,15 @@ class CallbackStorePrices:
         self._logger.debug("Triggered store of prices (if any)")
 
         observer_prices = get_observer("prices")
+        price_api = observer_prices[0]
+
+        # Prices are only stored if new ones were fetched since the last cycle
+        if price_api.new_rows == 0:
+            self._logger.debug("No new prices fetched. Nothing to store")
+            return
+
         prices_db = get_relaydb("prices")
 
         # We store the whole prices series. We always keep the whole prices series in memory.
-        prices_db["prices"] = observer_prices[0].prices
+        prices_db["prices"] = price_api.prices
+        self._logger.info(f"Stored {price_api.new_rows} new prices in database")
@@ -1,10 +1,13 @@
 from poktbot.api import get_observer
+from poktbot.api.price import PriceLookup
 from poktbot.config import get_config
 from poktbot.log import poktbot_logging
 from poktbot.storage import get_relaydb
+from poktbot.storage.chunked import ChunkedTable
+from poktbot.storage.compact import encode_transactions
+from poktbot.storage.daily_rollup import ROLLUP_KEY, build_daily_rollup, merge_daily_rollups
 
 import pandas as pd
-import numpy as np
 
 
 class CallbackStoreTransactions:
@@ -24,66 +27,183 @@ class CallbackStoreTransactions:
         observer_prices = get_observer("prices")
 
         currency = config.get("PRICE.currency", "eur")
+        lookup_method = config.get("PRICE.lookup_method", "nearest")
+        lookup_tolerance = config.get("PRICE.lookup_tolerance", 86400)
+
+        # Only the nodes that fetched new transactions since the last cycle (or that are not stored yet) are stored.
+        # If there are none, the database is not touched at all.
+        deltas = observer_nodes_transactions.deltas
+        nodes = [node for node, new_rows in deltas.items() if new_rows > 0 or node.address not in relay_db]
+
+        if len(nodes) == 0:
+            self._logger.debug(f"No new transactions in any of the {len(deltas)} nodes. Nothing to store")
+            return
+
+        # Columns: ['wallet', 'hash', 'type', 'chain_id', 'height', 'time', 'amount', 'memo', 'in_staking']
+        nodes_transactions = [node.transactions for node in nodes]
+
+        # Prices are updated on their own schedule, so they must cover the transaction times before matching them
+        self._ensure_prices_coverage(observer_prices, nodes_transactions)
+
+        prices_df = observer_prices[0].prices  # Columns: ['prices', 'market_caps', 'total_volumes']
+        price_lookup = None
+
+        if prices_df is not None and prices_df.shape[0] > 0:
+            price_lookup = PriceLookup(prices_df, tolerance=lookup_tolerance * 1000 if lookup_tolerance is not None
+                                       else None)
+
+        # Prices are looked up for the transactions of all the nodes in one pass
+        nodes_prices = self._lookup_prices(price_lookup, nodes_transactions, lookup_method)
+        stored_nodes = 0
 
         # Notifications to telegram are queued here and notified at the end of the function
         with relay_db.bulk_op() as db:
 
-            for node in observer_nodes_transactions:
+            for node, transactions_df, transactions_prices in zip(nodes, nodes_transactions, nodes_prices):
                 # We fetch the last information stored for this node.
-                node_db_persistence = db.setdefault(node.address, {})
+                node_db_persistence = db.get(node.address)
 
-                transactions_df = node.transactions    # Columns: ['wallet', 'hash', 'type', 'chain_id', 'height', 'time', 'amount', 'memo', 'in_staking']
-                prices_df = observer_prices[0].prices  # Columns: ['prices', 'market_caps', 'total_volumes']
+                if node_db_persistence is None:
+                    node_db_persistence = db[node.address] = {}
 
-                # For each set of transactions, we compute the prices
-                if transactions_df is None or prices_df is None or transactions_df.shape[0] == 0 or \
-                        prices_df.shape[0] == 0:
-
-                    # If there are transactions but prices couldn't be fetched, we revert back the last transaction date
-                    if transactions_df is not None and transactions_df.shape[0] > 0:
-                        rollback_height = transactions_df['height'].min() - 1
-                        self._logger(f"Warning: transactions are rollbacked to height {rollback_height} because prices couldn't be fetched.")
-                        node.rollback(height=transactions_df['height'].min() - 1)
+                if transactions_df is None or transactions_df.shape[0] == 0:
+                    continue
 
+                # If there are transactions but prices couldn't be fetched, we revert back the last transaction date
+                if transactions_prices is None:
+                    rollback_height = transactions_df['height'].min() - 1
+                    self._logger.warning(f"Transactions are rollbacked to height {rollback_height} because prices "
+                                         f"couldn't be fetched.")
+                    node.rollback(height=rollback_height)
                     continue
 
-                price_indexes = self._get_closest_value(transactions_df["time"], prices_df)
+                # Transactions without a close enough price are reverted back too, so that they are priced once the
+                # prices for their times are fetched.
+                within_tolerance = transactions_prices["within_tolerance"].values
 
-                transactions_prices = prices_df.loc[price_indexes, "prices"]
-                transactions_df[f'price_{currency}'] = transactions_prices.values
+                if not within_tolerance.all():
+                    rollback_height = transactions_df['height'].values[~within_tolerance].min() - 1
+                    self._logger.warning(f"Transactions of node {node.address} are rollbacked to height "
+                                         f"{rollback_height} because there are no prices close enough to their times.")
+                    node.rollback(height=rollback_height)
+
+                    kept_transactions = transactions_df['height'].values <= rollback_height
+                    transactions_df = transactions_df[kept_transactions].copy()
+                    transactions_prices = transactions_prices[kept_transactions]
+
+                    if transactions_df.shape[0] == 0:
+                        continue
+
+                transactions_df[f'price_{currency}'] = transactions_prices["price"].values
                 transactions_df[f'amount_price_{currency}'] = transactions_df[f'price_{currency}'] * transactions_df['amount']
 
                 # All the operations in the database are updated in bulk
-                # We store the transactions in the database concating them to the previous
-                # It is guaranteed that there are no duplicates, so concating should be safe.
-                # Either ways, we ensure it with .drop_duplicates()
-                node_transactions_original = node_db_persistence.setdefault("transactions", transactions_df.iloc[0:0])
-                node_transactions = pd.concat([node_transactions_original, transactions_df], axis=0)
-                node_db_persistence["transactions"] = node_transactions
+                # We store the transactions in the database appending them to the previous as a new chunk (see
+                # `ChunkedTable`), so that the history is never copied, in the compact representation of the storage
+                # (see `encode_transactions()`).
+                # Transactions delivered again (after a rollback or a restart) are dropped through the hash index of
+                # the node, so that the history is never scanned.
+                stored_table = node_db_persistence.get("transactions")
+
+                if not isinstance(stored_table, ChunkedTable):
+                    stored_table = ChunkedTable.wrap(encode_transactions(stored_table))
+
+                new_transactions_df = relay_db.drop_stored_transactions(node.address, stored_table,
+                                                                        encode_transactions(transactions_df))
+                dropped_transactions = transactions_df.shape[0] - new_transactions_df.shape[0]
+
+                if dropped_transactions > 0:
+                    self._logger.warning(f"Dropped {dropped_transactions} transactions of node {node.address} that "
+                                         f"were already stored")
+
+                if new_transactions_df.shape[0] > 0:
+                    node_transactions = stored_table.append(new_transactions_df) if stored_table is not None else \
+                        ChunkedTable([new_transactions_df])
+                    node_db_persistence["transactions"] = node_transactions
+
+                    # The daily rollup is updated only with the new transactions (nodes stored before rollups existed
+                    # are rolled up from their whole history once)
+                    rollup_df = node_db_persistence.get(ROLLUP_KEY)
+
+                    if rollup_df is None:
+                        node_db_persistence[ROLLUP_KEY] = build_daily_rollup(node_transactions.frame, currency)
+                    else:
+                        node_db_persistence[ROLLUP_KEY] = merge_daily_rollups(
+                            rollup_df, build_daily_rollup(new_transactions_df, currency))
+
+                    stored_nodes += 1
 
                 # Now we store the status for this node transactions
                 node_db_persistence["last_height"] = node.last_height
                 node_db_persistence["in_staking"] = node.in_staking
 
-                self._logger.info(f"Stored {transactions_df.shape[0]} new transactions in database for node {node.address}")
+                # The record is assigned back so that the bulk operation persists it
+                db[node.address] = node_db_persistence
+
+                self._logger.info(f"Stored {new_transactions_df.shape[0]} new transactions in database for node "
+                                  f"{node.address}")
+
+        # Results computed from the stored transactions (such as the cached stats) are invalidated
+        if stored_nodes > 0:
+            relay_db.bump_generation()
+
+    def _ensure_prices_coverage(self, observer_prices, nodes_transactions):
+        """
+        Updates the prices observer if the prices fetched don't reach the time of the latest transaction.
+
+        Transactions still not covered after the update (the price provider may lag behind) are handled by the
+        tolerance of the price lookup.
+        """
+        last_times = [transactions_df["time"].max() for transactions_df in nodes_transactions
+                      if transactions_df is not None and transactions_df.shape[0] > 0]
+
+        if len(last_times) == 0:
+            return
+
+        last_time = PriceLookup.to_timestamps(pd.Series(last_times)).max()
+        prices_df = observer_prices[0].prices
+
+        if prices_df is None or prices_df.shape[0] == 0 or prices_df.index.max() < last_time:
+            self._logger.info("Prices don't cover the latest transactions. Updating prices before storing them.")
+            observer_prices.update()
 
     @staticmethod
-    def _get_closest_value(datetimes, values_to_lookup):
+    def _lookup_prices(price_lookup, nodes_transactions, method):
         """
-        Computes the closest row for the given list of datetimes.
+        Looks up the prices of the transactions of all the nodes at once.
+
+        :param price_lookup:
+            PriceLookup over the fetched prices. None if prices couldn't be fetched.
+
+        :param nodes_transactions:
+            List of transactions DataFrames (or None), one per node.
 
-        :param datetimes:
-            List/array/series of datetimes to match with values_to_lookup.
+        :param method:
+            Lookup method of the PriceLookup.
 
-        :param values_to_lookup:
-            Series/Dataframe of values indexed by timestamps.
+        :returns:
+            List with the PriceLookup result for the transactions of each node, or None for the nodes without
+            transactions (or if there is no price lookup).
         """
-        values_to_lookup = values_to_lookup.index if hasattr(values_to_lookup, "index") else values_to_lookup
+        has_transactions = [transactions_df is not None and transactions_df.shape[0] > 0
+                            for transactions_df in nodes_transactions]
+
+        if price_lookup is None or not any(has_transactions):
+            return [None] * len(nodes_transactions)
+
+        times = pd.concat([transactions_df["time"] for transactions_df, valid
+                           in zip(nodes_transactions, has_transactions) if valid], axis=0, ignore_index=True)
+        prices = price_lookup.lookup(times, method=method)
+
+        nodes_prices = []
+        offset = 0
+
+        for transactions_df, valid in zip(nodes_transactions, has_transactions):
+            if not valid:
+                nodes_prices.append(None)
+                continue
 
-        transaction_times = datetimes.view("int64") // 10 ** 6
-        min_index = np.abs(
-                        np.expand_dims(values_to_lookup, axis=0) - np.expand_dims(transaction_times, axis=1)
-                    ).argmin(axis=1)
+            nodes_prices.append(prices.iloc[offset:offset + transactions_df.shape[0]])
+            offset += transactions_df.shape[0]
 
-        closest_values = values_to_lookup[min_index]
-        return closest_values
+        return nodes_prices
@@ -1,10 +1,11 @@
-from poktbot.api import get_observer
+from poktbot.api import get_observer, get_scheduler
 from poktbot.api.node import PocketNodeTransactions
 from poktbot.api.price import Coingecko
 from poktbot.api.releases.pypi import PyPI
 from poktbot.callbacks import CallbackStoreTransactions, CallbackStorePrices, CallbackNotifyRelease
 from poktbot.config import get_config
 from poktbot.telegram import TelegramBot
+from poktbot.telegram.workers import get_action_workers
 
 
 def main():
@@ -28,28 +29,25 @@ def main():
     # And the observer of new PoktBot releases
     observer_releases.add(PyPI())
 
-    # Finally, we observe both observers. Why? because we want both to be updated together so that we can match the
-    # transaction times with their prices in the price provider. Also, on update we want to store everything in a
-    # database.
-    observer_main = get_observer("main")
-    observer_main.add(observer_nodes_transactions)
-    observer_main.add(observer_prices)
-    observer_main.add(observer_releases)
-
     # Now we create the callbacks.
     callback_store_transactions = CallbackStoreTransactions()
     callback_store_prices = CallbackStorePrices()
     callback_notify_release = CallbackNotifyRelease(bot)
 
-    # When the main observer gets updated, we store everything in a database
-    observer_main.add_callback(callback_store_transactions)
-    observer_main.add_callback(callback_store_prices)
+    # When an observer gets updated, we store its information in a database. The transactions callback ensures that
+    # prices cover the transaction times before matching them.
+    observer_nodes_transactions.add_callback(callback_store_transactions)
+    observer_prices.add_callback(callback_store_prices)
 
     # And if a new release is available, a notification too.
     observer_releases.add_callback(callback_notify_release)
 
-    # We only start the main observer because we want all the observers to be updated together.
-    observer_main.start()
+    # Each observer is updated on its own schedule (interval, jitter and priority from CONF.schedules).
+    scheduler = get_scheduler()
+    scheduler.add(observer_prices)
+    scheduler.add(observer_nodes_transactions)
+    scheduler.add(observer_releases)
+    scheduler.start()
 
     bot.start()
 
@@ -57,7 +55,8 @@ def main():
         bot.join()
     except KeyboardInterrupt:
         bot.stop()
-        observer_main.stop()
+        scheduler.stop()
+        get_action_workers().shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+from poktbot.stats.fleet_stats import FleetStats, FleetStatsResult
+from poktbot.stats.stats_cache import StatsCache, get_stats_cache
+
+
+__all__ = ["FleetStats", "FleetStatsResult", "StatsCache", "get_stats_cache"]
@@ -0,0 +1,219 @@
+from poktbot.config import get_config
+from poktbot.storage.daily_rollup import ROLLUP_KEY, build_daily_rollup
+
+import numpy as np
+import pandas as pd
+
+
+class FleetStatsResult:
+    """
+    Rewards stats of a fleet of nodes, computed by `FleetStats`.
+
+    Figures are available both in POKT and in fiat currency:
+
+        - daily: pd.DataFrame indexed by day, with the columns avg/total (POKT), avg_fiat/total_fiat and nodes (number of
+          nodes in staking each day).
+        - monthly: pd.DataFrame indexed by month, with the sums of the avg/total columns.
+        - daily_amounts/daily_amounts_fiat: pd.DataFrame indexed by day with a column per node. Days in which a node
+          was not in staking are NaN.
+        - summary: pd.Series with the figures shown to the users (daily/today/monthly/this month averages by node, and
+          today/this month/all-time totals).
+    """
+    def __init__(self, currency, daily, monthly, daily_amounts, daily_amounts_fiat, summary):
+        self.currency = currency
+        self.daily = daily
+        self.monthly = monthly
+        self.daily_amounts = daily_amounts
+        self.daily_amounts_fiat = daily_amounts_fiat
+        self.summary = summary
+
+    def avg_rewards(self, fiat=False):
+        """
+        Retrieves the average rewards by node: daily, today, monthly and this month.
+        """
+        currency_name = self.currency.upper() if fiat else "POKT"
+        suffix = "_fiat" if fiat else ""
+
+        return pd.Series({
+            f"({currency_name}) Daily earns (avg)": self.summary[f"avg_daily{suffix}"],
+            f"({currency_name}) Today earns (avg)": self.summary[f"avg_today{suffix}"],
+            f"({currency_name}) Month earns (avg)": self.summary[f"avg_monthly{suffix}"],
+            f"({currency_name}) This month earns (avg)": self.summary[f"avg_this_month{suffix}"],
+        }).round(2)
+
+    def total_rewards(self, fiat=False):
+        """
+        Retrieves the total rewards of the fleet: today, this month and all-time.
+        """
+        currency_name = self.currency.upper() if fiat else "POKT"
+        suffix = "_fiat" if fiat else ""
+
+        return pd.Series({
+            f"({currency_name}) Today earns (total)": self.summary[f"total_today{suffix}"],
+            f"({currency_name}) This month earns (total)": self.summary[f"total_this_month{suffix}"],
+            f"({currency_name}) All-time earns (total)": self.summary[f"total_alltime{suffix}"],
+        }).round(2)
+
+
+class FleetStats:
+    """
+    Computes the rewards stats of a fleet of nodes in a single pass over their daily rollups.
+
+    Rollups of every node are concatenated once into a long-format table, which is spread into a day x node grid to
+    apply the staking days. Then, every daily and monthly figure is computed with one grouped aggregation.
+
+    Usage example:
+
+        >>> fleet_stats = FleetStats()
+        >>> result = fleet_stats.compute(fleet_stats.load_rollups(relay_db, nodes_addresses))
+        >>> result.avg_rewards()
+        (POKT) Daily earns (avg)         41.52
+        (POKT) Today earns (avg)         12.03
+        ...
+    """
+    def __init__(self, currency=None):
+        """
+        Constructor of the class.
+
+        :param currency:
+            Currency of the prices of the rollups. By default, it is loaded from config param PRICE.currency.
+        """
+        self._currency = currency or get_config().get("PRICE.currency", "eur")
+
+    @property
+    def currency(self):
+        return self._currency
+
+    def load_rollups(self, relay_db, nodes_addresses):
+        """
+        Retrieves the daily rollups of the given nodes from the relay DB. Nodes stored before rollups existed are rolled
+        up from their transactions.
+
+        :returns:
+            Dictionary mapping node addresses to their daily rollups.
+        """
+        rollups = {}
+
+        for node_address in nodes_addresses:
+            rollup_df = relay_db.get(node_address, {}).get(ROLLUP_KEY)
+
+            if rollup_df is None:
+                rollup_df = build_daily_rollup(relay_db.query_transactions(wallets=[node_address]), self._currency)
+
+            rollups[node_address] = rollup_df
+
+        return rollups
+
+    @staticmethod
+    def concat_rollups(rollups):
+        """
+        Concatenates the daily rollups of several nodes into a long-format table, indexed by (wallet, date).
+
+        :param rollups:
+            Dictionary mapping node addresses to their daily rollups (see `poktbot.storage.daily_rollup`).
+
+        :returns:
+            A pd.DataFrame with the rows of every rollup, or None if there are no rows.
+        """
+        rollups = {node_address: rollup_df for node_address, rollup_df in rollups.items()
+                   if rollup_df is not None and rollup_df.shape[0] > 0}
+
+        if len(rollups) == 0:
+            return None
+
+        return pd.concat(rollups, names=["wallet", "date"])
+
+    def compute(self, rollups, today=None):
+        """
+        Computes the stats of the fleet.
+
+        :param rollups:
+            Dictionary mapping node addresses to their daily rollups (see `poktbot.storage.daily_rollup`), or their
+            long-format table (see `concat_rollups()`). The long-format table is much cheaper to send to another
+            process.
+
+        :param today:
+            Day considered as today (UTC). By default, the current day.
+
+        :returns:
+            A FleetStatsResult object.
+        """
+        fiat_column = f"amount_price_{self._currency}"
+        today = pd.Timestamp.now("UTC") if today is None else pd.Timestamp(today)
+
+        if today.tzinfo is not None:
+            today = today.tz_convert("UTC").tz_localize(None)
+
+        today = today.normalize()
+        long_df = self.concat_rollups(rollups) if isinstance(rollups, dict) else rollups
+
+        if long_df is not None and long_df.shape[0] > 0:
+            days = pd.date_range(min(long_df.index.get_level_values("date").min(), today), today, freq="D")
+            wallets = list(long_df.index.get_level_values("wallet").unique())
+        else:
+            long_df = None
+            days = pd.DatetimeIndex([today])
+            wallets = []
+
+        daily_amounts, daily_amounts_fiat = self._daily_amounts(long_df, days, wallets, fiat_column)
+
+        daily = pd.DataFrame({
+            "avg": daily_amounts.mean(axis=1, skipna=True),
+            "total": daily_amounts.sum(axis=1, skipna=True),
+            "avg_fiat": daily_amounts_fiat.mean(axis=1, skipna=True),
+            "total_fiat": daily_amounts_fiat.sum(axis=1, skipna=True),
+            "nodes": (~daily_amounts.isna()).sum(axis=1),
+        }, index=days)
+
+        monthly = daily[["avg", "total", "avg_fiat", "total_fiat"]].groupby(days.to_period("M")).sum()
+        summary = self._summary(daily, monthly, today)
+
+        return FleetStatsResult(self._currency, daily, monthly, daily_amounts, daily_amounts_fiat, summary)
+
+    @staticmethod
+    def _daily_amounts(long_df, days, wallets, fiat_column):
+        """
+        Spreads the long-format rollups into day x node grids of amounts, where days in which a node was not in staking
+        (or before its first transaction) are NaN.
+        """
+        if long_df is None:
+            empty_df = pd.DataFrame(index=days, columns=wallets, dtype=float)
+            return empty_df, empty_df.copy()
+
+        wide_df = long_df.unstack("wallet").reindex(days)
+
+        first_days = long_df.reset_index().groupby("wallet")["date"].min().reindex(wallets)
+        active = days.values[:, None] >= first_days.values[None, :]
+
+        staking = wide_df["staking"].reindex(columns=wallets).fillna(False).astype(bool).values
+        carried_staking = wide_df["last_staking"].reindex(columns=wallets).astype(float).ffill().shift(1).fillna(0) > 0
+        staking_mask = (staking | carried_staking.values) & active
+
+        daily_amounts = wide_df["amount"].reindex(columns=wallets).astype(float).fillna(0).where(staking_mask)
+        daily_amounts_fiat = wide_df[fiat_column].reindex(columns=wallets).astype(float).fillna(0).where(staking_mask)
+
+        return daily_amounts, daily_amounts_fiat
+
+    @staticmethod
+    def _summary(daily, monthly, today):
+        summary = {}
+        this_month = today.to_period("M")
+        has_today = today in daily.index
+        has_this_month = this_month in monthly.index
+
+        for suffix in ["", "_fiat"]:
+            avg_column = f"avg{suffix}"
+            total_column = f"total{suffix}"
+
+            # Current day and month are excluded from the daily and monthly averages
+            summary[f"avg_daily{suffix}"] = daily.loc[daily.index < today, avg_column].mean(skipna=True)
+            summary[f"avg_today{suffix}"] = np.nan_to_num(daily.at[today, avg_column]) if has_today else 0
+            summary[f"avg_monthly{suffix}"] = monthly.loc[monthly.index < this_month, avg_column].mean(skipna=True)
+            summary[f"avg_this_month{suffix}"] = monthly.at[this_month, avg_column] if has_this_month else np.nan
+
+            summary[f"total_today{suffix}"] = np.nan_to_num(daily.at[today, total_column]) if has_today else 0
+            summary[f"total_this_month{suffix}"] = np.nan_to_num(monthly.at[this_month, total_column]) \
+                if has_this_month else 0
+            summary[f"total_alltime{suffix}"] = daily[total_column].sum(skipna=True)
+
+        return pd.Series(summary)
@@ -0,0 +1,122 @@
+from threading import Lock
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+from collections import OrderedDict
+
+
+class StatsCache:
+    """
+    Least recently used cache of rendered stats (message texts and graph images).
+
+    Keys must include everything the stats depend on. In particular, the ingest generation of the relay DB, which is
+    bumped each time new transactions are stored, so that cached stats are never served after new data lands.
+
+    Usage example:
+
+        >>> stats_cache = get_stats_cache()
+        >>> key = (relay_db.generation, currency, last_days_count, today)
+        >>> stats = stats_cache.get(key)
+        >>> if stats is None:
+        ...     stats = stats_cache.put(key, render_stats())
+    """
+    def __init__(self, max_entries=None):
+        """
+        Constructor of the class.
+
+        :param max_entries:
+            Maximum number of entries kept. Least recently used entries are evicted first. By default, it is loaded
+            from config param CONF.stats_cache_size.
+        """
+        self._logger = poktbot_logging.get_logger("StatsCache")
+        self._max_entries = int(max_entries if max_entries is not None else
+                                get_config().get("CONF.stats_cache_size", 8))
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    def get(self, key):
+        """
+        Retrieves the entry for the given key, or None if it is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+
+            hits, misses = self._hits, self._misses
+
+        self._logger.debug(f"{'Hit' if value is not None else 'Miss'} for {key} ({hits} hits; {misses} misses)")
+        return value
+
+    def put(self, key, value):
+        """
+        Caches the given value, evicting the least recently used entries if the cache is full.
+
+        :returns:
+            The cached value.
+        """
+        if self._max_entries <= 0:
+            return value
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return f"[StatsCache: {len(self)}/{self._max_entries} entries; {self._hits} hits; {self._misses} misses; " \
+               f"{self._evictions} evictions]"
+
+
+_stats_cache = None
+_stats_cache_lock = Lock()
+
+
+def get_stats_cache():
+    """
+    Global singleton for retrieving the cache of rendered stats.
+
+    The number of entries kept is loaded from the config parameter `CONF.stats_cache_size`.
+
+    :return:
+        The StatsCache object
+    """
+    global _stats_cache
+
+    with _stats_cache_lock:
+        if _stats_cache is None:
+            _stats_cache = StatsCache()
+
+    return _stats_cache
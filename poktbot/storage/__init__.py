@@ -1,11 +1,15 @@
 from poktbot.config import get_config
 from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+from poktbot.storage.local.segmented.relay_db_seg import RelayDBSegmented
+from poktbot.storage.local.sqlite.relay_db_sqlite import RelayDBsqlite
 
 import os
 
 
 AVAILABLE_RELAYDB_TYPES = {
     "joblib": RelayDBjl,
+    "segmented": RelayDBSegmented,
+    "sqlite": RelayDBsqlite,
 }
 
 
@@ -19,7 +23,7 @@ def get_relaydb(db_name="transactions"):
     The first time this function is called, it will try to load the RelayDB and store it in a global scope.
     Rest of the calls return the same RelayDB object.
 
-    As of 20/feb/2022, only a RelayDB based on a JobLIB local file is supported. T
+    The RelayDB type is picked from the config parameter `SERVER.database_type` (see `AVAILABLE_RELAYDB_TYPES`).
 
     :return:
         The RelayDB object
@@ -0,0 +1,206 @@
+import pandas as pd
+
+from poktbot.storage.compact import concat_tables
+
+
+# Number of chunks a table accumulates before its trailing chunks are consolidated
+MAX_CHUNKS = 16
+
+
+class ChunkedTable:
+    """
+    Append-only table made of immutable chunks (DataFrames), such as the transactions of a node.
+
+    Appending rows adds them as a new chunk to a new table that shares the chunks of the previous one, so that its cost
+    is proportional to the appended rows and the table seen by the readers of the previous one never changes. Once the
+    table has more than `max_chunks` chunks, its trailing chunks are merged until the merged chunk is smaller than the
+    one before it: chunk sizes decrease geometrically, so each row is copied a logarithmic number of times overall.
+
+    The whole table is exposed as a DataFrame on demand (see `frame`), consolidated once per table.
+
+    Usage example:
+
+        >>> table = ChunkedTable.wrap(node_db_persistence.get("transactions"))
+        >>> node_db_persistence["transactions"] = table.append(new_transactions_df)
+        >>> transactions_df = node_db_persistence["transactions"].frame
+    """
+    def __init__(self, chunks=(), max_chunks=MAX_CHUNKS, chunks_nbytes=None):
+        """
+        Constructor of the class.
+
+        :param chunks:
+            List of DataFrames with the rows of the table, in order. They must not be modified afterwards.
+
+        :param max_chunks:
+            Number of chunks from which the trailing chunks are consolidated.
+
+        :param chunks_nbytes:
+            List with the memory taken by each chunk, if known (None otherwise). Memory not known is measured on demand.
+        """
+        chunks = list(chunks)
+        chunks_nbytes = list(chunks_nbytes) if chunks_nbytes is not None else [None] * len(chunks)
+
+        self._max_chunks = max_chunks
+        self._chunks, self._chunks_nbytes = self._consolidate([(chunk, nbytes) for chunk, nbytes
+                                                               in zip(chunks, chunks_nbytes) if chunk is not None])
+        self._rows = sum(chunk.shape[0] for chunk in self._chunks)
+        self._frame = None
+
+    @classmethod
+    def wrap(cls, table):
+        """
+        Wraps the given table into a ChunkedTable (tables already chunked are returned as they are).
+
+        :param table:
+            pd.DataFrame or ChunkedTable. None is returned as it is.
+        """
+        if table is None or isinstance(table, ChunkedTable):
+            return table
+
+        return cls([table])
+
+    @property
+    def chunks(self):
+        return self._chunks
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def shape(self):
+        return self._rows, self._chunks[0].shape[1] if len(self._chunks) > 0 else 0
+
+    @property
+    def nbytes(self):
+        """
+        Memory taken by the chunks. It is measured once per chunk, so tables that share chunks don't measure them again.
+        """
+        self._chunks_nbytes = tuple(int(chunk.memory_usage(deep=True, index=True).sum()) if nbytes is None else nbytes
+                                    for chunk, nbytes in zip(self._chunks, self._chunks_nbytes))
+
+        return sum(self._chunks_nbytes)
+
+    @property
+    def frame(self):
+        """
+        DataFrame with the whole table. It is built the first time it is accessed, and must not be modified.
+        """
+        if self._frame is None:
+            if len(self._chunks) == 0:
+                self._frame = pd.DataFrame()
+            elif len(self._chunks) == 1:
+                self._frame = self._chunks[0]
+            else:
+                self._frame = concat_tables(list(self._chunks))
+
+        return self._frame
+
+    def _consolidate(self, chunks):
+        """
+        Consolidates the trailing chunks of the given list of (chunk, nbytes) while there are more than `max_chunks`.
+
+        :returns:
+            Tuple with the consolidated chunks, and tuple with their memory (None if not known).
+        """
+        chunks = list(chunks)
+
+        while len(chunks) > self._max_chunks:
+            merged = [chunks.pop()]
+            merged_rows = merged[0][0].shape[0]
+
+            while len(chunks) > 0 and (len(merged) < 2 or chunks[-1][0].shape[0] <= merged_rows):
+                merged.insert(0, chunks.pop())
+                merged_rows += merged[0][0].shape[0]
+
+            chunks.append((concat_tables([chunk for chunk, _ in merged]), None))
+
+        return tuple(chunk for chunk, _ in chunks), tuple(nbytes for _, nbytes in chunks)
+
+    def append(self, rows_df):
+        """
+        Appends the given rows.
+
+        :param rows_df:
+            pd.DataFrame with the rows to append. It must not be modified afterwards.
+
+        :returns:
+            A new ChunkedTable with the rows of this table and the appended ones.
+        """
+        if rows_df is None or rows_df.shape[0] == 0:
+            return self
+
+        return ChunkedTable(self._chunks + (rows_df,), max_chunks=self._max_chunks,
+                            chunks_nbytes=self._chunks_nbytes + (None,))
+
+    def head(self, rows):
+        """
+        Retrieves a new ChunkedTable with the first `rows` rows of this table (only the last chunk kept is sliced).
+        """
+        chunks = []
+        chunks_nbytes = []
+        offset = 0
+
+        for chunk, nbytes in zip(self._chunks, self._chunks_nbytes):
+            if offset >= rows:
+                break
+
+            if offset + chunk.shape[0] <= rows:
+                chunks.append(chunk)
+                chunks_nbytes.append(nbytes)
+            else:
+                chunks.append(chunk.iloc[:rows - offset])
+                chunks_nbytes.append(None)
+
+            offset += chunk.shape[0]
+
+        return ChunkedTable(chunks, max_chunks=self._max_chunks, chunks_nbytes=chunks_nbytes)
+
+    def tail(self, start):
+        """
+        Retrieves the rows of this table from the row `start` onwards as a DataFrame, concatenating only the chunks that
+        contain them (for example, the rows appended since the last dump).
+        """
+        chunks = []
+        offset = 0
+
+        for chunk in self._chunks:
+            if offset + chunk.shape[0] > start:
+                chunks.append(chunk.iloc[max(start - offset, 0):])
+
+            offset += chunk.shape[0]
+
+        if len(chunks) == 0:
+            return self._chunks[-1].iloc[0:0] if len(self._chunks) > 0 else pd.DataFrame()
+
+        return chunks[0] if len(chunks) == 1 else concat_tables(chunks)
+
+    def __len__(self):
+        return self._rows
+
+    def __getstate__(self):
+        # The consolidated frame is not stored, it is built again on demand
+        return {"chunks": self._chunks, "max_chunks": self._max_chunks}
+
+    def __setstate__(self, state):
+        self.__init__(state["chunks"], max_chunks=state["max_chunks"])
+
+    def __str__(self):
+        return f"[ChunkedTable: {self._rows} rows in {len(self._chunks)} chunks]"
+
+    def __repr__(self):
+        return str(self)
+
+
+def to_frame(table):
+    """
+    Retrieves the given table (pd.DataFrame or ChunkedTable) as a DataFrame.
+    """
+    return table.frame if isinstance(table, ChunkedTable) else table
+
+
+def tail_rows(table, start):
+    """
+    Retrieves the rows of the given table (pd.DataFrame or ChunkedTable) from the row `start` onwards as a DataFrame.
+    """
+    return table.tail(start) if isinstance(table, ChunkedTable) else table.iloc[start:]
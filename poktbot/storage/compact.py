@@ -0,0 +1,151 @@
+import binascii
+
+import numpy as np
+import pandas as pd
+
+
+# Columns with few distinct values, kept as categoricals
+CATEGORICAL_COLUMNS = ["type", "chain_id", "memo"]
+
+# Size of a transaction hash (64 hex characters)
+HASH_BYTES = 32
+
+
+def _encode_hashes(hashes):
+    """
+    Encodes the given hex hashes as 32-byte binary strings. Hashes are kept as they are (strings) if any of them is not
+    a 64 characters uppercase hex string, so that they can always be decoded back as they were.
+    """
+    joined = "".join(hashes) if all(isinstance(tx_hash, str) for tx_hash in hashes) else None
+
+    if joined is None or len(joined) != len(hashes) * HASH_BYTES * 2 or joined != joined.upper() or \
+            any(len(tx_hash) != HASH_BYTES * 2 for tx_hash in hashes):
+        return hashes
+
+    try:
+        return np.frombuffer(binascii.unhexlify(joined), dtype=f"S{HASH_BYTES}").astype(object)
+    except (binascii.Error, ValueError):
+        return hashes
+
+
+def _decode_hashes(hashes):
+    """
+    Decodes the binary hashes back to uppercase hex strings (hashes that were kept as strings are returned as they are).
+    """
+    if len(hashes) == 0 or not any(isinstance(tx_hash, bytes) for tx_hash in hashes):
+        return hashes
+
+    if all(isinstance(tx_hash, bytes) for tx_hash in hashes):
+        hex_hashes = binascii.hexlify(np.asarray(hashes, dtype=f"S{HASH_BYTES}").tobytes()).upper()
+        return np.frombuffer(hex_hashes, dtype=f"S{HASH_BYTES * 2}").astype(str).astype(object)
+
+    # Binary strings are trimmed of their trailing null bytes
+    return np.array([binascii.hexlify(tx_hash.ljust(HASH_BYTES, b"\0")).decode().upper()
+                     if isinstance(tx_hash, bytes) else tx_hash for tx_hash in hashes], dtype=object)
+
+
+def is_encoded(transactions_df):
+    """
+    Whether the given transactions are in the compact representation of the storage (see `encode_transactions()`).
+    """
+    return "wallet" not in transactions_df.columns
+
+
+def encode_transactions(transactions_df):
+    """
+    Encodes the transactions of a node into the compact representation kept by the storage:
+        - `wallet` is dropped (it is the key of the node in the DB).
+        - `hash` is stored as 32-byte binary strings.
+        - `type`, `chain_id` and `memo` are stored as categoricals.
+        - `height` is stored as int32 (if it fits).
+        - `time` stays a UTC datetime64 column.
+
+    Transactions already encoded are returned as they are.
+
+    :param transactions_df:
+        Transactions of a node, as built by `PocketNodeTransactions`.
+
+    :returns:
+        A new pd.DataFrame with the compact representation of the transactions.
+    """
+    if transactions_df is None or is_encoded(transactions_df):
+        return transactions_df
+
+    transactions_df = transactions_df.drop(columns="wallet")
+
+    if "hash" in transactions_df:
+        transactions_df["hash"] = _encode_hashes(transactions_df["hash"].values.tolist())
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in transactions_df and not isinstance(transactions_df[column].dtype, pd.CategoricalDtype):
+            transactions_df[column] = transactions_df[column].astype("category")
+
+    if "height" in transactions_df and transactions_df.shape[0] > 0 and \
+            np.iinfo(np.int32).min <= transactions_df["height"].min() <= transactions_df["height"].max() <= \
+            np.iinfo(np.int32).max:
+        transactions_df["height"] = transactions_df["height"].astype("int32")
+
+    if "time" in transactions_df:
+        transactions_df["time"] = pd.to_datetime(transactions_df["time"], utc=True)
+
+    return transactions_df
+
+
+def decode_transactions(transactions_df, wallet):
+    """
+    Decodes transactions encoded with `encode_transactions()`: the `wallet` column is restored and hashes are decoded
+    back to hex strings. Categoricals and narrow dtypes are kept.
+
+    Transactions not encoded (stored before the compact representation) are returned as they are.
+
+    :param transactions_df:
+        Encoded transactions of a node (or a subset of them).
+
+    :param wallet:
+        Address of the node of the transactions.
+
+    :returns:
+        A new pd.DataFrame with the decoded transactions.
+    """
+    if transactions_df is None or not is_encoded(transactions_df):
+        return transactions_df
+
+    transactions_df = transactions_df.copy()
+    transactions_df.insert(0, "wallet", np.full(transactions_df.shape[0], wallet, dtype=object))
+
+    if "hash" in transactions_df:
+        transactions_df["hash"] = _decode_hashes(transactions_df["hash"].values.tolist())
+
+    return transactions_df
+
+
+def concat_tables(tables):
+    """
+    Concatenates tables (for example, chunks of the encoded transactions of a node) keeping their categorical columns
+    as categoricals: their categories are merged, instead of falling back to object columns as `pd.concat()` does when
+    they differ.
+
+    :param tables:
+        List of pd.DataFrame (or None) to concatenate.
+
+    :returns:
+        A pd.DataFrame with the concatenated tables.
+    """
+    tables = [table for table in tables if table is not None]
+    categorical_columns = {column for table in tables for column, dtype in table.dtypes.items()
+                           if isinstance(dtype, pd.CategoricalDtype)}
+
+    for column in categorical_columns:
+        if not all(column in table for table in tables):
+            continue
+
+        categories = pd.api.types.union_categoricals([table[column].astype("category").values for table in tables],
+                                                     ignore_order=True).categories
+
+        # Only the tables whose categories differ are recoded (usually, only the new rows)
+        tables = [table if isinstance(table[column].dtype, pd.CategoricalDtype) and
+                  table[column].cat.categories.equals(categories) else
+                  table.assign(**{column: pd.Categorical(table[column], categories=categories)})
+                  for table in tables]
+
+    return pd.concat(tables, axis=0)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+
+ROLLUP_KEY = "daily_rollup"
+
+
+def build_daily_rollup(transactions_df, currency):
+    """
+    Builds the daily rollup of the given transactions of a node.
+
+    :param transactions_df:
+        Transactions of a node, with the columns `time`, `type`, `amount`, `amount_price_<currency>` and `in_staking`.
+
+    :param currency:
+        Currency of the prices of the transactions.
+
+    :returns:
+        A pd.DataFrame indexed by UTC day (normalized naive datetimes), with the columns:
+            - amount: sum of the POKTs of the claims of the day.
+            - amount_price_<currency>: sum of the fiat value of the claims of the day.
+            - claims: number of claims of the day.
+            - staking: True if any transaction of the day was in staking.
+            - last_staking: staking flag of the last transaction of the day, carried to the following days.
+    """
+    fiat_column = f"amount_price_{currency}"
+    columns = ["amount", fiat_column, "claims", "staking", "last_staking"]
+
+    if transactions_df is None or transactions_df.shape[0] == 0:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="date"))
+
+    transactions_df = transactions_df.sort_values("time", kind="stable")
+    times = pd.DatetimeIndex(transactions_df["time"])
+
+    # Days are UTC days, stored as naive datetimes
+    if times.tz is not None:
+        times = times.tz_convert("UTC").tz_localize(None)
+
+    days = times.normalize()
+
+    is_claim = transactions_df["type"].astype(str).str.contains("claim").values
+    in_staking = transactions_df["in_staking"].values > 0
+
+    claims_df = pd.DataFrame({
+        "amount": np.where(is_claim, transactions_df["amount"].values, 0),
+        fiat_column: np.where(is_claim, transactions_df[fiat_column].values, 0),
+        "claims": is_claim.astype("int64"),
+        "staking": in_staking,
+        "last_staking": in_staking,
+    }, index=days)
+
+    grouped = claims_df.groupby(level=0, sort=True)
+    rollup_df = grouped[["amount", fiat_column, "claims"]].sum()
+    rollup_df["staking"] = grouped["staking"].max()
+    rollup_df["last_staking"] = grouped["last_staking"].last()
+    rollup_df.index.name = "date"
+
+    return rollup_df[columns]
+
+
+def merge_daily_rollups(rollup_df, new_rollup_df):
+    """
+    Merges the rollup of new transactions into the existing rollup of a node. Only the days of the new rollup are
+    recomputed, so the cost doesn't depend on the length of the history.
+
+    Transactions of the new rollup must be newer than the ones of the existing rollup.
+    """
+    if rollup_df is None or rollup_df.shape[0] == 0:
+        return new_rollup_df
+
+    if new_rollup_df is None or new_rollup_df.shape[0] == 0:
+        return rollup_df
+
+    first_new_day = new_rollup_df.index.min()
+    overlap_df = rollup_df[rollup_df.index >= first_new_day]
+
+    if overlap_df.shape[0] > 0:
+        merged_df = pd.concat([overlap_df, new_rollup_df], axis=0)
+        grouped = merged_df.groupby(level=0, sort=True)
+
+        sum_columns = [column for column in merged_df.columns if column not in ["staking", "last_staking"]]
+        new_rollup_df = grouped[sum_columns].sum()
+        new_rollup_df["staking"] = grouped["staking"].max()
+        new_rollup_df["last_staking"] = grouped["last_staking"].last()
+        new_rollup_df.index.name = "date"
+
+    return pd.concat([rollup_df[rollup_df.index < first_new_day], new_rollup_df[rollup_df.columns]], axis=0)
+
+
+def daily_totals(rollup_df, currency, until=None):
+    """
+    Computes the daily totals of a node from its rollup, from the first day with transactions until the given day.
+
+    Days in which the node was not in staking are NaN; days in staking without claims are 0. A day counts as in staking
+    if any of its transactions was in staking, or if the last transaction before the day was.
+
+    :param rollup_df:
+        Daily rollup of the node (see `build_daily_rollup()`).
+
+    :param currency:
+        Currency of the prices of the rollup.
+
+    :param until:
+        Last day of the totals. By default, today (UTC).
+
+    :returns:
+        Tuple of 2 pd.Series indexed by date: POKTs and fiat value of the claims of each day.
+    """
+    fiat_column = f"amount_price_{currency}"
+
+    if rollup_df is None or rollup_df.shape[0] == 0:
+        return pd.Series(dtype=float, name="amount"), pd.Series(dtype=float, name=fiat_column)
+
+    until = pd.Timestamp.utcnow() if until is None else pd.Timestamp(until)
+
+    if until.tzinfo is not None:
+        until = until.tz_convert("UTC").tz_localize(None)
+
+    days = pd.date_range(rollup_df.index.min(), until.normalize(), freq="D")
+    reindexed_df = rollup_df.reindex(days)
+
+    staking = reindexed_df["staking"].fillna(False).astype(bool)
+    carried_staking = reindexed_df["last_staking"].astype(float).ffill().shift(1).fillna(0) > 0
+    staking_mask = (staking | carried_staking).values
+
+    totals_df = reindexed_df[["amount", fiat_column]].astype(float).fillna(0)
+    totals_df[~staking_mask] = np.nan
+    totals_df.index = days.date
+
+    return totals_df["amount"], totals_df[fiat_column]
@@ -0,0 +1,206 @@
+import hashlib
+
+import numpy as np
+
+from poktbot.storage.compact import HASH_BYTES
+
+
+def _mix(words):
+    """
+    Finalizer of splitmix64, which spreads every bit of the given 64 bits words over the whole word.
+    """
+    with np.errstate(over="ignore"):
+        words = (words ^ (words >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        words = (words ^ (words >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return words ^ (words >> np.uint64(31))
+
+
+def _fingerprints(hashes):
+    """
+    Computes two 64 bits fingerprints of each hash, from which the positions of the hash in a bloom filter are derived.
+
+    Binary hashes (see `encode_transactions()`) are folded from their four 64 bits words. Hashes kept as strings are
+    digested first.
+    """
+    if all(isinstance(tx_hash, bytes) for tx_hash in hashes):
+        words = np.frombuffer(np.asarray(hashes, dtype=f"S{HASH_BYTES}").tobytes(), dtype="<u8").reshape(-1, 4)
+    else:
+        digests = b"".join(hashlib.blake2b(tx_hash if isinstance(tx_hash, bytes) else str(tx_hash).encode("utf-8"),
+                                           digest_size=16).digest() for tx_hash in hashes)
+        words = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+
+    first = _mix(words[:, 0])
+
+    for column in range(1, words.shape[1]):
+        first = _mix(first ^ words[:, column])
+
+    return first, _mix(first ^ np.uint64(0x9E3779B97F4A7C15)) | np.uint64(1)
+
+
+class BloomFilter:
+    """
+    Bloom filter of a fixed capacity, for a false positive rate of about 1% with the default params.
+    """
+    def __init__(self, capacity, bits_per_hash=10, probes=7):
+        self._capacity = int(capacity)
+        self._size = max(self._capacity * bits_per_hash, 64)
+        self._probes = probes
+        self._bits = np.zeros((self._size + 7) // 8, dtype=np.uint8)
+        self._count = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def free(self):
+        return self._capacity - self._count
+
+    @property
+    def nbytes(self):
+        return self._bits.nbytes
+
+    def _positions(self, fingerprints):
+        first, second = fingerprints
+        probes = np.arange(self._probes, dtype=np.uint64)
+
+        with np.errstate(over="ignore"):
+            return (first[:, None] + probes[None, :] * second[:, None]) % np.uint64(self._size)
+
+    def add(self, fingerprints):
+        positions = self._positions(fingerprints).ravel()
+        np.bitwise_or.at(self._bits, positions >> np.uint64(3),
+                         np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8)))
+        self._count += len(fingerprints[0])
+
+    def contains(self, fingerprints):
+        positions = self._positions(fingerprints)
+        found = (self._bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+
+        return found.all(axis=1)
+
+
+class HashIndex:
+    """
+    Index of the hashes of the stored transactions of a node, so that the transactions delivered again (after a
+    rollback or a restart) are dropped on ingest in O(new transactions), without scanning the history.
+
+    The hashes are kept in a scalable bloom filter (filters of doubling capacity), which takes about 10 bits per
+    transaction. Transactions found in the filter are verified exactly against the stored transactions of the same
+    height (transactions are stored sorted by height), so a false positive never drops a transaction.
+
+    The index covers the first `rows` stored transactions: since transactions are appended only, it is extended with
+    the transactions stored afterwards when it is used.
+
+    Usage example:
+
+        >>> hash_index = HashIndex()
+        >>> hash_index.extend(stored_table)
+        >>> transactions_df = transactions_df[~hash_index.duplicated(stored_table, transactions_df)]
+    """
+    def __init__(self, initial_capacity=4096):
+        """
+        Constructor of the class.
+
+        :param initial_capacity:
+            Number of hashes of the first bloom filter. Each new filter doubles the capacity of the previous one.
+        """
+        self._filters = [BloomFilter(initial_capacity)]
+        self._rows = 0
+        self._last_height = None
+        self._sorted = True
+
+    @property
+    def rows(self):
+        """
+        Number of stored transactions covered by the index.
+        """
+        return self._rows
+
+    @property
+    def nbytes(self):
+        return sum(bloom_filter.nbytes for bloom_filter in self._filters)
+
+    def _add(self, hashes):
+        fingerprints = _fingerprints(hashes)
+        offset = 0
+
+        while offset < len(hashes):
+            bloom_filter = self._filters[-1]
+
+            if bloom_filter.free <= 0:
+                bloom_filter = BloomFilter(bloom_filter.capacity * 2)
+                self._filters.append(bloom_filter)
+
+            count = min(bloom_filter.free, len(hashes) - offset)
+            bloom_filter.add((fingerprints[0][offset:offset + count], fingerprints[1][offset:offset + count]))
+            offset += count
+
+    def extend(self, stored_table):
+        """
+        Adds the stored transactions not covered by the index yet.
+
+        :param stored_table:
+            ChunkedTable with the encoded transactions stored for the node. They must start with the transactions
+            already covered.
+        """
+        appended_df = stored_table.tail(self._rows)
+
+        if appended_df.shape[0] == 0:
+            return
+
+        heights = appended_df["height"].values
+
+        # The exact verification looks up the stored transactions by height, so it must know if they are sorted
+        if (self._last_height is not None and heights[0] < self._last_height) or np.any(np.diff(heights) < 0):
+            self._sorted = False
+
+        self._add(appended_df["hash"].values.tolist())
+        self._rows = stored_table.rows
+        self._last_height = heights[-1]
+
+    def duplicated(self, stored_table, transactions_df):
+        """
+        Finds which of the given transactions are already stored.
+
+        :param stored_table:
+            ChunkedTable with the encoded transactions stored for the node, covered by the index (see `extend()`).
+
+        :param transactions_df:
+            Encoded transactions to ingest.
+
+        :returns:
+            Boolean np.ndarray, True for the transactions already stored.
+        """
+        duplicated = np.zeros(transactions_df.shape[0], dtype=bool)
+
+        if transactions_df.shape[0] == 0 or self._rows == 0:
+            return duplicated
+
+        hashes = transactions_df["hash"].values.tolist()
+        fingerprints = _fingerprints(hashes)
+        candidates = np.flatnonzero(np.logical_or.reduce([bloom_filter.contains(fingerprints)
+                                                          for bloom_filter in self._filters]))
+
+        if len(candidates) == 0:
+            return duplicated
+
+        if not self._sorted:
+            stored_hashes = {tx_hash for chunk in stored_table.chunks for tx_hash in chunk["hash"].values.tolist()}
+            duplicated[candidates] = [hashes[candidate] in stored_hashes for candidate in candidates]
+            return duplicated
+
+        heights = transactions_df["height"].values[candidates]
+
+        # Candidates are looked up among the stored transactions of their height, chunk by chunk
+        for chunk in stored_table.chunks:
+            stored_hashes = chunk["hash"].values
+            stored_heights = chunk["height"].values
+            starts = np.searchsorted(stored_heights, heights, side="left")
+            ends = np.searchsorted(stored_heights, heights, side="right")
+
+            duplicated[candidates] |= [start < end and hashes[candidate] in stored_hashes[start:end].tolist()
+                                       for candidate, start, end in zip(candidates, starts, ends)]
+
+        return duplicated
@@ -0,0 +1,218 @@
+import sys
+import weakref
+from collections import OrderedDict
+from threading import Lock
+
+import pandas as pd
+
+from poktbot.storage.chunked import ChunkedTable
+
+
+class LazyValue:
+    """
+    Placeholder for a value that is kept in the storage until it is accessed for the first time.
+    """
+    def __init__(self, loader):
+        """
+        Constructor of the class.
+
+        :param loader:
+            Callable without arguments that retrieves the value from the storage.
+        """
+        self._loader = loader
+
+    def load(self):
+        return self._loader()
+
+
+class LRUMemoryBudget:
+    """
+    Keeps track of the values loaded by `LazyRecord` objects, evicting the least recently used ones back to their
+    `LazyValue` placeholder when the memory they take exceeds the budget.
+
+    Values are tracked by their path in the storage (the name of the record and the key of the value), so that a
+    record replaced by a copy of it (as bulk operations do) keeps the values it shares with the replaced one tracked
+    just once. Records are only weakly referenced.
+
+    Only values that are also in the storage can be tracked. A value assigned to a record is untracked, so that
+    modified values are never evicted before being stored.
+    """
+    def __init__(self, max_bytes=None):
+        """
+        Constructor of the class.
+
+        :param max_bytes:
+            Maximum number of bytes for the tracked values. None for no limit (values are never evicted).
+        """
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    @staticmethod
+    def _sizeof(value):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return int(value.memory_usage(deep=True, index=True).sum())
+
+        if isinstance(value, ChunkedTable):
+            return value.nbytes
+
+        return sys.getsizeof(value)
+
+    @staticmethod
+    def _path(record, key):
+        return record.name, key
+
+    def track(self, record, key, loader):
+        """
+        Tracks the value currently stored in the record for the given key.
+
+        :param record:
+            LazyRecord containing the value.
+
+        :param key:
+            Key of the value in the record.
+
+        :param loader:
+            Callable without arguments that retrieves the value from the storage once evicted.
+        """
+        value = dict.get(record, key)
+        path = self._path(record, key)
+        nbytes = self._sizeof(value)
+
+        with self._lock:
+            self._discard(path)
+            self._entries[path] = (weakref.ref(record), key, value, loader, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def untrack(self, record, key):
+        with self._lock:
+            self._discard(self._path(record, key))
+
+    def _rebind(self, path, record, key):
+        """
+        Makes the entry of the given path refer to the given record, if the record holds its value (for example, the
+        copy of a record that replaced it). Must be invoked under the lock.
+
+        :returns:
+            True if the record holds the tracked value. False otherwise.
+        """
+        entry = self._entries.get(path)
+
+        if entry is None or entry[2] is not dict.get(record, key):
+            return False
+
+        if entry[0]() is not record:
+            self._entries[path] = (weakref.ref(record),) + entry[1:]
+
+        return True
+
+    def is_tracked(self, record, key):
+        with self._lock:
+            return self._rebind(self._path(record, key), record, key)
+
+    def touch(self, record, key):
+        with self._lock:
+            path = self._path(record, key)
+
+            if self._rebind(path, record, key):
+                self._entries.move_to_end(path)
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+
+        if entry is not None:
+            self._bytes -= entry[4]
+
+    def _evict(self):
+        # Values of records no longer referenced are released first
+        for path in [path for path, entry in self._entries.items() if entry[0]() is None]:
+            self._discard(path)
+
+        while self._max_bytes is not None and self._bytes > self._max_bytes and len(self._entries) > 0:
+            _, (record_ref, key, value, loader, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            record = record_ref()
+
+            if record is not None and dict.get(record, key) is value:
+                dict.__setitem__(record, key, LazyValue(loader))
+
+
+class LazyRecord(dict):
+    """
+    Dictionary whose values can be `LazyValue` placeholders, which are transparently loaded on first access.
+
+    Placeholders are kept when iterating the raw content through `dict.items(record)`, so that storages can tell which
+    values were never loaded (and hence, never modified).
+
+    If a memory budget is given, loaded values are tracked by it so that they can be evicted later. Records tracked by
+    the same budget must have different names (such as their key in the storage).
+    """
+    def __init__(self, *args, memory_budget=None, name=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._memory_budget = memory_budget
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def _resolve(self, key, value):
+        if isinstance(value, LazyValue):
+            lazy_value = value
+            value = lazy_value.load()
+            super().__setitem__(key, value)
+
+            if self._memory_budget is not None:
+                self._memory_budget.track(self, key, lazy_value.load)
+
+        elif self._memory_budget is not None:
+            self._memory_budget.touch(self, key)
+
+        return value
+
+    def is_loaded(self, key):
+        return not isinstance(super().get(key), LazyValue)
+
+    def __getitem__(self, key):
+        return self._resolve(key, super().__getitem__(key))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+
+        if self._memory_budget is not None:
+            self._memory_budget.untrack(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def pop(self, key, *args):
+        if self._memory_budget is not None:
+            self._memory_budget.untrack(self, key)
+
+        value = super().pop(key, *args)
+        return value.load() if isinstance(value, LazyValue) else value
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def copy(self):
+        return LazyRecord(dict.items(self), memory_budget=self._memory_budget, name=self._name)
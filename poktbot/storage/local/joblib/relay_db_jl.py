@@ -1,15 +1,31 @@
+import hashlib
 import os.path
-from contextlib import contextmanager
+from threading import Event, Lock, Thread
 
 from poktbot.config import get_config
 from poktbot.log import poktbot_logging
+from poktbot.storage.chunked import ChunkedTable, tail_rows
+from poktbot.storage.compact import concat_tables
+from poktbot.storage.lazy_record import LazyRecord, LazyValue, LRUMemoryBudget
+from poktbot.storage.local.joblib.wal import TableAppend, WriteAheadLog
 from poktbot.storage.relay_db import RelayDB
-from poktbot.constants import __db_version__
 
 from timeit import default_timer as timer
 from datetime import timedelta
 
 import joblib
+import pandas as pd
+
+
+class StoredTable:
+    """
+    Reference, in the index file, to a table of a record (a DataFrame or a ChunkedTable, like the transactions of a
+    node) that is stored in its own payload file.
+    """
+    def __init__(self, table_id, rows, chunked=False):
+        self.table_id = table_id
+        self.rows = rows
+        self.chunked = chunked
 
 
 class RelayDBjl(RelayDB):
@@ -17,94 +33,346 @@ class RelayDBjl(RelayDB):
     RelayDB using the JobLib backend.
 
     JobLib allows storing data using several compression methods and levels.
+
+    The database file is a small index with the content of the DB, but the tables of each record (like the transactions
+    of a node) are stored in their own payload files in the folder `<filename>.tables`. Only the tables modified since
+    the last dump are written. On load, only the index is read: tables are loaded on first access, and evicted back to
+    disk (least recently used first) when they exceed `SERVER.database_memory_budget` MB.
+
+    If `SERVER.database_wal` is enabled, mutations are appended to a write-ahead log instead of dumping the whole
+    database on each of them. A background flusher writes the full snapshot after `SERVER.database_wal_max_mutations`
+    mutations or `SERVER.database_wal_flush_interval` seconds, and the log is replayed on `load()`.
     """
     def __init__(self, filename, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        config = get_config()
+
         self._logger = poktbot_logging.get_logger("RelayDB-JobLib")
         self._filename = filename
-        self._synchronize = True
+        self._tables_folder = f"{filename}.tables"
+
+        memory_budget = config.get("SERVER.database_memory_budget", 512)
+        self._memory_budget = LRUMemoryBudget(int(float(memory_budget) * 1024 ** 2)
+                                              if memory_budget is not None else None)
+        self._stored_rows = {}
+        self._stored_chunked = {}
+
+        self._wal = None
+        self._wal_rows = {}
+        self._wal_chunked = {}
+        self._wal_mutations = 0
+        self._wal_max_mutations = int(config.get("SERVER.database_wal_max_mutations", 50))
+        self._wal_flush_interval = float(config.get("SERVER.database_wal_flush_interval", 300))
+        self._snapshot_lock = Lock()
+        self._flusher_event = Event()
+        self._flusher_thread = None
 
         if len(args) + len(kwargs) == 0:
+            if str(config.get("SERVER.database_wal", False)).lower() == "true":
+                self._wal = WriteAheadLog(f"{filename}.wal")
+
             self.load()
 
-    @property
-    def db_version(self):
-        return self.get("db_version", "unknown")
+            if self._wal is not None:
+                self._flusher_thread = Thread(target=self._flusher_func, daemon=True)
+                self._flusher_thread.start()
+
+    @staticmethod
+    def _table_id(key, subkey):
+        return hashlib.sha1(repr((key, subkey)).encode("utf-8")).hexdigest()[:16]
+
+    def _table_filename(self, table_id):
+        return os.path.join(self._tables_folder, f"{table_id}.jl")
+
+    def _table_loader(self, table_id):
+        return lambda: joblib.load(self._table_filename(table_id))
+
+    def _lazy_record(self, key, record):
+        """
+        Wraps the given record (stored under the given key) into a LazyRecord whose stored tables are loaded on first
+        access.
+        """
+        lazy_record = LazyRecord(memory_budget=self._memory_budget, name=key)
+
+        for subkey, subvalue in dict.items(record):
+            if isinstance(subvalue, StoredTable):
+                subvalue = LazyValue(self._table_loader(subvalue.table_id))
+
+            dict.__setitem__(lazy_record, subkey, subvalue)
+
+        return lazy_record
+
+    def _snapshot_content(self):
+        """
+        Copies the content of this DB (records are copied too), and lists the tables of the records that are already
+        stored. Must be invoked under the lock.
+        """
+        content = {}
+        stored_tables = set()
+
+        for key, value in dict.items(self):
+            if isinstance(value, dict):
+                for subkey, subvalue in dict.items(value):
+                    if isinstance(subvalue, LazyValue) or \
+                            (isinstance(value, LazyRecord) and self._memory_budget.is_tracked(value, subkey)):
+                        stored_tables.add((key, subkey))
+
+                value = dict(dict.items(value))
+
+            content[key] = value
+
+        return content, stored_tables
+
+    def _write_snapshot(self, content, stored_tables):
+        """
+        Writes the tables that are not stored yet into their payload files, and the rest of the content into the index.
+
+        :returns:
+            List of (key, subkey, table) written.
+        """
+        os.makedirs(self._tables_folder, exist_ok=True)
+        written_tables = []
+        index = {}
+
+        for key, value in content.items():
+            if isinstance(value, dict):
+                record = {}
+
+                for subkey, subvalue in value.items():
+                    if isinstance(subvalue, (LazyValue, pd.DataFrame, ChunkedTable)):
+                        table_id = self._table_id(key, subkey)
+
+                        if (key, subkey) not in stored_tables:
+                            tmp_filename = f"{self._table_filename(table_id)}.tmp"
+                            joblib.dump(subvalue, tmp_filename, compress=("lz4", 1))
+                            os.replace(tmp_filename, self._table_filename(table_id))
+
+                            written_tables.append((key, subkey, subvalue))
+                            self._stored_rows[(key, subkey)] = subvalue.shape[0]
+                            self._stored_chunked[(key, subkey)] = isinstance(subvalue, ChunkedTable)
+
+                        subvalue = StoredTable(table_id, self._stored_rows.get((key, subkey)),
+                                               self._stored_chunked.get((key, subkey), False))
+
+                    record[subkey] = subvalue
+
+                value = record
+
+            index[key] = value
+
+        tmp_filename = f"{self._filename}.tmp"
+        joblib.dump(index, tmp_filename, compress=("lz4", 1))
+        os.replace(tmp_filename, self._filename)
+
+        # Payloads of tables no longer referenced are removed
+        referenced_filenames = {f"{subvalue.table_id}.jl" for value in index.values() if isinstance(value, dict)
+                                for subvalue in value.values() if isinstance(subvalue, StoredTable)}
+
+        for filename in os.listdir(self._tables_folder):
+            if filename not in referenced_filenames:
+                os.remove(os.path.join(self._tables_folder, filename))
+
+        return written_tables
+
+    def _track_written_tables(self, written_tables):
+        """
+        Tracks the written tables in the memory budget, so that they can be evicted. Must be invoked under the lock.
+        """
+        for key, subkey, table in written_tables:
+            record = dict.get(self, key)
+
+            if not isinstance(record, dict):
+                continue
 
-    @property
-    def db_currency(self):
-        return self.get("db_currency", "eur")
+            if not isinstance(record, LazyRecord):
+                record = self._lazy_record(key, record)
+                dict.__setitem__(self, key, record)
+
+            if dict.get(record, subkey) is table:
+                self._memory_budget.track(record, subkey, self._table_loader(self._table_id(key, subkey)))
 
     def dump(self):
         """
         Dumps the contents of this DB into the JobLib file
         """
         start = timer()
-        with self._lock:
-            os.makedirs(os.path.dirname(self._filename), exist_ok=True)
-            joblib.dump(dict(self), self._filename, compress=("lz4", 1))
+
+        with self._snapshot_lock:
+            # The snapshot is written out of the lock, so records are copied to isolate them from new mutations.
+            # In WAL mode, those mutations are logged in the new WAL, which is replayed on top of this snapshot.
+            with self._lock:
+                content, stored_tables = self._snapshot_content()
+
+                if self._wal is not None:
+                    self._wal.rotate()
+                    self._wal_mutations = 0
+
+            written_tables = self._write_snapshot(content, stored_tables)
+
+            if self._wal is not None:
+                self._wal.discard_rotated()
+
+            with self._lock:
+                self._track_written_tables(written_tables)
+
         end = timer()
-        self._logger.info(f"Dumped database to {self._filename} ({timedelta(seconds=end - start)} s)")
+        self._logger.info(f"Dumped database to {self._filename}; {len(written_tables)} tables written "
+                          f"({timedelta(seconds=end - start)} s)")
 
     def load(self):
         """
-        Loads the content from the DB
+        Loads the content from the DB. Tables of the records are not loaded until they are accessed.
         """
-        config = get_config()
         start = timer()
         self.clear()
+        self._wal_rows = {}
+        self._wal_chunked = {}
+        self._stored_rows = {}
+        self._stored_chunked = {}
+        replayed_entries = 0
 
         try:
             with self._lock:
-                self.update(joblib.load(self._filename))
+                for key, value in joblib.load(self._filename).items():
+                    if isinstance(value, dict):
+                        self._stored_rows.update({(key, subkey): subvalue.rows for subkey, subvalue in value.items()
+                                                  if isinstance(subvalue, StoredTable)})
+                        self._stored_chunked.update({(key, subkey): getattr(subvalue, "chunked", False)
+                                                     for subkey, subvalue in value.items()
+                                                     if isinstance(subvalue, StoredTable)})
+                        value = self._lazy_record(key, value)
+
+                    dict.__setitem__(self, key, value)
+
         except (FileNotFoundError, EOFError):
             self._logger.warning("Could not load the database, file doesn't exist. Is it a new instance?")
 
-        end = timer()
-        self._logger.info(f"Loaded database from {self._filename} ({timedelta(seconds=end - start)} s)")
+        if self._wal is not None:
+            with self._lock:
+                for entry in self._wal.replay():
+                    for key, value in entry:
+                        super().__setitem__(key, self._apply_wal_value(self.get(key), value))
+
+                    replayed_entries += 1
+
+                # Logged tables sizes start from the loaded content
+                for key, value in self.items():
+                    self._wal_value(key, value)
+
+                # Records created by the WAL replay are wrapped too
+                for key, value in dict.items(self):
+                    if isinstance(value, dict) and not isinstance(value, LazyRecord):
+                        dict.__setitem__(self, key, self._lazy_record(key, value))
 
-        # If the DB version does not match the current expected DB version, we flush the contents.
-        if self.db_version != __db_version__:
-            self._logger.warning(f"The database has version {self.db_version}, but this instance requires "
-                                 f"{__db_version__}. Flushing the content...")
-            self.flush()
+        end = timer()
+        self._logger.info(f"Loaded database from {self._filename} ({timedelta(seconds=end - start)} s; "
+                          f"{replayed_entries} WAL entries replayed)")
 
-        currency_symbol = config.get("PRICE.currency", "eur")
+        flushed = self._check_loaded_content()
 
-        # If the DB currency does not match the current expected DB currency, we flush the contents.
-        if self.db_currency != currency_symbol:
-            self._logger.warning(f"The database has currency {self.db_currency}, but this instance requires "
-                                 f"{currency_symbol}. Flushing the content...")
-            self.flush()
+        # The replayed WAL is merged into a new snapshot; also a flushed content must not be rebuilt from an old WAL.
+        if self._wal is not None and (replayed_entries > 0 or flushed):
+            self.dump()
 
-    def flush(self):
+    @classmethod
+    def read_content(cls, filename):
         """
-        Flushes this DB instance, meaning that its content is cleared and the version is set.
+        Reads the whole content of a database dumped by this backend, so that other backends can import it. Stored
+        tables are loaded and the WAL (if any) is replayed on top of them. The database files are not modified.
+
+        :param filename:
+            Filename of the database.
+
+        :returns:
+            Dictionary with the content of the database. Records are plain dictionaries.
         """
-        config = get_config()
-        currency_symbol = config.get("PRICE.currency", "eur")
+        # The instance is not loaded on construction, so that it doesn't start a WAL flusher
+        relay_db = cls(filename, {})
+        relay_db.load()
 
-        self.clear()
-        self.update({'db_version': __db_version__})
-        self.update({'db_currency': currency_symbol})
+        for entry in WriteAheadLog(f"{filename}.wal").replay():
+            for key, value in entry:
+                dict.__setitem__(relay_db, key, cls._apply_wal_value(relay_db.get(key), value))
 
-    def __setitem__(self, key, value):
-        super(RelayDBjl, self).__setitem__(key, value)
-        if self._synchronize:
-            self.dump()
+        return {key: dict(value.items()) if isinstance(value, dict) else value for key, value in dict.items(relay_db)}
 
-    @contextmanager
-    def bulk_op(self):
+    def _wal_value(self, key, value, subkey=None):
         """
-        Yields an object that allows to make several operations at once before dumping.
+        Builds the value to log in the WAL for the given key. Tables (DataFrames or ChunkedTables) that grew since they
+        were last logged are logged as the appended rows only, and tables inside a record that did not grow are not
+        logged at all.
+        """
+        if isinstance(value, dict) and subkey is None:
+            logged_value = {}
+
+            for subkey, subvalue in dict.items(value):
+                # Tables not loaded were not modified
+                if isinstance(subvalue, LazyValue):
+                    continue
+
+                subvalue = self._wal_value(key, subvalue, subkey=subkey)
+
+                if not (isinstance(subvalue, TableAppend) and subvalue.rows.shape[0] == 0):
+                    logged_value[subkey] = subvalue
+
+            return logged_value
+
+        if isinstance(value, (pd.DataFrame, ChunkedTable)):
+            chunked = isinstance(value, ChunkedTable)
+            logged_rows = self._wal_rows.get((key, subkey), self._stored_rows.get((key, subkey)))
+            logged_chunked = self._wal_chunked.get((key, subkey), self._stored_chunked.get((key, subkey), False))
+            self._wal_rows[(key, subkey)] = value.shape[0]
+            self._wal_chunked[(key, subkey)] = chunked
+
+            # Tables converted into chunked tables are logged whole once, since their rows might be encoded differently
+            if logged_rows is not None and value.shape[0] >= logged_rows and chunked == logged_chunked:
+                value = TableAppend(logged_rows, tail_rows(value, logged_rows))
+
+        return value
+
+    @classmethod
+    def _apply_wal_value(cls, current_value, value):
+        if isinstance(value, dict):
+            # Records are logged partially (only the tables that grew), so the logged values update the current record
+            record = current_value if isinstance(current_value, dict) else {}
 
-        Do not dump/load inside a bulk operation!
+            for subkey, subvalue in value.items():
+                record[subkey] = cls._apply_wal_value(record.get(subkey), subvalue)
+
+            return record
+
+        if isinstance(value, TableAppend):
+            if isinstance(current_value, ChunkedTable):
+                value = current_value.head(value.offset).append(value.rows)
+            else:
+                value = concat_tables([current_value.iloc[:value.offset], value.rows]) \
+                    if current_value is not None else value.rows
+
+        return value
+
+    def _commit(self, keys):
+        """
+        Persists the mutations of the given keys. Depending on the WAL mode, they are logged or the DB is dumped.
         """
-        aux_rdb = RelayDBjl(self._filename, self)
-        aux_rdb._synchronize = False
+        if self._wal is None:
+            self.dump()
+            return
 
         with self._lock:
-            yield aux_rdb
-            self.update(aux_rdb)
+            self._wal.append([(key, self._wal_value(key, self.get(key))) for key in keys])
+            self._wal_mutations += 1
 
-        aux_rdb.dump()
+            if self._wal_mutations >= self._wal_max_mutations:
+                self._flusher_event.set()
+
+    def _flusher_func(self):
+        while True:
+            self._flusher_event.wait(timeout=self._wal_flush_interval)
+            self._flusher_event.clear()
+
+            if self._wal_mutations > 0:
+                self.dump()
+
+    def __setitem__(self, key, value):
+        super(RelayDBjl, self).__setitem__(key, value)
+        self._commit([key])
@@ -0,0 +1,83 @@
+import os
+import pickle
+
+
+class TableAppend:
+    """
+    Entry of the write-ahead log representing the rows appended to a table (DataFrame) after its first `offset` rows.
+    """
+    def __init__(self, offset, rows):
+        self.offset = offset
+        self.rows = rows
+
+
+class WriteAheadLog:
+    """
+    Append-only log of mutations.
+
+    Each entry is pickled and synced to disk on append, so that it survives a crash. Entries are replayed in order by
+    `replay()`. When a snapshot of the content is going to be written, the log is rotated: new entries go to a new log,
+    and the rotated one is discarded once the snapshot is safely stored.
+    """
+    def __init__(self, filename):
+        self._filename = filename
+        self._rotated_filename = f"{filename}.old"
+        self._file = None
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def append(self, entry):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self._filename), exist_ok=True)
+            self._file = open(self._filename, "ab")
+
+        pickle.dump(entry, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotate(self):
+        """
+        Moves the current log to the rotated log. If a rotated log already exists, the current log is appended to it.
+        """
+        self.close()
+
+        if not os.path.exists(self._filename):
+            return
+
+        if os.path.exists(self._rotated_filename):
+            with open(self._rotated_filename, "ab") as rotated_file, open(self._filename, "rb") as f:
+                rotated_file.write(f.read())
+
+            os.remove(self._filename)
+        else:
+            os.replace(self._filename, self._rotated_filename)
+
+    def discard_rotated(self):
+        try:
+            os.remove(self._rotated_filename)
+        except FileNotFoundError:
+            pass
+
+    def replay(self):
+        """
+        Yields the logged entries in order: first the ones of the rotated log (if any), then the ones of the current log.
+
+        A truncated entry at the end of a log (for example, after a crash while appending it) is ignored.
+        """
+        for filename in [self._rotated_filename, self._filename]:
+            if not os.path.exists(filename):
+                continue
+
+            with open(filename, "rb") as f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError):
+                        break
@@ -0,0 +1,379 @@
+import hashlib
+import os
+from threading import Thread
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+from poktbot.storage.chunked import ChunkedTable, tail_rows
+from poktbot.storage.compact import concat_tables
+from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+from poktbot.storage.relay_db import RelayDB
+
+from timeit import default_timer as timer
+from datetime import timedelta
+
+import joblib
+import pandas as pd
+
+
+MANIFEST_FILENAME = "manifest.jl"
+SEGMENTS_FOLDER = "segments"
+
+
+class RelayDBSegmented(RelayDB):
+    """
+    RelayDB using append-only segments stored with the JobLib backend.
+
+    Every table found in the DB (a DataFrame or a ChunkedTable, either as a top-level value, like the prices series, or
+    inside a top-level dictionary, like the transactions of a node) is persisted as a table made of segments: one small
+    file per dump containing only the rows appended since the previous dump. The rest of the content and the list of
+    segments of each table is kept in a small manifest file, which is the only file rewritten on every dump. Chunked
+    tables are loaded back as chunked tables made of their segments.
+
+    Tables are expected to grow append-only (as the store callbacks do). If a table shrinks, it is fully rewritten.
+
+    When a table accumulates more than `SERVER.database_max_segments` segments, a background compaction merges them by
+    size tiers.
+    """
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        config = get_config()
+
+        self._logger = poktbot_logging.get_logger("RelayDB-Segmented")
+        self._filename = filename
+        self._folder = f"{filename}.segments"
+        self._max_segments = int(config.get("SERVER.database_max_segments", 24))
+
+        # Persisted state of each table: {(key, subkey): {"segments": [...], "rows": int, "next_segment": int}}
+        self._tables = {}
+        # Keys stored in the manifest
+        self._stored_keys = set()
+        self._compaction_thread = None
+
+        if len(args) + len(kwargs) == 0:
+            self.load()
+
+    @property
+    def manifest_filename(self):
+        return os.path.join(self._folder, MANIFEST_FILENAME)
+
+    def _segment_filename(self, segment_name):
+        return os.path.join(self._folder, SEGMENTS_FOLDER, segment_name)
+
+    @staticmethod
+    def _table_id(path):
+        return hashlib.sha1(repr(path).encode("utf-8")).hexdigest()[:16]
+
+    def _iter_tables(self, keys=None):
+        """
+        Iterates over the tables (DataFrames or ChunkedTables) contained in this DB, yielding the path to each of them
+        and the table.
+
+        :param keys:
+            Iterable with the keys whose tables are iterated. If None, the tables of every key are iterated.
+        """
+        for key in (super().keys() if keys is None else keys):
+            if not super().__contains__(key):
+                continue
+
+            value = super().__getitem__(key)
+
+            if isinstance(value, (pd.DataFrame, ChunkedTable)):
+                yield (key, None), value
+
+            elif isinstance(value, dict):
+                for subkey, subvalue in value.items():
+                    if isinstance(subvalue, (pd.DataFrame, ChunkedTable)):
+                        yield (key, subkey), subvalue
+
+    def _manifest_content(self):
+        """
+        Builds the content of this DB without the tables, which are referenced by the tables state instead.
+        """
+        content = {}
+
+        for key, value in super().items():
+            if isinstance(value, (pd.DataFrame, ChunkedTable)):
+                continue
+
+            if isinstance(value, dict):
+                value = {subkey: subvalue for subkey, subvalue in value.items()
+                         if not isinstance(subvalue, (pd.DataFrame, ChunkedTable))}
+
+            content[key] = value
+
+        return content
+
+    def _next_segment_name(self, path, table_state):
+        segment_name = f"{self._table_id(path)}-{table_state['next_segment']:08d}.jl"
+        table_state["next_segment"] += 1
+        return segment_name
+
+    def _write_segment(self, path, table_state, df):
+        segment_name = self._next_segment_name(path, table_state)
+        joblib.dump(df, self._segment_filename(segment_name), compress=("lz4", 1))
+        return segment_name
+
+    def _write_manifest(self):
+        manifest = {
+            "content": self._manifest_content(),
+            "tables": self._tables,
+        }
+
+        tmp_filename = f"{self.manifest_filename}.tmp"
+        joblib.dump(manifest, tmp_filename)
+        os.replace(tmp_filename, self.manifest_filename)
+
+    def _remove_segments(self, segment_names):
+        for segment_name in segment_names:
+            try:
+                os.remove(self._segment_filename(segment_name))
+            except FileNotFoundError:
+                pass
+
+    def _store_table(self, path, df):
+        """
+        Writes the rows appended to the given table since it was last stored as a new segment. Must be invoked under the
+        lock.
+
+        :returns:
+            Tuple with the new state of the table, the list of segments made obsolete and the number of new rows.
+        """
+        table_state = self._tables.get(path)
+        obsolete_segments = []
+        new_rows = 0
+
+        if table_state is None or df.shape[0] < table_state["rows"] or \
+                table_state.get("chunked", False) != isinstance(df, ChunkedTable):
+            # New table, a table that is not append-only anymore or a table converted into a chunked table (its rows
+            # might be encoded differently): we write it completely.
+            if table_state is not None:
+                obsolete_segments.extend(table_state["segments"])
+
+            next_segment = table_state["next_segment"] if table_state is not None else 0
+            table_state = {"segments": [], "rows": 0, "next_segment": next_segment}
+
+        if df.shape[0] > table_state["rows"] or len(table_state["segments"]) == 0:
+            table_state["segments"].append(self._write_segment(path, table_state, tail_rows(df, table_state["rows"])))
+            new_rows += df.shape[0] - table_state["rows"]
+            table_state["rows"] = df.shape[0]
+
+        # Chunked tables are loaded back as chunked tables, made of their segments
+        table_state["chunked"] = isinstance(df, ChunkedTable)
+
+        return table_state, obsolete_segments, new_rows
+
+    def _store(self, keys=None):
+        """
+        Stores the tables of the given keys (every key if None) as new segments, and rewrites the manifest. Keys added
+        to or removed from the DB since they were last stored are stored too.
+
+        :returns:
+            Number of new rows stored.
+        """
+        new_rows = 0
+
+        with self._lock:
+            os.makedirs(os.path.join(self._folder, SEGMENTS_FOLDER), exist_ok=True)
+
+            keys = set(super().keys()) if keys is None else set(keys)
+            keys |= self._stored_keys ^ set(super().keys())
+
+            obsolete_segments = []
+            tables = {path: table_state for path, table_state in self._tables.items() if path[0] not in keys}
+
+            for path, df in self._iter_tables(keys):
+                tables[path], table_obsolete_segments, table_new_rows = self._store_table(path, df)
+                obsolete_segments.extend(table_obsolete_segments)
+                new_rows += table_new_rows
+
+            # Tables no longer contained in the DB are removed from the storage
+            for path, table_state in self._tables.items():
+                if path not in tables:
+                    obsolete_segments.extend(table_state["segments"])
+
+            self._tables = tables
+            self._stored_keys = set(super().keys())
+
+            # The manifest is a single small file with the content of the DB other than the tables: it is rewritten
+            # as a whole.
+            self._write_manifest()
+            self._remove_segments(obsolete_segments)
+
+            requires_compaction = any(len(self._tables[path]["segments"]) > self._max_segments
+                                      for path in self._tables if path[0] in keys)
+
+        if requires_compaction:
+            self.compact(background=True)
+
+        return new_rows
+
+    def dump(self):
+        """
+        Dumps the rows appended to each table since the last dump as new segments, and rewrites the manifest.
+        """
+        start = timer()
+        new_rows = self._store()
+        end = timer()
+
+        self._logger.info(f"Dumped {new_rows} new rows to {self._folder} ({timedelta(seconds=end - start)} s)")
+
+    def load(self):
+        """
+        Loads the content from the DB, concatenating the segments of each table.
+        """
+        start = timer()
+        self.clear()
+        self._tables = {}
+        self._stored_keys = set()
+
+        try:
+            with self._lock:
+                manifest = joblib.load(self.manifest_filename)
+                self.update(manifest["content"])
+
+                for path, table_state in manifest["tables"].items():
+                    key, subkey = path
+                    segments = [joblib.load(self._segment_filename(segment_name))
+                                for segment_name in table_state["segments"]]
+                    df = ChunkedTable(segments) if table_state.get("chunked", False) else concat_tables(segments)
+
+                    if subkey is None:
+                        super().__setitem__(key, df)
+                    else:
+                        self.setdefault(key, {})[subkey] = df
+
+                self._tables = manifest["tables"]
+                self._stored_keys = set(super().keys())
+
+        except (FileNotFoundError, EOFError):
+            if os.path.exists(self._filename):
+                # A database dumped by the "joblib" backend is imported (with its tables and its WAL, if any). It will
+                # be segmented on the next dump.
+                self._logger.warning(f"Could not load the manifest; importing the joblib database {self._filename}")
+                self.update(RelayDBjl.read_content(self._filename))
+            else:
+                self._logger.warning("Could not load the database, manifest doesn't exist. Is it a new instance?")
+
+        end = timer()
+        self._logger.info(f"Loaded database from {self._folder} ({timedelta(seconds=end - start)} s)")
+
+        # Commits only store the keys they touch, so a flushed content is stored right away
+        if self._check_loaded_content():
+            self.dump()
+
+    def _merge_segments(self, segment_names):
+        """
+        Loads the given segments of a table and concatenates them into a single DataFrame.
+        """
+        return concat_tables([joblib.load(self._segment_filename(segment_name)) for segment_name in segment_names])
+
+    def _plan_compaction(self, segment_names):
+        """
+        Plans the merges of the given segments of a table, by size tiers: the trailing segments are merged until the
+        merged segment is bigger than the one before it, while there are more than the maximum number of segments.
+        Segment sizes decrease geometrically, so big segments are rarely merged again.
+
+        :returns:
+            List of tuples with the position of the first segment to merge, and the names of the segments to merge.
+        """
+        runs = [([segment_name], os.path.getsize(self._segment_filename(segment_name)))
+                for segment_name in segment_names]
+
+        while len(runs) > self._max_segments:
+            merged = [runs.pop()]
+
+            while len(runs) > 0 and (len(merged) < 2 or runs[-1][1] <= sum(size for _, size in merged)):
+                merged.insert(0, runs.pop())
+
+            runs.append(([name for names, _ in merged for name in names], sum(size for _, size in merged)))
+
+        merges = []
+        position = 0
+
+        for names, _ in runs:
+            if len(names) > 1:
+                merges.append((position, names))
+
+            position += len(names)
+
+        return merges
+
+    def compact(self, background=False):
+        """
+        Merges the segments of every table that exceeds the maximum number of segments, by size tiers (see
+        `_plan_compaction()`).
+
+        Merged segments are written out of the lock, so that dumps can keep appending segments meanwhile; only the swap
+        of the segments in the manifest is done under the lock.
+
+        :param background:
+            Boolean flag specifying if the compaction should be done in a background thread. If a compaction is already
+            running in background, no new compaction is launched.
+        """
+        if background:
+            if self._compaction_thread is None or not self._compaction_thread.is_alive():
+                self._compaction_thread = Thread(target=self.compact, daemon=True)
+                self._compaction_thread.start()
+            return
+
+        start = timer()
+        merged_segments = 0
+
+        with self._lock:
+            candidates = {path: (table_state, list(table_state["segments"]))
+                          for path, table_state in self._tables.items()
+                          if len(table_state["segments"]) > self._max_segments}
+
+        for path, (table_state, segment_names) in candidates.items():
+            try:
+                merges = self._plan_compaction(segment_names)
+            except FileNotFoundError:
+                # The table was rewritten or removed meanwhile
+                continue
+
+            for position, merged_names in merges:
+                with self._lock:
+                    merged_segment_name = self._next_segment_name(path, table_state)
+
+                try:
+                    df = self._merge_segments(merged_names)
+                    joblib.dump(df, self._segment_filename(merged_segment_name), compress=("lz4", 1))
+                except FileNotFoundError:
+                    continue
+
+                with self._lock:
+                    segments = table_state["segments"]
+
+                    # The table might have been rewritten or removed while merging; in that case we discard the merge.
+                    if self._tables.get(path) is not table_state or \
+                            segments[position:position + len(merged_names)] != merged_names:
+                        if merged_segment_name not in self._tables.get(path, {}).get("segments", []):
+                            self._remove_segments([merged_segment_name])
+                        continue
+
+                    table_state["segments"] = segments[:position] + [merged_segment_name] + \
+                        segments[position + len(merged_names):]
+                    self._write_manifest()
+                    self._remove_segments(merged_names)
+                    merged_segments += len(merged_names)
+
+        end = timer()
+        self._logger.info(f"Compacted {merged_segments} segments of {len(candidates)} tables in {self._folder} "
+                          f"({timedelta(seconds=end - start)} s)")
+
+    def _commit(self, keys):
+        """
+        Persists the mutations of the given keys: only the rows appended to their tables since they were last stored are
+        written as new segments. The manifest is rewritten as a whole.
+        """
+        start = timer()
+        new_rows = self._store(keys)
+        end = timer()
+
+        self._logger.info(f"Committed {new_rows} new rows of {len(keys)} keys to {self._folder} "
+                          f"({timedelta(seconds=end - start)} s)")
+
+    def __setitem__(self, key, value):
+        super(RelayDBSegmented, self).__setitem__(key, value)
+        self._commit([key])
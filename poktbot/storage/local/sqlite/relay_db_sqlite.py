@@ -0,0 +1,349 @@
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+from poktbot.storage.chunked import ChunkedTable, tail_rows
+from poktbot.storage.compact import decode_transactions, encode_transactions
+from poktbot.storage.lazy_record import LazyRecord, LazyValue, LRUMemoryBudget
+from poktbot.storage.relay_db import RelayDB
+
+from timeit import default_timer as timer
+from datetime import timedelta
+
+import pandas as pd
+
+
+TRANSACTIONS_KEY = "transactions"
+DTYPES_ENTRY = "__transactions_dtypes__"
+
+
+class RelayDBsqlite(RelayDB):
+    """
+    RelayDB using the SQLite backend.
+
+    The transactions of each node are stored as rows of a `transactions` table indexed by (wallet, height) and
+    (wallet, time), so that queries by node and date range are solved by SQLite without loading the whole history.
+    The rest of the content (node status, prices, ...) is stored pickled in an `entries` table.
+
+    Transactions of a node are only loaded into memory when they are accessed through the dictionary interface.
+    Consumers should prefer `query_transactions()`, which only retrieves the matching rows. Once stored, transactions
+    are kept in memory (so that the next appends don't load them again) until they exceed
+    `SERVER.database_memory_budget` MB, when the least recently used ones are released.
+    """
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        config = get_config()
+
+        self._logger = poktbot_logging.get_logger("RelayDB-SQLite")
+        self._filename = f"{os.path.splitext(filename)[0]}.sqlite"
+
+        memory_budget = config.get("SERVER.database_memory_budget", 512)
+        self._memory_budget = LRUMemoryBudget(int(float(memory_budget) * 1024 ** 2)
+                                              if memory_budget is not None else None)
+
+        # Number of transactions rows stored for each wallet, and keys stored in the entries table
+        self._rows = {}
+        self._stored_keys = set()
+        self._dtypes = {}
+
+        if len(args) + len(kwargs) == 0:
+            self.load()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self._filename), exist_ok=True)
+        connection = sqlite3.connect(self._filename, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB)")
+        return connection
+
+    @staticmethod
+    def _table_columns(connection):
+        return [row[1] for row in connection.execute("PRAGMA table_info(transactions)")]
+
+    def _insert_transactions(self, connection, transactions_df):
+        """
+        Inserts the given transactions into the transactions table, creating the table (or its missing columns) first.
+        """
+        transactions_df = transactions_df.copy()
+        transactions_df["time"] = (transactions_df["time"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+
+        columns = self._table_columns(connection)
+
+        if len(columns) == 0:
+            transactions_df.iloc[0:0].to_sql("transactions", connection, index=False)
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_wallet_height ON transactions (wallet, height)")
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_wallet_time ON transactions (wallet, time)")
+        else:
+            for column in transactions_df.columns:
+                if column not in columns:
+                    connection.execute(f'ALTER TABLE transactions ADD COLUMN "{column}"')
+
+        transactions_df.to_sql("transactions", connection, index=False, if_exists="append")
+
+    def _read_transactions(self, query, params):
+        with closing(self._connect()) as connection:
+            if len(self._table_columns(connection)) == 0:
+                return pd.DataFrame()
+
+            transactions_df = pd.read_sql_query(query, connection, params=params)
+
+        return self._decode_transactions(transactions_df)
+
+    def _iter_read_transactions(self, query, params, chunk_size):
+        with closing(self._connect()) as connection:
+            if len(self._table_columns(connection)) == 0:
+                return
+
+            for transactions_df in pd.read_sql_query(query, connection, params=params, chunksize=chunk_size):
+                yield self._decode_transactions(transactions_df)
+
+    def _decode_transactions(self, transactions_df):
+        transactions_df["time"] = pd.to_datetime(transactions_df["time"], unit="ms", utc=True)
+
+        # Times are restored with their stored resolution too
+        for column, dtype in self._dtypes.items():
+            if column in transactions_df:
+                transactions_df[column] = transactions_df[column].astype(dtype)
+
+        return transactions_df
+
+    def _load_node_transactions(self, wallet):
+        # Records keep the transactions in the compact representation and chunked, as the rest of storages do
+        transactions_df = self._read_transactions("SELECT * FROM transactions WHERE wallet = ? ORDER BY height", [wallet])
+        return ChunkedTable([encode_transactions(transactions_df)])
+
+    def _transactions_loader(self, wallet):
+        return lambda: self._load_node_transactions(wallet)
+
+    def _lazy_record(self, wallet):
+        """
+        Wraps the record of the given node into a LazyRecord tracked by the memory budget (if it isn't yet).
+        """
+        record = dict.get(self, wallet)
+
+        if not isinstance(record, LazyRecord):
+            record = LazyRecord(dict.items(record), memory_budget=self._memory_budget, name=wallet)
+            dict.__setitem__(self, wallet, record)
+
+        return record
+
+    def _release_node_transactions(self, wallet):
+        dict.__setitem__(self._lazy_record(wallet), TRANSACTIONS_KEY, LazyValue(self._transactions_loader(wallet)))
+
+    def _track_node_transactions(self, wallet):
+        """
+        Tracks the stored transactions of the given node kept in memory, so that they are released only when they
+        exceed the memory budget.
+        """
+        record = self._lazy_record(wallet)
+
+        if record.is_loaded(TRANSACTIONS_KEY) and dict.get(record, TRANSACTIONS_KEY) is not None and \
+                not self._memory_budget.is_tracked(record, TRANSACTIONS_KEY):
+            self._memory_budget.track(record, TRANSACTIONS_KEY, self._transactions_loader(wallet))
+
+    def _store_key(self, connection, key):
+        """
+        Stores the given key: its entry, and the transactions appended since they were last stored if it is a node
+        record. Keys no longer contained in the DB are removed from the storage. Must be invoked under the lock.
+
+        :returns:
+            Number of new transactions stored.
+        """
+        new_rows = 0
+
+        if not dict.__contains__(self, key):
+            connection.execute("DELETE FROM entries WHERE key = ?", [key])
+
+            if self._rows.pop(key, None) is not None:
+                connection.execute("DELETE FROM transactions WHERE wallet = ?", [key])
+
+            self._stored_keys.discard(key)
+            return new_rows
+
+        value = dict.get(self, key)
+        transactions_df = dict.get(value, TRANSACTIONS_KEY) if isinstance(value, dict) else None
+
+        if isinstance(transactions_df, (pd.DataFrame, ChunkedTable)):
+            stored_rows = self._rows.get(key, 0)
+
+            if transactions_df.shape[0] < stored_rows:
+                connection.execute("DELETE FROM transactions WHERE wallet = ?", [key])
+                stored_rows = 0
+
+            if transactions_df.shape[0] > stored_rows:
+                # Rows are inserted decoded, so that they can be queried by wallet and hash
+                appended_df = decode_transactions(tail_rows(transactions_df, stored_rows), key)
+                self._insert_transactions(connection, appended_df)
+                new_rows += transactions_df.shape[0] - stored_rows
+
+                self._dtypes.update(appended_df.dtypes.astype(str).to_dict())
+
+            self._rows[key] = transactions_df.shape[0]
+
+        elif not isinstance(value, dict) and self._rows.pop(key, None) is not None:
+            connection.execute("DELETE FROM transactions WHERE wallet = ?", [key])
+
+        if isinstance(value, dict):
+            value = {subkey: subvalue for subkey, subvalue in dict.items(value) if subkey != TRANSACTIONS_KEY}
+
+        connection.execute("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", [key, pickle.dumps(value)])
+        self._stored_keys.add(key)
+
+        return new_rows
+
+    def _store(self, keys=None):
+        """
+        Stores the given keys (every key if None) into the SQLite file, in a single SQLite transaction. Keys added to or
+        removed from the DB since they were last stored are stored too.
+
+        :returns:
+            Number of keys stored, and number of new transactions stored.
+        """
+        with self._lock, closing(self._connect()) as connection, connection:
+            keys = set(dict.keys(self)) if keys is None else set(keys)
+            keys |= self._stored_keys ^ set(dict.keys(self))
+            new_rows = sum(self._store_key(connection, key) for key in keys)
+
+            connection.execute("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)",
+                               [DTYPES_ENTRY, pickle.dumps(self._dtypes)])
+
+        # Once stored, transactions are kept in memory under the memory budget, which releases the least recently used
+        # ones. Released transactions are loaded again only if accessed.
+        for key in keys:
+            if key in self._rows:
+                self._track_node_transactions(key)
+
+        return len(keys), new_rows
+
+    def dump(self):
+        """
+        Dumps the contents of this DB into the SQLite file.
+
+        Only the transactions appended since the last dump are inserted; transactions are expected to grow append-only.
+        If the transactions of a node shrink, they are fully rewritten.
+        """
+        start = timer()
+        _, new_rows = self._store()
+        end = timer()
+
+        self._logger.info(f"Dumped {new_rows} new transactions to {self._filename} ({timedelta(seconds=end - start)} s)")
+
+    def load(self):
+        """
+        Loads the content from the DB. Transactions are not loaded until they are accessed.
+        """
+        start = timer()
+        self.clear()
+        self._rows = {}
+        self._stored_keys = set()
+
+        with self._lock, closing(self._connect()) as connection:
+            entries = {key: pickle.loads(value) for key, value in connection.execute("SELECT key, value FROM entries")}
+            self._dtypes = entries.pop(DTYPES_ENTRY, {})
+            self._stored_keys = set(entries)
+
+            if len(self._table_columns(connection)) > 0:
+                self._rows = dict(connection.execute("SELECT wallet, COUNT(*) FROM transactions GROUP BY wallet"))
+
+        for key, value in entries.items():
+            dict.__setitem__(self, key, value)
+
+            if key in self._rows:
+                self._release_node_transactions(key)
+
+        if len(entries) == 0:
+            self._logger.warning("Could not load the database, it is empty. Is it a new instance?")
+
+        end = timer()
+        self._logger.info(f"Loaded database from {self._filename} ({timedelta(seconds=end - start)} s)")
+
+        # Commits only store the keys they touch, so a flushed content is stored right away
+        if self._check_loaded_content():
+            self.dump()
+
+    def query_transactions(self, wallets=None, start=None, end=None, types=None):
+        """
+        Retrieves the stored transactions matching the given filters, solving the filters in SQLite.
+
+        Transactions modified in memory but not dumped yet are not retrieved.
+
+        :param wallets:
+            List of node addresses to retrieve transactions from. None for every node in the DB.
+
+        :param start:
+            UTC datetime from which (included) the transactions are retrieved. None for no lower limit.
+
+        :param end:
+            UTC datetime until which (excluded) the transactions are retrieved. None for no upper limit.
+
+        :param types:
+            List of transaction types to retrieve (for example, ["claim"]). None for every type.
+
+        :returns:
+            A pd.DataFrame with the matching transactions, sorted by wallet and height.
+        """
+        query, params = self._transactions_query(wallets, start, end, types)
+
+        return self._read_transactions(query, params)
+
+    def iter_transactions(self, wallets=None, start=None, end=None, types=None, chunk_size=50000):
+        """
+        Iterates over the stored transactions matching the given filters in chunks, reading them from SQLite with a
+        cursor, so that the whole result is never loaded into memory.
+
+        Transactions are yielded sorted by wallet and height. Transactions modified in memory but not dumped yet are
+        not retrieved.
+
+        :returns:
+            Generator of pd.DataFrame with the matching transactions.
+        """
+        query, params = self._transactions_query(wallets, start, end, types)
+
+        yield from self._iter_read_transactions(query, params, chunk_size)
+
+    @staticmethod
+    def _transactions_query(wallets=None, start=None, end=None, types=None):
+        """
+        Builds the SQL query (and its parameters) of the transactions matching the given filters.
+        """
+        conditions = []
+        params = []
+
+        if wallets is not None:
+            conditions.append(f"wallet IN ({', '.join('?' * len(wallets))})")
+            params.extend(wallets)
+
+        if start is not None:
+            conditions.append("time >= ?")
+            params.append(int(pd.Timestamp(start).value // 10 ** 6))
+
+        if end is not None:
+            conditions.append("time < ?")
+            params.append(int(pd.Timestamp(end).value // 10 ** 6))
+
+        if types is not None:
+            conditions.append(f"type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+
+        where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+
+        return f"SELECT * FROM transactions {where} ORDER BY wallet, height", params
+
+    def _commit(self, keys):
+        """
+        Persists the mutations of the given keys: only their entries and the transactions appended to them since they
+        were last stored are written.
+        """
+        start = timer()
+        stored_keys, new_rows = self._store(keys)
+        end = timer()
+
+        self._logger.info(f"Committed {stored_keys} keys ({new_rows} new transactions) to {self._filename} "
+                          f"({timedelta(seconds=end - start)} s)")
+
+    def __setitem__(self, key, value):
+        super(RelayDBsqlite, self).__setitem__(key, value)
+        self._commit([key])
@@ -1,5 +1,18 @@
+from contextlib import contextmanager
 from threading import Lock
 
+from poktbot.config import get_config
+from poktbot.constants import __db_version__
+from poktbot.storage.chunked import ChunkedTable, to_frame
+from poktbot.storage.compact import concat_tables, decode_transactions
+from poktbot.storage.hash_index import HashIndex
+from poktbot.storage.time_index import TimeIndex
+from poktbot.storage.transaction import RelayDBTransaction
+
+import weakref
+import numpy as np
+import pandas as pd
+
 
 class RelayDB(dict):
     """
@@ -9,6 +22,36 @@ class RelayDB(dict):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._lock = Lock()
+        self._generation = 0
+        self._generation_lock = Lock()
+        self._time_indexes = {}
+        self._time_indexes_lock = Lock()
+        self._hash_indexes = {}
+        self._hash_indexes_lock = Lock()
+
+        # Bulk operations are serialized among them, but they never block the readers
+        self._bulk_lock = Lock()
+
+    @property
+    def db_version(self):
+        return self.get("db_version", "unknown")
+
+    @property
+    def db_currency(self):
+        return self.get("db_currency", "eur")
+
+    @property
+    def generation(self):
+        """
+        Ingest generation of this DB: a counter bumped each time new data is stored, so that results computed from
+        the content (such as the cached stats) can be invalidated.
+        """
+        return self._generation
+
+    def bump_generation(self):
+        with self._generation_lock:
+            self._generation += 1
+            return self._generation
 
     def dump(self):
         """
@@ -22,8 +65,267 @@ class RelayDB(dict):
         """
         raise NotImplementedError()
 
-    def bulk_op(self):
+    def _commit(self, keys):
         """
-        Yields an object that allows to make several operations at once before dumping.
+        Persists the mutations of the given keys.
         """
         raise NotImplementedError()
+
+    @contextmanager
+    def bulk_op(self):
+        """
+        Yields a transaction (see `RelayDBTransaction`) that allows to make several operations at once before
+        committing them.
+
+        Only the keys assigned inside the operation (`db[key] = value`) are applied, all at once, and persisted: records
+        mutated in place must be assigned back. If no key is assigned, the storage is not touched at all.
+
+        Do not dump/load inside a bulk operation!
+        """
+        with self._bulk_lock:
+            transaction = RelayDBTransaction(self)
+            yield transaction
+
+            # Values are swapped in a single short critical section, so that readers see a consistent version
+            with self._lock:
+                for key, value in transaction.writes.items():
+                    dict.__setitem__(self, key, value)
+
+            dirty_keys = transaction.dirty_keys
+
+            if len(dirty_keys) == 0:
+                self._logger.debug("No keys modified in the bulk operation; nothing to commit")
+                return
+
+            self._commit(dirty_keys)
+
+    def query_transactions(self, wallets=None, start=None, end=None, types=None):
+        """
+        Retrieves the stored transactions matching the given filters, decoded from the compact representation of the
+        storage (see `decode_transactions()`).
+
+        This implementation filters the transactions kept in memory: date ranges are solved with a binary search over
+        the time-sorted index of each chunk of the transactions of a node (see `TimeIndex`). Backends able to filter in the storage itself should
+        override it.
+
+        :param wallets:
+            List of node addresses to retrieve transactions from. None for every node in the DB.
+
+        :param start:
+            UTC datetime from which (included) the transactions are retrieved. None for no lower limit.
+
+        :param end:
+            UTC datetime until which (excluded) the transactions are retrieved. None for no upper limit.
+
+        :param types:
+            List of transaction types to retrieve (for example, ["claim"]). None for every type.
+
+        :returns:
+            A pd.DataFrame with the matching transactions, sorted by wallet and height.
+        """
+        if wallets is None:
+            wallets = list(self.keys())
+
+        transactions = []
+
+        for wallet in wallets:
+            record = self.get(wallet)
+
+            if not isinstance(record, dict) or record.get("transactions") is None:
+                continue
+
+            transactions_df = self._select_transactions(wallet, record["transactions"], start, end)
+            transactions_df = transactions_df[self._transactions_mask(transactions_df, types=types)]
+            transactions.append(decode_transactions(transactions_df, wallet))
+
+        if len(transactions) == 0:
+            return pd.DataFrame()
+
+        return pd.concat(transactions, axis=0).sort_values(["wallet", "height"], kind="stable").reset_index(drop=True)
+
+    def iter_transactions(self, wallets=None, start=None, end=None, types=None, chunk_size=50000):
+        """
+        Iterates over the stored transactions matching the given filters in chunks, so that consumers processing the
+        whole history (such as exports) don't need to keep it all in memory at once.
+
+        The parameters are the same as in `query_transactions()`. Transactions are yielded node by node (in the order of
+        `wallets`), sorted by height. Each chunk has at most `chunk_size` transactions. Only the transactions within the
+        date range are visited.
+
+        :returns:
+            Generator of pd.DataFrame with the matching transactions.
+        """
+        if wallets is None:
+            wallets = list(self.keys())
+
+        for wallet in wallets:
+            record = self.get(wallet)
+
+            if not isinstance(record, dict) or record.get("transactions") is None:
+                continue
+
+            # Transactions are visited chunk by chunk, so that the history is never consolidated
+            for transactions_df, time_index in self._time_indexes_of(wallet, record["transactions"]):
+                positions = time_index.positions(start, end)
+
+                # Only the transactions within the range are visited (sliced, if they are sorted by time)
+                if isinstance(positions, slice):
+                    chunks = [slice(chunk_start, min(chunk_start + chunk_size, positions.stop))
+                              for chunk_start in range(positions.start, positions.stop, chunk_size)]
+                else:
+                    chunks = [positions[chunk_start:chunk_start + chunk_size]
+                              for chunk_start in range(0, len(positions), chunk_size)]
+
+                for chunk in chunks:
+                    chunk_df = transactions_df.iloc[chunk]
+                    chunk_df = chunk_df[self._transactions_mask(chunk_df, types=types)]
+
+                    if chunk_df.shape[0] > 0:
+                        yield decode_transactions(chunk_df, wallet).reset_index(drop=True)
+
+    def _time_indexes_of(self, wallet, table):
+        """
+        Retrieves the time-sorted index of each chunk of the given transactions of a node (see `ChunkedTable`), building
+        only the indexes of the chunks not indexed yet.
+
+        Chunks are immutable, so the indexes of a node are carried forward as new transactions are appended: only the
+        appended (or consolidated) chunks are indexed. Indexes are not kept alive beyond their chunks.
+
+        :returns:
+            List of tuples with each chunk (a pd.DataFrame) and its time index, in order.
+        """
+        chunks = table.chunks if isinstance(table, ChunkedTable) else (table,)
+
+        with self._time_indexes_lock:
+            # Indexes of replaced (or removed) transactions are dropped
+            for stale_wallet in [key for key, indexes in self._time_indexes.items()
+                                 if all(ref() is None for ref, _ in indexes)]:
+                del self._time_indexes[stale_wallet]
+
+            indexed = {id(ref()): (ref, time_index) for ref, time_index in self._time_indexes.get(wallet, [])
+                       if ref() is not None}
+            indexes = []
+
+            for chunk in chunks:
+                ref, time_index = indexed.get(id(chunk), (None, None))
+
+                if ref is None or len(time_index) != chunk.shape[0]:
+                    ref, time_index = weakref.ref(chunk), TimeIndex(chunk["time"])
+
+                indexes.append((ref, time_index))
+
+            self._time_indexes[wallet] = indexes
+
+        return [(chunk, time_index) for chunk, (_, time_index) in zip(chunks, indexes)]
+
+    def _select_transactions(self, wallet, table, start=None, end=None):
+        """
+        Selects the transactions of a node within the given range, chunk by chunk through their time-sorted indexes, so
+        that only the selected transactions are concatenated.
+        """
+        if start is None and end is None:
+            selected = list(table.chunks) if isinstance(table, ChunkedTable) else [table]
+        else:
+            selected = [chunk.iloc[time_index.positions(start, end)]
+                        for chunk, time_index in self._time_indexes_of(wallet, table)]
+
+        if len(selected) == 0:
+            return to_frame(table)
+
+        return selected[0] if len(selected) == 1 else concat_tables(selected)
+
+    def drop_stored_transactions(self, wallet, stored_table, transactions_df):
+        """
+        Drops the given transactions of a node that are already stored (or repeated among them), looking up their hashes
+        in the hash index of the node (see `HashIndex`), so that the stored history is never scanned.
+
+        :param wallet:
+            Address of the node.
+
+        :param stored_table:
+            Encoded transactions stored for the node (pd.DataFrame or ChunkedTable). None if there are none.
+
+        :param transactions_df:
+            Encoded transactions to ingest.
+
+        :returns:
+            The transactions of `transactions_df` that are not stored yet.
+        """
+        transactions_df = transactions_df[~transactions_df["hash"].duplicated().values]
+        stored_table = ChunkedTable.wrap(stored_table)
+
+        if stored_table is None or stored_table.rows == 0:
+            return transactions_df
+
+        with self._hash_indexes_lock:
+            hash_index = self._hash_indexes.get(wallet)
+
+            # Indexes covering more transactions than the stored ones (rolled back or flushed) are rebuilt
+            if hash_index is None or hash_index.rows > stored_table.rows:
+                hash_index = HashIndex()
+                self._hash_indexes[wallet] = hash_index
+
+            hash_index.extend(stored_table)
+            duplicated = hash_index.duplicated(stored_table, transactions_df)
+
+        return transactions_df[~duplicated]
+
+    @staticmethod
+    def _transactions_mask(transactions_df, start=None, end=None, types=None):
+        """
+        Builds the boolean mask of the transactions matching the given filters.
+        """
+        mask = np.ones(transactions_df.shape[0], dtype=bool)
+
+        if start is not None:
+            mask &= (transactions_df["time"] >= pd.Timestamp(start)).values
+
+        if end is not None:
+            mask &= (transactions_df["time"] < pd.Timestamp(end)).values
+
+        if types is not None:
+            mask &= transactions_df["type"].isin(types).values
+
+        return mask
+
+    def flush(self):
+        """
+        Flushes this DB instance, meaning that its content is cleared and the version is set.
+        """
+        config = get_config()
+        currency_symbol = config.get("PRICE.currency", "eur")
+
+        self.clear()
+        self._time_indexes.clear()
+        self._hash_indexes.clear()
+        self.update({'db_version': __db_version__})
+        self.update({'db_currency': currency_symbol})
+        self.bump_generation()
+
+    def _check_loaded_content(self):
+        """
+        Flushes the loaded content if it does not match the DB version or the currency expected by this instance.
+
+        :returns:
+            True if the content was flushed. False otherwise.
+        """
+        config = get_config()
+        flushed = False
+
+        # If the DB version does not match the current expected DB version, we flush the contents.
+        if self.db_version != __db_version__:
+            self._logger.warning(f"The database has version {self.db_version}, but this instance requires "
+                                 f"{__db_version__}. Flushing the content...")
+            self.flush()
+            flushed = True
+
+        currency_symbol = config.get("PRICE.currency", "eur")
+
+        # If the DB currency does not match the current expected DB currency, we flush the contents.
+        if self.db_currency != currency_symbol:
+            self._logger.warning(f"The database has currency {self.db_currency}, but this instance requires "
+                                 f"{currency_symbol}. Flushing the content...")
+            self.flush()
+            flushed = True
+
+        return flushed
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+
+def to_utc_datetime64(value):
+    """
+    Converts the given datetime into a naive UTC numpy datetime64 (in nanoseconds). Naive datetimes are assumed UTC.
+    """
+    value = pd.Timestamp(value)
+    value = value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+    return np.datetime64(value.tz_localize(None).to_datetime64(), "ns")
+
+
+class TimeIndex:
+    """
+    Time-sorted index of the transactions of a node, so that date range queries are solved with a binary search
+    instead of comparing the time of every transaction.
+
+    Transactions are stored sorted by height, which almost always means sorted by time too: in that case the index is
+    the time column itself and a range is a contiguous slice of the transactions. Otherwise, the positions of the
+    transactions sorted by time are kept.
+
+    Usage example:
+
+        >>> time_index = TimeIndex(transactions_df["time"])
+        >>> transactions_df.iloc[time_index.positions(start="2022-01-01", end="2023-01-01")]
+    """
+    def __init__(self, times):
+        """
+        Constructor of the class.
+
+        :param times:
+            pd.Series (or array) with the UTC datetimes of the transactions, in their stored order.
+        """
+        times = pd.DatetimeIndex(times)
+        times = times.tz_convert("UTC").tz_localize(None) if times.tz is not None else times
+        times = times.values.astype("datetime64[ns]")
+
+        # NaT compares as False, so histories with missing times are sorted too (NaT are placed at the end)
+        self._order = None if np.all(times[1:] >= times[:-1]) else np.argsort(times, kind="stable")
+        self._times = times if self._order is None else times[self._order]
+        self._valid = self._times.shape[0] - int(np.isnat(self._times).sum())
+
+    def __len__(self):
+        return self._times.shape[0]
+
+    @property
+    def sorted(self):
+        """
+        Whether the transactions were already sorted by time.
+        """
+        return self._order is None
+
+    def positions(self, start=None, end=None):
+        """
+        Retrieves the positions of the transactions within the given range, in their stored order.
+
+        :param start:
+            UTC datetime from which (included) the transactions are retrieved. None for no lower limit.
+
+        :param end:
+            UTC datetime until which (excluded) the transactions are retrieved. None for no upper limit.
+
+        :returns:
+            A slice of the transactions if they are sorted by time. An array of positions otherwise.
+        """
+        if start is None and end is None:
+            return slice(0, len(self))
+
+        first = 0 if start is None else int(np.searchsorted(self._times, to_utc_datetime64(start), side="left"))
+        last = self._valid if end is None else int(np.searchsorted(self._times, to_utc_datetime64(end), side="left"))
+        last = max(first, last)
+
+        if self._order is None:
+            return slice(first, last)
+
+        return np.sort(self._order[first:last])
@@ -0,0 +1,83 @@
+class RelayDBTransaction:
+    """
+    Bulk operation over a RelayDB (see `RelayDB.bulk_op()`), which records only the keys it touches.
+
+    Reads fall through to the DB without copying it. Records (dictionaries) are copied the first time they are read
+    (copy-on-write), so that their mutations never reach the records seen by the readers of the DB. The keys assigned
+    (`transaction[key] = value`) are applied to the DB all at once when the operation ends, by swapping the references
+    of their values: readers see either the whole previous version of a record or the whole new one, and never wait for
+    the operation.
+
+    Records mutated in place must be assigned back to be applied.
+
+    Usage example:
+
+        >>> with relay_db.bulk_op() as db:
+        >>>     node_db_persistence = db[node_address]
+        >>>     node_db_persistence["last_height"] = last_height
+        >>>     db[node_address] = node_db_persistence
+    """
+    def __init__(self, relay_db):
+        self._relay_db = relay_db
+        self._records = {}
+        self._writes = {}
+
+    @property
+    def dirty_keys(self):
+        """
+        Keys assigned in this transaction.
+        """
+        return list(self._writes)
+
+    @property
+    def writes(self):
+        """
+        Dictionary with the values assigned in this transaction.
+        """
+        return self._writes
+
+    def __getitem__(self, key):
+        if key in self._writes:
+            return self._writes[key]
+
+        if key in self._records:
+            return self._records[key]
+
+        value = self._relay_db[key]
+
+        if isinstance(value, dict):
+            # LazyRecord copies keep the values not loaded yet as placeholders
+            value = value.copy()
+            self._records[key] = value
+
+        return value
+
+    def __setitem__(self, key, value):
+        self._writes[key] = value
+
+    def __contains__(self, key):
+        return key in self._writes or key in self._relay_db
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+
+        return self[key]
+
+    def keys(self):
+        return list(self._relay_db.keys()) + [key for key in self._writes if key not in self._relay_db]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __str__(self):
+        return f"[RelayDBTransaction: {len(self._writes)} keys assigned; {len(self._records)} records read]"
+
+    def __repr__(self):
+        return str(self)
@@ -4,18 +4,13 @@ from telethon import TelegramClient, events
 
 from poktbot.config import get_config
 from poktbot.log import poktbot_logging
+from poktbot.telegram.dispatcher import MessageDispatcher
 from poktbot.telegram.rbac import get_roles
 
 import asyncio
 import os
 
 
-if hasattr(asyncio, "exceptions"):
-    ASYNCIO_TIMEOUT_ERROR = asyncio.exceptions.TimeoutError
-else:
-    ASYNCIO_TIMEOUT_ERROR = asyncio.TimeoutError
-
-
 class TelegramBot:
     """
     Representation of the telegram bot poktbot.
@@ -43,11 +38,17 @@ class TelegramBot:
 
         self._global_timeout = int(config["CONF.global_timeout"])
         self._global_periodic_time = int(config["CONF.global_periodic_time"])
+        self._global_rate = config.get("CONF.telegram_global_rate", 30)
+        self._chat_rate = config.get("CONF.telegram_chat_rate", 1)
+        self._flood_retries = int(config.get("CONF.telegram_flood_retries", 3))
 
         self._logger = poktbot_logging.get_logger("TelegramBot")
         self._thread = None
         self._lock = Lock()
+
+        # Messages sent before the bot loop is running are kept here until it starts
         self._messages_queue = []
+        self._dispatcher = None
 
         self._loop = None
         self._event = None
@@ -58,8 +59,22 @@ class TelegramBot:
         return os.path.join(self._session_path, self._session_name)
 
     def send_message(self, entity, message):
+        """
+        Sends a message to the given entity. It can be called from any thread: the message is handed to the bot loop,
+        which dispatches it right away (within the flood limits of Telegram).
+        """
         with self._lock:
-            self._messages_queue.append((entity, message))
+            if self._dispatcher is None:
+                self._messages_queue.append((entity, message))
+                return
+
+            dispatcher = self._dispatcher
+            loop = self._loop
+
+        try:
+            dispatcher.put_threadsafe(loop, entity, message)
+        except RuntimeError:
+            self._logger.warning(f"Message to entity {entity} not sent: the telegram bot is stopped")
 
     def start(self):
         self._logger.info("Telegram bot started")
@@ -73,12 +88,13 @@ class TelegramBot:
     def stop(self):
         if self._thread is not None and self._event is not None:
             self._logger.info("Telegram bot stopped")
-            self._event.set()
+            self._loop.call_soon_threadsafe(self._event.set)
             self._thread.join()
 
     def _thread_func(self):
         self._loop = asyncio.new_event_loop()
-        self._event = asyncio.Event(loop=self._loop)
+        asyncio.set_event_loop(self._loop)
+        self._event = asyncio.Event()
         self._logger.info(f"Starting telegram session on {self.session_fqpath}")
         os.makedirs(self._session_path, exist_ok=True)
 
@@ -149,27 +165,30 @@ class TelegramBot:
             """
             Main loop of the asyncio task.
 
-            It wraps the execution of the bot but checking every second if an exit was requested first.
+            It wraps the execution of the bot and the dispatch of the outbound messages until an exit is requested.
             If bot.stop() is requested, this loop will be notified and finished, hence closing the bot.
             """
             await bot_manager()
 
-            finish = False
+            dispatcher = MessageDispatcher(bot.send_message, global_rate=self._global_rate, chat_rate=self._chat_rate,
+                                           flood_retries=self._flood_retries)
+
+            # From now on, messages are handed directly to the dispatcher
+            with self._lock:
+                for entity, message in self._messages_queue:
+                    dispatcher.put(entity, message)
+
+                self._messages_queue.clear()
+                self._dispatcher = dispatcher
 
-            while not finish:
-                try:
-                    await asyncio.wait_for(self._event.wait(), timeout=1)
-                    finish = True
+            dispatcher_task = asyncio.ensure_future(dispatcher.run())
 
-                except ASYNCIO_TIMEOUT_ERROR:
-                    with self._lock:
-                        messages = list(self._messages_queue)
-                        self._messages_queue.clear()
+            await self._event.wait()
 
-                    for entity, message in messages:
-                        self._logger.info(f"Sending message \"{message[:100]}\" (truncated to 100 chars) to entity {entity}")
-                        await bot.send_message(entity, message)
+            with self._lock:
+                self._dispatcher = None
 
+            dispatcher_task.cancel()
             await bot.disconnect()
 
         # We create a future of the bot_manager
@@ -0,0 +1,221 @@
+from telethon.errors import FloodWaitError
+
+from poktbot.log import poktbot_logging
+
+from collections import deque
+import asyncio
+
+
+# Maximum length of a telegram message
+MAX_MESSAGE_LENGTH = 4096
+
+# Seconds added to the windows of the rate limiters, so that the network jitter doesn't make Telegram count a message
+# in the previous window
+WINDOW_MARGIN = 0.05
+
+
+class RateLimiter:
+    """
+    Sliding window limiter of an asyncio operation: at most `rate` operations are run in any window of one second (or
+    one operation every `1 / rate` seconds, for rates below 1), plus `WINDOW_MARGIN`. This is how the flood limits of
+    Telegram are counted, so bursts up to the rate are run at once.
+
+    It must be used from a single event loop.
+    """
+    def __init__(self, rate):
+        """
+        Constructor of the class.
+
+        :param rate:
+            Number of operations allowed per second. None for no limit.
+        """
+        self._calls = None if rate is None else max(int(rate), 1)
+        self._period = None if rate is None else max(1.0, 1 / float(rate)) + WINDOW_MARGIN
+        self._history = deque()
+        self._not_before = 0
+
+    def delay(self, seconds):
+        """
+        Delays the next operation the given number of seconds (for example, when the server asks to wait).
+        """
+        self._not_before = max(self._not_before, asyncio.get_running_loop().time() + seconds)
+
+    def idle(self, now):
+        """
+        Whether an operation would run right away at the given loop time (that is, the limiter keeps no state).
+        """
+        return now >= self._not_before and (len(self._history) == 0 or self._history[-1] <= now - self._period)
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            now = loop.time()
+
+            if now < self._not_before:
+                await asyncio.sleep(self._not_before - now)
+                continue
+
+            if self._calls is None:
+                return
+
+            while len(self._history) > 0 and self._history[0] <= now - self._period:
+                self._history.popleft()
+
+            if len(self._history) < self._calls:
+                self._history.append(now)
+                return
+
+            await asyncio.sleep(self._history[0] + self._period - now)
+
+
+class MessageDispatcher:
+    """
+    Dispatches the outbound messages of the bot as soon as they are queued, respecting the flood limits of Telegram.
+
+    Each chat has its own sender task, which is rate limited per chat (`chat_rate`), while every sender shares a global
+    limiter (`global_rate`). Messages queued for a chat while its sender waits for a slot are joined into as few messages
+    as possible (up to the telegram message length). If Telegram still asks to wait (FloodWaitError), the message is
+    retried after the requested time.
+
+    Messages are queued from any thread with `put_threadsafe()`, and dispatched by the event loop running `run()`.
+
+    Usage example:
+
+        >>> dispatcher = MessageDispatcher(bot.send_message, global_rate=30, chat_rate=1)
+        >>> task = loop.create_task(dispatcher.run())
+        >>> dispatcher.put_threadsafe(loop, entity, "Hello")
+    """
+    def __init__(self, send_func, global_rate=30, chat_rate=1, flood_retries=3, max_message_length=MAX_MESSAGE_LENGTH):
+        """
+        Constructor of the class.
+
+        :param send_func:
+            Coroutine function sending a message, with signature `send_func(entity, message)`.
+
+        :param global_rate:
+            Maximum number of messages sent per second, globally.
+
+        :param chat_rate:
+            Maximum number of messages sent per second to the same chat.
+
+        :param flood_retries:
+            Number of times a message is retried when Telegram asks to wait. The message is dropped afterwards.
+
+        :param max_message_length:
+            Maximum length of the messages built joining the queued ones.
+        """
+        self._logger = poktbot_logging.get_logger("MessageDispatcher")
+        self._send_func = send_func
+        self._global_limiter = RateLimiter(global_rate)
+        self._chat_rate = chat_rate
+        self._flood_retries = flood_retries
+        self._max_message_length = max_message_length
+
+        self._queue = None
+        self._pending = {}
+        self._senders = {}
+        self._chat_limiters = {}
+
+    def put_threadsafe(self, loop, entity, message):
+        """
+        Queues a message from any thread. It is dispatched by the given event loop (the one running `run()`).
+        """
+        loop.call_soon_threadsafe(self.put, entity, message)
+
+    def put(self, entity, message):
+        """
+        Queues a message. It must be called from the event loop running `run()`.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+
+        self._queue.put_nowait((entity, message))
+
+    async def run(self):
+        """
+        Dispatches the queued messages until cancelled.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+
+        try:
+            while True:
+                entity, message = await self._queue.get()
+                self._pending.setdefault(entity, deque()).append(message)
+
+                sender = self._senders.get(entity)
+
+                if sender is None or sender.done():
+                    self._prune_chat_limiters()
+                    self._senders[entity] = asyncio.ensure_future(self._chat_sender(entity))
+
+        finally:
+            for sender in self._senders.values():
+                sender.cancel()
+
+    async def _chat_sender(self, entity):
+        """
+        Sends the pending messages of a chat until there are no more.
+        """
+        chat_limiter = self._chat_limiters.setdefault(entity, RateLimiter(self._chat_rate))
+        pending = self._pending[entity]
+
+        while len(pending) > 0:
+            await chat_limiter.acquire()
+
+            # Messages queued while waiting for the slot are sent together
+            message = self._join_pending(pending)
+
+            for retry in range(self._flood_retries + 1):
+                await self._global_limiter.acquire()
+
+                try:
+                    preview = message[:100].replace("\n", " ")
+                    self._logger.info(f"Sending message \"{preview}\" (truncated to 100 chars) to entity {entity}")
+                    await self._send_func(entity, message)
+                    break
+
+                except FloodWaitError as e:
+                    # Flood waits apply to the whole bot, so the rest of the chats wait too
+                    chat_limiter.delay(e.seconds)
+                    self._global_limiter.delay(e.seconds)
+
+                    if retry == self._flood_retries:
+                        self._logger.warning(f"Telegram requested to wait {e.seconds} s before sending to entity "
+                                             f"{entity}")
+                        continue
+
+                    self._logger.warning(f"Telegram requested to wait {e.seconds} s before sending to entity {entity} "
+                                         f"(retry {retry + 1}/{self._flood_retries})")
+                    await chat_limiter.acquire()
+
+                except Exception as e:
+                    self._logger.error(f"Could not send message to entity {entity}: {str(e)}")
+                    break
+            else:
+                self._logger.error(f"Message to entity {entity} dropped after {self._flood_retries} retries")
+
+        del self._pending[entity]
+        del self._senders[entity]
+
+    def _prune_chat_limiters(self):
+        """
+        Drops the limiters of the chats without messages being sent, once their window is over.
+        """
+        now = asyncio.get_running_loop().time()
+
+        for entity in [entity for entity, limiter in self._chat_limiters.items()
+                       if entity not in self._senders and limiter.idle(now)]:
+            del self._chat_limiters[entity]
+
+    def _join_pending(self, pending):
+        """
+        Pops the first pending messages that fit together in one message (at least one).
+        """
+        message = pending.popleft()
+
+        while len(pending) > 0 and len(message) + 2 + len(pending[0]) <= self._max_message_length:
+            message = f"{message}\n\n{pending.popleft()}"
+
+        return message
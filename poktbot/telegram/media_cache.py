@@ -0,0 +1,226 @@
+from threading import Lock
+
+from telethon.errors import FileReferenceEmptyError, FileReferenceExpiredError, FileReferenceInvalidError, \
+    MediaEmptyError
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+from collections import OrderedDict
+import hashlib
+import os
+
+
+# Errors raised by telegram when an uploaded media can't be sent again by its reference (it must be uploaded again)
+MEDIA_REFERENCE_ERRORS = (FileReferenceEmptyError, FileReferenceExpiredError, FileReferenceInvalidError,
+                          MediaEmptyError)
+
+
+class MediaCache:
+    """
+    Least recently used cache of the media uploaded to telegram, keyed by the hash of their content.
+
+    Telegram keeps every file sent by the bot, so a file already sent to any chat can be sent again by its reference
+    (the media of the sent message) instead of uploading it again. If telegram doesn't accept the reference anymore,
+    the file is uploaded again.
+
+    Files are keyed by the SHA-256 of their content by default. Files generated from the DB (such as the balances
+    exports) can be keyed by what they are generated from instead (the ingest generation of the DB and the export
+    params), so that they don't even need to be generated again to be looked up.
+
+    Usage example:
+
+        >>> media_cache = get_media_cache()
+        >>> await media_cache.send_file(conv, graph_bytes)
+    """
+    def __init__(self, max_entries=None):
+        """
+        Constructor of the class.
+
+        :param max_entries:
+            Maximum number of media kept. Least recently used media are evicted first. By default, it is loaded from
+            config param CONF.media_cache_size.
+        """
+        self._logger = poktbot_logging.get_logger("MediaCache")
+        self._max_entries = int(max_entries if max_entries is not None else
+                                get_config().get("CONF.media_cache_size", 32))
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._uploaded_bytes = 0
+        self._saved_bytes = 0
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def uploaded_bytes(self):
+        return self._uploaded_bytes
+
+    @property
+    def saved_bytes(self):
+        """
+        Bytes that were not uploaded because the media was sent by its reference.
+        """
+        return self._saved_bytes
+
+    @staticmethod
+    def content_hash(file, chunk_size=1024 ** 2):
+        """
+        Computes the SHA-256 of the given file content.
+
+        :param file:
+            Bytes of the file, or path to the file (read in chunks of `chunk_size` bytes).
+
+        :returns:
+            Hex digest of the content.
+        """
+        digest = hashlib.sha256()
+
+        if isinstance(file, (bytes, bytearray, memoryview)):
+            digest.update(file)
+        else:
+            with open(file, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    digest.update(chunk)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def _file_size(file):
+        if isinstance(file, (bytes, bytearray, memoryview)):
+            return len(file)
+
+        return os.path.getsize(file)
+
+    async def send_cached(self, conv, key, **kwargs):
+        """
+        Sends the media cached for the given key through the conversation, if any.
+
+        :returns:
+            The sent message. None if there is no media cached for the key or telegram didn't accept its reference.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            return None
+
+        media, size = entry
+
+        try:
+            message = await conv.send_file(media, **kwargs)
+
+        except MEDIA_REFERENCE_ERRORS as e:
+            self._logger.info(f"Cached media for {key} is no longer valid ({type(e).__name__}). Uploading it again")
+
+            with self._lock:
+                self._entries.pop(key, None)
+                self._misses += 1
+
+            return None
+
+        with self._lock:
+            self._hits += 1
+            self._saved_bytes += size
+
+        self._logger.debug(f"Sent cached media for {key} ({size} bytes not uploaded)")
+        return message
+
+    async def send_file(self, conv, file, key=None, **kwargs):
+        """
+        Sends the given file through the conversation, by the reference of the media cached for it if any, or uploading
+        it (and caching its media) otherwise.
+
+        :param conv:
+            Telethon conversation to send the file to.
+
+        :param file:
+            Bytes of the file, or path to the file.
+
+        :param key:
+            Key of the file in the cache. By default, the hash of its content.
+
+        :returns:
+            The sent message.
+        """
+        key = self.content_hash(file) if key is None else key
+
+        message = await self.send_cached(conv, key, **kwargs)
+
+        if message is None:
+            message = await self.upload(conv, file, key, **kwargs)
+
+        return message
+
+    async def upload(self, conv, file, key, **kwargs):
+        """
+        Uploads the given file through the conversation, caching its media under the given key.
+
+        :returns:
+            The sent message.
+        """
+        message = await conv.send_file(file, **kwargs)
+        self.put(key, getattr(message, "media", None), self._file_size(file))
+
+        return message
+
+    def put(self, key, media, size=0):
+        """
+        Caches the media of a sent file, evicting the least recently used media if the cache is full.
+        """
+        with self._lock:
+            self._uploaded_bytes += size
+
+            if media is None or self._max_entries <= 0:
+                return
+
+            self._entries[key] = (media, size)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __str__(self):
+        return f"[MediaCache: {len(self)}/{self._max_entries} entries; {self._hits} hits; {self._misses} misses; " \
+               f"{self._saved_bytes} bytes saved]"
+
+
+_media_cache = None
+_media_cache_lock = Lock()
+
+
+def get_media_cache():
+    """
+    Global singleton for retrieving the cache of the media uploaded to telegram.
+
+    The number of media kept is loaded from the config parameter `CONF.media_cache_size`.
+
+    :return:
+        The MediaCache object
+    """
+    global _media_cache
+
+    with _media_cache_lock:
+        if _media_cache is None:
+            _media_cache = MediaCache()
+
+    return _media_cache
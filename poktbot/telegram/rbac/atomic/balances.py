@@ -1,13 +1,24 @@
-from io import BytesIO
-
 from poktbot.api import get_observer
 from poktbot.config import get_config
 from poktbot.storage import get_relaydb
+from poktbot.telegram.media_cache import get_media_cache
 from poktbot.telegram.rbac.role import Role
+from poktbot.telegram.workers import get_action_workers
+
+from telethon import Button, events
 
+import asyncio
+import os
+import re
+import tempfile
 import pandas as pd
 
-from poktbot.utils.formatting import format_date, df_to_xlsx
+from poktbot.utils.export import CSVExporter, XLSXExporter, gzip_file
+from poktbot.utils.formatting import format_dates, format_decimals
+
+
+# Number of nodes listed per page when selecting nodes
+NODES_PER_PAGE = 8
 
 
 class Balances(Role):
@@ -28,18 +39,11 @@ class Balances(Role):
         self._logger.debug("Sending CSV to user")
 
         await self._check_preconditions(menu, **kwargs)
-        conv = self._conv
-
-        balances_df = await self._generate_balances_df()
 
         if menu is not None:
             await menu.delete()
 
-        with BytesIO() as b:
-            balances_df.to_csv(b)
-            b.seek(0)
-            b.name = "balances.csv"
-            await conv.send_file(b)
+        await self._send_balances_file("balances.csv", file_format="csv")
 
         return False
 
@@ -53,62 +57,318 @@ class Balances(Role):
         self._logger.debug("Sending XLSX to user")
 
         await self._check_preconditions(menu, **kwargs)
-        conv = self._conv
-
-        balances_df = await self._generate_balances_df()
 
         if menu is not None:
             await menu.delete()
 
-        with BytesIO() as b:
-            df_to_xlsx(balances_df, b, sheet_name="Balances")
-            b.seek(0)
-            b.name = "balances.xlsx"
-            await conv.send_file(b)
+        await self._send_balances_file("balances.xlsx", file_format="xlsx")
 
         return False
 
-    async def _generate_balances_df(self):
+    async def send_filtered_balances(self, menu=None, **kwargs):
         """
-        Generates the balances dataframe
+        Builds the balances file of a period and a subset of nodes (for example, the rewards of a fiscal year) and sends
+        it through the telegram chat.
+
+        The user is asked for the period (a year, a month or a range of them, in the configured timezone), the nodes
+        to include and the format of the file.
+
+        :param menu:
+            Menu that invoked this action.
         """
-        relay_db = get_relaydb("transactions")
+        await self._check_preconditions(menu, **kwargs)
+        conv = self._conv
         config = get_config()
+
+        relay_db = get_relaydb("transactions")
+        nodes_addresses = [node.address for node in get_observer("nodes_transactions") if node.address in relay_db]
+
+        try:
+            await conv.send_message("Which period? Send a year (2022), a month (2022-03) or a range of them "
+                                    "(2022-01 2022-06). Send \"all\" for the whole history.")
+
+            response = await conv.get_response()
+            period = response.message.strip()
+
+            # If replied with a command, we abort the method.
+            if period.startswith("/"):
+                return True
+
+            try:
+                start, end = self._parse_period(period, timezone=config["CONF.timezone"])
+            except ValueError as e:
+                await conv.send_message(f"Invalid period: {str(e)}")
+                return True
+
+            nodes_addresses = await self._select_nodes(nodes_addresses)
+
+            if len(nodes_addresses) == 0:
+                await conv.send_message("No nodes selected")
+                return True
+
+            format_menu = await conv.send_message(message="Format:", buttons=[[Button.inline("CSV"),
+                                                                               Button.inline("XLSX")]])
+
+            try:
+                inline_press = await conv.wait_event(events.CallbackQuery(self.id))
+                file_format = inline_press.data.decode("UTF-8").lower()
+            finally:
+                await format_menu.delete()
+
+            self._logger.info(f"Client {self.id} requested the {file_format} balances of {len(nodes_addresses)} nodes "
+                              f"from {start} to {end}")
+
+            file_name = f"balances_{re.sub(r'[^0-9A-Za-z]+', '_', period).strip('_').lower()}.{file_format}"
+
+            await self._send_balances_file(file_name, file_format=file_format, nodes_addresses=nodes_addresses,
+                                           start=start, end=end)
+
+        except asyncio.TimeoutError as e:
+            await conv.send_message(message="Selection timed out")
+            return True
+
+        finally:
+            if menu is not None:
+                await menu.delete()
+
+        return False
+
+    async def _select_nodes(self, nodes_addresses):
+        """
+        Lets the user pick a subset of the given nodes by tapping them (every node is selected at first). Nodes are
+        listed in pages of `NODES_PER_PAGE` nodes.
+
+        :returns:
+            List of the selected node addresses, in the given order.
+        """
+        conv = self._conv
+        selected = set(nodes_addresses)
+        pages = max((len(nodes_addresses) + NODES_PER_PAGE - 1) // NODES_PER_PAGE, 1)
+        page = 0
+
+        def build_markup():
+            page_addresses = nodes_addresses[page * NODES_PER_PAGE:(page + 1) * NODES_PER_PAGE]
+            markup = [[Button.inline(f"{'✔️' if node_address in selected else '❌'} {node_address}",
+                                     data=node_address)] for node_address in page_addresses]
+
+            if pages > 1:
+                markup.append([Button.inline("⬅️", data="__previous__"),
+                               Button.inline(f"{page + 1}/{pages}", data="__page__"),
+                               Button.inline("➡️", data="__next__")])
+
+            markup.append([Button.inline("All", data="__all__"), Button.inline("Done", data="__done__")])
+            return markup
+
+        nodes_menu = await conv.send_message(message="Select the nodes:", buttons=build_markup())
+
+        try:
+            while True:
+                inline_press = await conv.wait_event(events.CallbackQuery(self.id))
+                selection = inline_press.data.decode("UTF-8")
+
+                if selection == "__done__":
+                    break
+
+                if selection == "__page__":
+                    continue
+
+                if selection in ("__previous__", "__next__"):
+                    page = (page + (1 if selection == "__next__" else -1)) % pages
+                elif selection == "__all__":
+                    selected = set(nodes_addresses) if len(selected) < len(nodes_addresses) else set()
+                elif selection in selected:
+                    selected.remove(selection)
+                elif selection in nodes_addresses:
+                    selected.add(selection)
+
+                await nodes_menu.edit(buttons=build_markup())
+        finally:
+            await nodes_menu.delete()
+
+        return [node_address for node_address in nodes_addresses if node_address in selected]
+
+    @staticmethod
+    def _parse_period(period, timezone):
+        """
+        Parses a period given as a year ("2022"), a month ("2022-03") or a range of them ("2022-01 2022-06", both
+        included) into its UTC bounds. The period is understood in the given timezone.
+
+        :returns:
+            Tuple (start, end) of UTC timestamps, `end` excluded. (None, None) for "all".
+        """
+        if period.lower() == "all":
+            return None, None
+
+        bounds = []
+
+        for token in period.split():
+            match = re.fullmatch(r"(\d{4})(?:[-/](\d{1,2}))?", token)
+
+            if match is None:
+                raise ValueError(f"{token} is not a year (YYYY) or a month (YYYY-MM)")
+
+            year = int(match.group(1))
+            month = int(match.group(2)) if match.group(2) is not None else None
+
+            if month is not None and not 1 <= month <= 12:
+                raise ValueError(f"{token} is not a valid month")
+
+            if month is None:
+                bounds.append((pd.Timestamp(year, 1, 1), pd.Timestamp(year + 1, 1, 1)))
+            else:
+                bounds.append((pd.Timestamp(year, month, 1), pd.Timestamp(year + month // 12, month % 12 + 1, 1)))
+
+        if not 1 <= len(bounds) <= 2:
+            raise ValueError("expected a year, a month or a range of them")
+
+        start, end = bounds[0][0], bounds[-1][1]
+
+        if start >= end:
+            raise ValueError("the period ends before it starts")
+
+        return start.tz_localize(timezone).tz_convert("UTC"), end.tz_localize(timezone).tz_convert("UTC")
+
+    async def _send_balances_file(self, file_name, file_format, nodes_addresses=None, start=None, end=None):
+        """
+        Sends the balances file through the telegram chat (see `_generate_balances_file()` for the params).
+
+        A file already sent (to any user) for the same content of the DB and the same params is sent again by its
+        telegram reference, without generating nor uploading it again.
+        """
+        conv = self._conv
+        relay_db = get_relaydb("transactions")
+        nodes_addresses = self._balances_nodes(relay_db, nodes_addresses)
+
+        media_cache = get_media_cache()
+        media_key = ("balances", relay_db.generation, file_name, file_format, tuple(nodes_addresses), start, end,
+                     tuple(self._balances_params().items()))
+
+        if await media_cache.send_cached(conv, media_key) is not None:
+            return
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            balances_path = await self._generate_balances_file(os.path.join(tmp_dir, file_name), file_format,
+                                                               nodes_addresses=nodes_addresses, start=start, end=end)
+            await media_cache.upload(conv, balances_path, key=media_key)
+
+    @staticmethod
+    def _balances_nodes(relay_db, nodes_addresses=None):
+        """
+        Filters the given nodes (every tracked node if None) to the ones available in the DB.
+        """
         nodes_observer = get_observer("nodes_transactions")
 
-        currency = config["PRICE.currency"]
-        currency_alias = config["PRICE.currency_alias"]
+        return [node.address for node in nodes_observer if node.address in relay_db and
+                (nodes_addresses is None or node.address in nodes_addresses)]
+
+    @staticmethod
+    def _balances_params():
+        """
+        Retrieves the params of the balances files from the config.
+        """
+        config = get_config()
+        gzip_size = config.get("CONF.export_gzip_size", 20)
+
+        return {
+            "currency": config["PRICE.currency"],
+            "currency_alias": config["PRICE.currency_alias"],
+            "timezone": config["CONF.timezone"],
+            "date_format": config["CONF.date_format"],
+            "decimal_separator": config.get("CONF.decimal_separator", ","),
+            "chunk_size": int(config.get("CONF.export_chunk_size", 50000)),
+            "gzip_size": gzip_size * 1024 ** 2 if gzip_size is not None else None,
+        }
+
+    async def _generate_balances_file(self, path, file_format, nodes_addresses=None, start=None, end=None):
+        """
+        Generates the balances file in the given format ("csv" or "xlsx") into the given path.
+
+        The balances can be limited to some nodes and to a period, which are retrieved through the indexes of the
+        storage (the rest of the history is not read).
+
+        The file is streamed from a thread of the worker pools (it needs to read the database), node by node and chunk
+        by chunk, so that the memory used doesn't depend on the size of the history.
+
+        :param nodes_addresses:
+            List of node addresses to export. None for every tracked node.
+
+        :param start:
+            UTC datetime from which (included) the balances are exported. None for no lower limit.
 
-        columns = ["Type", "Buy Amount", "Buy Cur.", "Sell Amount", "Sell Cur.", "Fee Amount (optional)",
-                   "Fee Cur. (optional)", "Exchange (optional)", "Trade Group (optional)", "Comment (optional)",
-                   "Date", "Tx-ID", f"Buy Amount {currency_alias}", "Wallet", "Chain_id", "Confirmed"]
-        content = []
+        :param end:
+            UTC datetime until which (excluded) the balances are exported. None for no upper limit.
 
-        # We only make stats for nodes available in the DB
-        nodes_addresses = [node.address for node in nodes_observer if node.address in relay_db]
+        :returns:
+            Path of the file. CSV files larger than `CONF.export_gzip_size` MB are gzipped (".gz" is appended).
+        """
+        relay_db = get_relaydb("transactions")
+
+        # We only export nodes available in the DB
+        nodes_addresses = self._balances_nodes(relay_db, nodes_addresses)
+
+        return await get_action_workers().run("balances", self._export_balances, relay_db, nodes_addresses, path,
+                                              file_format, start=start, end=end, **self._balances_params())
+
+    @staticmethod
+    def _export_balances(relay_db, nodes_addresses, path, file_format, currency, currency_alias, timezone, date_format,
+                         decimal_separator, chunk_size, gzip_size, start=None, end=None):
+        """
+        Streams the balances of the given nodes (within the given period, if any) into a file. Nodes are read one by one
+        (sorted by address), and their transactions are formatted and written in chunks of at most `chunk_size` rows.
+        """
+        columns = Balances._balances_columns(currency_alias)
+
+        if file_format == "xlsx":
+            exporter = XLSXExporter(path, columns, sheet_name="Balances")
+        else:
+            exporter = CSVExporter(path, columns)
+
+        with exporter:
+            for transactions_df in relay_db.iter_transactions(wallets=sorted(nodes_addresses), start=start, end=end,
+                                                              types=["claim"], chunk_size=chunk_size):
+                exporter.write(Balances._generate_balances_df(transactions_df, currency, currency_alias, timezone,
+                                                              date_format, decimal_separator))
 
-        for node_address in nodes_addresses:
-            transactions_df = relay_db.get(node_address, {}).get("transactions")
+        # XLSX files are already zip compressed
+        if file_format != "xlsx" and gzip_size is not None:
+            path = gzip_file(path, min_size=gzip_size)
 
-            if transactions_df is None:
-                continue
+        return path
 
-            for row_index, row_content in transactions_df.iterrows():
-                if "claim" in row_content["type"]:
-                    content_element = [
-                        "Minning",
-                        str(row_content["amount"]).replace(".", ","),
-                        "POKT", "", "", "", "", "Pocket", "", "",
-                        format_date(row_content["time"]),
-                        row_content["hash"],
-                        str(row_content[f"amount_price_{currency}"]).replace(".", ","),
-                        row_content["wallet"],
-                        row_content["chain_id"],
-                        row_content["confirmed"],
-                    ]
+    @staticmethod
+    def _balances_columns(currency_alias):
+        return ["Type", "Buy Amount", "Buy Cur.", "Sell Amount", "Sell Cur.", "Fee Amount (optional)",
+                "Fee Cur. (optional)", "Exchange (optional)", "Trade Group (optional)", "Comment (optional)",
+                "Date", "Tx-ID", f"Buy Amount {currency_alias}", "Wallet", "Chain_id", "Confirmed"]
+
+    @staticmethod
+    def _generate_balances_df(transactions_df, currency, currency_alias, timezone, date_format, decimal_separator=","):
+        """
+        Generates the balances dataframe. Every column is built at once from the columns of the transactions.
+        """
+        columns = Balances._balances_columns(currency_alias)
 
-                    content.append(content_element)
+        if transactions_df is None or transactions_df.shape[0] == 0:
+            return pd.DataFrame(columns=columns)
 
-        balances_df = pd.DataFrame(content, columns=columns)
+        balances_df = pd.DataFrame({
+            "Type": "Minning",
+            "Buy Amount": format_decimals(transactions_df["amount"], decimal_separator),
+            "Buy Cur.": "POKT",
+            "Sell Amount": "",
+            "Sell Cur.": "",
+            "Fee Amount (optional)": "",
+            "Fee Cur. (optional)": "",
+            "Exchange (optional)": "Pocket",
+            "Trade Group (optional)": "",
+            "Comment (optional)": "",
+            "Date": format_dates(transactions_df["time"], timezone=timezone, date_format=date_format),
+            "Tx-ID": transactions_df["hash"].values,
+            f"Buy Amount {currency_alias}": format_decimals(transactions_df[f"amount_price_{currency}"],
+                                                            decimal_separator),
+            "Wallet": transactions_df["wallet"].values,
+            "Chain_id": transactions_df["chain_id"].values,
+            "Confirmed": transactions_df["confirmed"].values,
+        }, index=pd.RangeIndex(transactions_df.shape[0]), columns=columns)
 
         return balances_df
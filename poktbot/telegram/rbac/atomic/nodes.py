@@ -2,7 +2,7 @@ import asyncio
 
 from telethon import Button, events
 
-from poktbot.api import get_observer
+from poktbot.api import get_observer, get_scheduler
 from poktbot.api.node import PocketNodeTransactions
 from poktbot.config import get_config
 from poktbot.telegram.exceptions.rbac_error import RBACError
@@ -54,7 +54,6 @@ class Nodes(Role):
 
             # Update the observer so that next observer update takes this node info
             observer_nodes_transactions = get_observer("nodes_transactions")
-            observer_main = get_observer("main")
 
             observer_nodes_transactions.add(PocketNodeTransactions(node_address=node_address))
 
@@ -62,7 +61,7 @@ class Nodes(Role):
             await conv.send_message(f"Node added to the system: {node_address}")
 
             # We force an update in case.
-            observer_main.trigger_update()
+            get_scheduler().trigger_update(observer_nodes_transactions.name)
 
         finally:
             await menu.delete()
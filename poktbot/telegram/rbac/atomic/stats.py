@@ -1,7 +1,10 @@
 from poktbot.api import get_observer
 from poktbot.storage import get_relaydb
 from poktbot.config import get_config
+from poktbot.stats import FleetStats, get_stats_cache
+from poktbot.telegram.media_cache import get_media_cache
 from poktbot.telegram.rbac.role import Role
+from poktbot.telegram.workers import get_action_workers
 
 import io
 import numpy as np
@@ -37,174 +40,74 @@ class Stats(Role):
         # We only make stats for nodes available in the DB
         nodes_addresses = [node.address for node in nodes_observer if node.address in relay_db]
 
-        total_amounts_df, total_amounts_eur_df = self._compute_all_nodes_totals_df(nodes_addresses=nodes_addresses)
-
-        avg_pocket_rewards_df, \
-        avg_pocket_rewards_eur_df, \
-        total_pocket_rewards_df, \
-        total_pocket_rewards_eur_df = self._generate_rewards_stats_df(total_amounts_df=total_amounts_df,
-                                                                      total_amounts_eur_df=total_amounts_eur_df)
-
-        rewards_graph_bytes = self._generate_avg_rewards_graph(total_amounts_df)
-
-        currency_symbol = config.get("PRICE.currency", "eur").upper()
-
-        message = f"📈 Stats:\n" \
-                  f"\t\t\t\t**{avg_pocket_rewards_df.iloc[1]} POKTs today (avg).**\n" \
-                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[1]} {currency_symbol}s today (avg).\n" \
-                  f"\t\t\t\t{avg_pocket_rewards_df.iloc[0]} POKTs everyday (avg).\n" \
-                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[0]} {currency_symbol}s everyday (avg).\n" \
-                  f"\t\t\t\t{avg_pocket_rewards_df.iloc[3]} POKTs this month (avg).\n" \
-                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[3]} {currency_symbol}s this month (avg).\n" \
+        currency = config.get("PRICE.currency", "eur")
+        last_days_count = int(config["CONF.last_days_stats_graph"])
+
+        # Stats only change when new transactions are stored (or when the day changes), so repeated requests are
+        # served from the cache
+        stats_cache = get_stats_cache()
+        cache_key = (relay_db.generation, currency, last_days_count, pd.Timestamp.now("UTC").date(),
+                     tuple(nodes_addresses))
+        cached_stats = stats_cache.get(cache_key)
+
+        if cached_stats is None:
+            # Rollups are read in a thread, and the stats are computed and rendered in a process of the worker pools, so
+            # that the bot keeps serving other users meanwhile
+            action_workers = get_action_workers()
+            rollups_df = await action_workers.run("stats", self._load_rollups, relay_db, nodes_addresses, currency)
+            rendered_stats = await action_workers.run("stats", self._render_stats, rollups_df, currency,
+                                                      last_days_count, process=True)
+            cached_stats = stats_cache.put(cache_key, rendered_stats)
+
+        message, rewards_graph_bytes = cached_stats
 
         await conv.send_message(message=message)
-        
-        await conv.send_file(rewards_graph_bytes)
+
+        # The same graph is sent to every requester until the stats change, so it is only uploaded once
+        await get_media_cache().send_file(conv, rewards_graph_bytes)
 
         await menu.delete()
         return True
 
     @staticmethod
-    def _compute_amount_totals(node_address):
-        config = get_config()
-        currency = config.get("PRICE.currency", "eur")
-        relay_db = get_relaydb("transactions")
-
-        transactions = relay_db[node_address]['transactions']
-        proof_transactions = transactions[transactions['type'].str.contains('claim')]
-
-        # 1. We compute the daily staking mask
-        cleaned_transactions = transactions.drop_duplicates("time").set_index("time")
-        reindexed_transactions = cleaned_transactions.reindex(pd.date_range(transactions['time'].min(),
-                                                                            pd.Timestamp.utcnow(),
-                                                                            freq=pd.Timedelta(hours=1)))
-        reindexed_transactions = pd.concat([cleaned_transactions, reindexed_transactions], axis=0).sort_index()
-        reindexed_transactions['in_staking'].fillna(method="ffill", inplace=True)
-        daily_staking_mask = reindexed_transactions.groupby(reindexed_transactions.index.date).sum()['in_staking'] > 0
-
-        # 2. Then, we compute the totals for each day
-        daily_proof_transactions = proof_transactions.groupby(proof_transactions['time'].dt.date).sum()
-        reindex_daily_proof_transactions = daily_proof_transactions.reindex(daily_staking_mask.index).fillna(0)
-        reindex_daily_proof_transactions[~daily_staking_mask] = np.nan
-        total_amount = reindex_daily_proof_transactions['amount']
-        total_amount_eur = reindex_daily_proof_transactions[f'amount_price_{currency}']
-
-        total_amount.name = transactions['wallet'].iloc[0]
-        total_amount_eur.name = transactions['wallet'].iloc[0]
+    def _load_rollups(relay_db, nodes_addresses, currency):
+        """
+        Retrieves the daily rollups of the given nodes as a single long-format table, which is cheap to send to the
+        process pool.
+        """
+        fleet_stats = FleetStats(currency=currency)
+        return fleet_stats.concat_rollups(fleet_stats.load_rollups(relay_db, nodes_addresses))
 
-        return total_amount, total_amount_eur
+    @staticmethod
+    def _render_stats(rollups, currency, last_days_count):
+        """
+        Computes the stats of the given rollups (long-format table) and renders them. It is run in the process pool of
+        the action workers, so it must not depend on the state of the bot process.
 
-    def _compute_all_nodes_totals_df(self, nodes_addresses=None):
-        if nodes_addresses is None:
-            relay_db = get_relaydb("transactions")
-            nodes_addresses = list(relay_db.keys())
+        :returns:
+            Tuple (message text, graph image bytes).
+        """
+        stats = FleetStats(currency=currency).compute(rollups)
 
-        total_amounts = []
-        total_amounts_eur = []
+        avg_pocket_rewards_df = stats.avg_rewards()
+        avg_pocket_rewards_eur_df = stats.avg_rewards(fiat=True)
 
-        for node_address in nodes_addresses:
-            total_amount, total_amount_eur = self._compute_amount_totals(node_address)
-            total_amounts.append(total_amount)
-            total_amounts_eur.append(total_amount_eur)
+        rewards_graph_bytes = Stats._generate_avg_rewards_graph(stats.daily, last_days_count=last_days_count)
 
-        total_amounts_df = pd.concat(total_amounts, axis=1)
-        total_amounts_eur_df = pd.concat(total_amounts_eur, axis=1)
+        currency_symbol = currency.upper()
 
-        return total_amounts_df, total_amounts_eur_df
+        message = f"📈 Stats:\n" \
+                  f"\t\t\t\t**{avg_pocket_rewards_df.iloc[1]} POKTs today (avg).**\n" \
+                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[1]} {currency_symbol}s today (avg).\n" \
+                  f"\t\t\t\t{avg_pocket_rewards_df.iloc[0]} POKTs everyday (avg).\n" \
+                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[0]} {currency_symbol}s everyday (avg).\n" \
+                  f"\t\t\t\t{avg_pocket_rewards_df.iloc[3]} POKTs this month (avg).\n" \
+                  f"\t\t\t\t{avg_pocket_rewards_eur_df.iloc[3]} {currency_symbol}s this month (avg).\n" \
 
-    @staticmethod
-    def _generate_rewards_stats_df(total_amounts_df, total_amounts_eur_df):
-        config = get_config()
-        currency = config.get("PRICE.currency", "eur")
-        currency_upper = currency.upper()
-
-        avg_day = total_amounts_df.mean(axis=1, skipna=True)
-        total_day = total_amounts_df.sum(axis=1, skipna=True)
-
-        avg_eur_day = total_amounts_eur_df.mean(axis=1, skipna=True)
-        total_eur_day = total_amounts_eur_df.sum(axis=1, skipna=True)
-
-        total_day.index = pd.DatetimeIndex(total_day.index)
-        avg_day.index = pd.DatetimeIndex(avg_day.index)
-
-        total_eur_day.index = pd.DatetimeIndex(total_eur_day.index)
-        avg_eur_day.index = pd.DatetimeIndex(avg_eur_day.index)
-
-        now = pd.Timestamp.now()
-        today = now.date()
-        this_month = pd.to_datetime(np.asarray([today]).astype('datetime64[M]')[0])
-
-        # We exclude current day from the avg earns daily
-        avg_day_filtered = avg_day[avg_day.index.date < today]
-        avg_earns_daily = avg_day_filtered.mean(skipna=True)
-        avg_earns_today = avg_day.reindex([today]).fillna(0).iloc[0]
-
-        # We exclude current month from the avg earns monthly
-        avg_day_filtered = avg_day[avg_day.index < this_month]
-        avg_earns_monthly = avg_day_filtered.groupby(
-            [avg_day_filtered.index.year, avg_day_filtered.index.month]).sum().mean()
-
-        avg_day_filtered = avg_day[(avg_day.index.year == today.year) & (avg_day.index.month == today.month)]
-        avg_earns_this_month = avg_day_filtered.groupby(
-            [avg_day_filtered.index.year, avg_day_filtered.index.month]).sum().mean()
-
-        # We exclude current day from the avg earns daily
-        avg_eur_day_filtered = avg_eur_day[avg_eur_day.index.date < today]
-        avg_eur_earns_daily = avg_eur_day_filtered.mean(skipna=True)
-        avg_eur_earns_today = avg_eur_day.reindex([today]).fillna(0).iloc[0]
-
-        # We exclude current month from the avg earns monthly
-        avg_eur_day_filtered = avg_eur_day[avg_eur_day.index < this_month]
-        avg_eur_earns_monthly = avg_eur_day_filtered.groupby(
-            [avg_eur_day_filtered.index.year, avg_eur_day_filtered.index.month]).sum().mean()
-
-        avg_eur_day_filtered = avg_eur_day[
-            (avg_eur_day.index.year == today.year) & (avg_eur_day.index.month == today.month)]
-        avg_eur_earns_this_month = avg_eur_day_filtered.groupby(
-            [avg_eur_day_filtered.index.year, avg_eur_day_filtered.index.month]).sum().mean()
-
-        total_earns_today = total_day.reindex([today]).fillna(0).iloc[0]
-        total_eur_earns_today = total_eur_day.reindex([today]).fillna(0).iloc[0]
-
-        total_day_filtered = total_day[(total_day.index.year == today.year) & (total_day.index.month == today.month)]
-        total_earns_this_month = total_day_filtered.fillna(0).sum()
-        total_earns_alltime = total_day.fillna(0).sum()
-
-        total_eur_day_filtered = total_eur_day[
-            (total_eur_day.index.year == today.year) & (total_eur_day.index.month == today.month)]
-        total_eur_earns_this_month = total_eur_day_filtered.reindex([today]).fillna(0).iloc[0]
-        total_eur_earns_alltime = total_eur_day_filtered.fillna(0).sum()
-
-        avg_pocket_rewards_df = pd.Series({
-            "(POKT) Daily earns (avg)": avg_earns_daily,
-            "(POKT) Today earns (avg)": avg_earns_today,
-            "(POKT) Month earns (avg)": avg_earns_monthly,
-            "(POKT) This month earns (avg)": avg_earns_this_month,
-        }).round(2)
-
-        avg_pocket_rewards_eur_df = pd.Series({
-            f"({currency_upper}) Daily earns (avg)": avg_eur_earns_daily,
-            f"({currency_upper}) Today earns (avg)": avg_eur_earns_today,
-            f"({currency_upper}) Month earns (avg)": avg_eur_earns_monthly,
-            f"({currency_upper}) This month earns (avg)": avg_eur_earns_this_month,
-        }).round(2)
-
-        total_pocket_rewards_df = pd.Series({
-            f"(POKT) Today earns (total)": total_earns_today,
-            f"(POKT) This month earns (total)": total_earns_this_month,
-            f"(POKT) All-time earns (total)": total_earns_alltime,
-        }).round(2)
-
-        total_pocket_rewards_eur_df = pd.Series({
-            f"({currency_upper}) Today earns (total)": total_eur_earns_today,
-            f"({currency_upper}) This month earns (total)": total_eur_earns_this_month,
-            f"({currency_upper}) All-time earns (total)": total_eur_earns_alltime,
-        }).round(2)
-
-        return avg_pocket_rewards_df, avg_pocket_rewards_eur_df, total_pocket_rewards_df, total_pocket_rewards_eur_df
+        return message, rewards_graph_bytes
 
     @staticmethod
-    def _generate_avg_rewards_graph(total_amounts_df, last_days_count=None, currency_name="POKT"):
+    def _generate_avg_rewards_graph(daily_df, last_days_count=None, currency_name="POKT"):
         # We create the figure
         fig = plt.figure(figsize=(10, 5))
         ax = fig.add_subplot(1, 1, 1)
@@ -213,20 +116,11 @@ class Stats(Role):
             config = get_config()
             last_days_count = int(config["CONF.last_days_stats_graph"])
 
-        now_date = pd.Timestamp.now().date()
-
-        avg_day = total_amounts_df.mean(axis=1, skipna=True)
-        nodes_count = (~total_amounts_df.isna()).sum(axis=1)
-        days_filter = avg_day.index >= now_date - pd.Timedelta(days=last_days_count)
-
-        avg_day_filtered = avg_day[days_filter]
-        nodes_count_filtered = nodes_count[days_filter]
-
-        avg_day_filtered.index = pd.DatetimeIndex(avg_day_filtered.index)
-        avg_day_filtered.name = "Average rewards"
+        today = daily_df.index.max()
+        daily_filtered_df = daily_df[daily_df.index >= today - pd.Timedelta(days=last_days_count)]
 
-        nodes_count_filtered.index = avg_day_filtered.index
-        nodes_count_filtered.name = "Number of nodes"
+        avg_day_filtered = daily_filtered_df["avg"].rename("Average rewards")
+        nodes_count_filtered = daily_filtered_df["nodes"].rename("Number of nodes")
 
         # Then we plot the graph into the figure
         avg_day_filtered.plot(title=f"Last {last_days_count} days average {currency_name.upper()} rewards by node",
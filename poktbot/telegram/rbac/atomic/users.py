@@ -4,6 +4,7 @@ from telethon import Button, events
 
 from poktbot.config import get_config
 from poktbot.telegram.exceptions.rbac_error import RBACError
+from poktbot.telegram.rbac.registry import get_acl_index
 from poktbot.telegram.rbac.role import Role
 
 
@@ -43,7 +44,7 @@ class Users(Role):
             except ValueError:
                 return True
 
-            if member_id in config['IDS.admins_ids']:
+            if get_acl_index().contains("IDS.admins_ids", member_id):
                 self._logger.info(f"Client {self.id} tried to add {member_id} as Admin, but {member_id} already configured as Admin")
                 await conv.send_message(f"User {member_id} already configured as an Admin")
                 raise RBACError(f"User {member_id} already configured as an Admin")
@@ -54,6 +55,7 @@ class Users(Role):
                 ids.append(member_id)
 
                 config['IDS.admins_ids'] = ids
+                get_acl_index().invalidate()
 
             self._logger.info(f"Client {self.id} added {member_id} as Admin")
             await conv.send_message(f"User added as admin: {member_id}")
@@ -93,7 +95,7 @@ class Users(Role):
             except ValueError:
                 return True
 
-            if member_id in config['IDS.investors_ids']:
+            if get_acl_index().contains("IDS.investors_ids", member_id):
                 self._logger.info(f"Client {self.id} tried to add {member_id} as Investor, but {member_id} already configured as Investor")
                 await conv.send_message(f"User {member_id} already configured as an Investor")
                 raise RBACError(f"User {member_id} already configured as an Investor")
@@ -104,6 +106,7 @@ class Users(Role):
                 ids.append(member_id)
 
                 config['IDS.investors_ids'] = ids
+                get_acl_index().invalidate()
 
             config.save()
 
@@ -141,9 +144,12 @@ class Users(Role):
             with self._lock:
                 ids = config['IDS.admins_ids']
                 ids = [int(i) for i in (ids if type(ids) is list else [ids]) if i != '']
-                ids.remove(member_id)
+                ids.remove(int(member_id))
 
                 config['IDS.admins_ids'] = ids
+                get_acl_index().invalidate()
+
+            config.save()
 
             self._logger.info(f"Client {self.id} removed {member_id} from Admin")
 
@@ -184,9 +190,12 @@ class Users(Role):
             with self._lock:
                 ids = config['IDS.investors_ids']
                 ids = [int(i) for i in (ids if type(ids) is list else [ids]) if i != '']
-                ids.remove(member_id)
+                ids.remove(int(member_id))
 
                 config['IDS.investors_ids'] = ids
+                get_acl_index().invalidate()
+
+            config.save()
 
             self._logger.info(f"Client {self.id} removed {member_id} from Investor")
 
@@ -1,8 +1,5 @@
-from poktbot.config import get_config
 from poktbot.telegram.rbac.atomic import Balances, Stats, Users, Nodes, Info
-
-import pkg_resources
-import yaml
+from poktbot.telegram.rbac.registry import get_acl_index, get_layout_registry
 
 
 class Admin(Users, Balances, Stats, Nodes, Info):
@@ -18,17 +15,10 @@ class Admin(Users, Balances, Stats, Nodes, Info):
         self._load_layout()
 
     def _load_layout(self):
-        with open(pkg_resources.resource_filename("poktbot", "telegram/layouts/admin.yaml"), "r") as f:
-            self._layout = yaml.safe_load(f)
+        self._layout = get_layout_registry().get("admin")
 
     def allowed(self):
-        config = get_config()
-
-        admins_ids = config.get("IDS.admins_ids", [])
-        admins_ids = admins_ids if type(admins_ids) is list else [admins_ids]
-
-        ids_list = [int(i) for i in admins_ids if i != '']
-        return self._entity.id in ids_list
+        return get_acl_index().contains("IDS.admins_ids", self._entity.id)
 
     async def menu_main(self, menu=None, **kwargs):
         """
@@ -1,8 +1,5 @@
-from poktbot.config import get_config
 from poktbot.telegram.rbac.atomic import Stats
-
-import pkg_resources
-import yaml
+from poktbot.telegram.rbac.registry import get_acl_index, get_layout_registry
 
 
 class Investor(Stats):
@@ -18,17 +15,10 @@ class Investor(Stats):
         self._load_layout()
 
     def _load_layout(self):
-        with open(pkg_resources.resource_filename("poktbot", "telegram/layouts/investor.yaml"), "r") as f:
-            self._layout = yaml.safe_load(f)
+        self._layout = get_layout_registry().get("investor")
 
     def allowed(self):
-        config = get_config()
-
-        investors_ids = config.get("IDS.investors_ids", [])
-        investors_ids = investors_ids if type(investors_ids) is list else [investors_ids]
-
-        ids_list = [int(i) for i in investors_ids if i != '']
-        return self._entity.id in ids_list
+        return get_acl_index().contains("IDS.investors_ids", self._entity.id)
 
     async def menu_main(self, menu=None, **kwargs):
         """
@@ -1,8 +1,5 @@
-from poktbot.config import get_config
 from poktbot.telegram.rbac.atomic import Balances, Server, Stats, Users, Nodes
-
-import pkg_resources
-import yaml
+from poktbot.telegram.rbac.registry import get_acl_index, get_layout_registry
 
 
 class SysAdmin(Users, Server, Balances, Stats, Nodes):
@@ -18,17 +15,10 @@ class SysAdmin(Users, Server, Balances, Stats, Nodes):
         self._load_layout()
 
     def _load_layout(self):
-        with open(pkg_resources.resource_filename("poktbot", "telegram/layouts/sysadmin.yaml"), "r") as f:
-            self._layout = yaml.safe_load(f)
+        self._layout = get_layout_registry().get("sysadmin")
 
     def allowed(self):
-        config = get_config()
-
-        sysadmins_ids = config.get("IDS.sysadmins_ids", [])
-        sysadmins_ids = sysadmins_ids if type(sysadmins_ids) is list else [sysadmins_ids]
-
-        ids_list = [int(i) for i in sysadmins_ids if i != '']
-        return self._entity.id in ids_list
+        return get_acl_index().contains("IDS.sysadmins_ids", self._entity.id)
 
     async def menu_main(self, menu=None, **kwargs):
         """
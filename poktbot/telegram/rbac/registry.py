@@ -0,0 +1,151 @@
+from threading import Lock
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+from poktbot.utils.telegram import build_layout
+
+import pkg_resources
+import yaml
+
+
+class LayoutRegistry:
+    """
+    Registry of the precompiled role layouts.
+
+    Each layout file (for example, "telegram/layouts/admin.yaml") is read and parsed once, and each of its menus is
+    translated to telegram buttons with `build_layout()` at that time, so that building the roles and displaying menus
+    don't touch the disk.
+
+    Usage example:
+
+        >>> layout = get_layout_registry().get("admin")
+        >>> menu_buttons, menu_actions = layout["menu_main"]
+    """
+    def __init__(self):
+        self._logger = poktbot_logging.get_logger("LayoutRegistry")
+        self._layouts = {}
+        self._lock = Lock()
+
+    def get(self, name):
+        """
+        Retrieves the compiled layout of the given name.
+
+        :param name:
+            Name of the layout (name of its file in "telegram/layouts", without extension).
+
+        :returns:
+            Dictionary with a tuple (buttons, actions) for each menu of the layout (see `build_layout()`).
+        """
+        with self._lock:
+            layout = self._layouts.get(name)
+
+            if layout is None:
+                layout = self._compile(name)
+                self._layouts[name] = layout
+
+        return layout
+
+    def _compile(self, name):
+        with open(pkg_resources.resource_filename("poktbot", f"telegram/layouts/{name}.yaml"), "r") as f:
+            layout_definition = yaml.safe_load(f)
+
+        layout = {menu_name: build_layout(menu_definition) for menu_name, menu_definition in layout_definition.items()}
+        self._logger.debug(f"Compiled layout {name} with menus {list(layout)}")
+
+        return layout
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+
+
+class ACLIndex:
+    """
+    Index of the telegram IDs allowed for each role, kept as frozen sets so that checking a user is O(1).
+
+    The sets are built from the `IDS.*` config params the first time they are needed, and rebuilt only after
+    `invalidate()` is called (every action that mutates those params must call it) or if the config is reloaded.
+
+    Usage example:
+
+        >>> get_acl_index().contains("IDS.admins_ids", entity.id)
+    """
+    def __init__(self):
+        self._logger = poktbot_logging.get_logger("ACLIndex")
+        self._ids = {}
+        self._config = None
+        self._lock = Lock()
+
+    def ids(self, key):
+        """
+        Retrieves the IDs configured in the given config param (for example, "IDS.admins_ids").
+
+        :returns:
+            frozenset of int IDs.
+        """
+        config = get_config()
+
+        with self._lock:
+            # A reloaded config invalidates every set
+            if config is not self._config:
+                self._ids = {}
+                self._config = config
+
+            ids = self._ids.get(key)
+
+            if ids is None:
+                ids = config.get(key, [])
+                ids = ids if type(ids) is list else [ids]
+                ids = frozenset(int(i) for i in ids if i != '' and i is not None)
+
+                self._ids[key] = ids
+                self._logger.debug(f"Indexed {len(ids)} IDs of {key}")
+
+        return ids
+
+    def contains(self, key, entity_id):
+        return entity_id in self.ids(key)
+
+    def invalidate(self):
+        """
+        Drops the indexed sets, so that they are rebuilt from the config the next time they are needed.
+        """
+        with self._lock:
+            self._ids = {}
+
+
+_layout_registry = None
+_acl_index = None
+_registry_lock = Lock()
+
+
+def get_layout_registry():
+    """
+    Global singleton for retrieving the registry of the compiled role layouts.
+
+    :return:
+        The LayoutRegistry object
+    """
+    global _layout_registry
+
+    with _registry_lock:
+        if _layout_registry is None:
+            _layout_registry = LayoutRegistry()
+
+    return _layout_registry
+
+
+def get_acl_index():
+    """
+    Global singleton for retrieving the index of the IDs allowed for each role.
+
+    :return:
+        The ACLIndex object
+    """
+    global _acl_index
+
+    with _registry_lock:
+        if _acl_index is None:
+            _acl_index = ACLIndex()
+
+    return _acl_index
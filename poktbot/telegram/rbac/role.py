@@ -3,7 +3,6 @@ from threading import Lock
 
 from poktbot.log import poktbot_logging
 from poktbot.telegram.exceptions.rbac_error import RBACError
-from poktbot.utils.telegram import build_layout
 
 from telethon import events
 
@@ -79,7 +78,8 @@ class Role:
                 self._logger.warning(f"Building menu {menu_name} for user {self.id}: Failed. Not available")
                 raise RBACError("Menu not available")
 
-            menu_layout, menu_actions = build_layout(layout)
+            # Layouts are compiled once (see `LayoutRegistry`): each menu is already translated into buttons and actions
+            menu_layout, menu_actions = layout
             self._logger.debug(f"Building menu {menu_name} for user {self.id}: Layout is {menu_layout} with actions {menu_actions}")
 
             menu_handler = await self._conv.send_message(message=menu_caption, buttons=menu_layout)
@@ -0,0 +1,169 @@
+from threading import Lock
+
+from poktbot.config import get_config
+from poktbot.log import poktbot_logging
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from timeit import default_timer as timer
+from datetime import timedelta
+import multiprocessing
+import functools
+import asyncio
+
+
+class ActionWorkers:
+    """
+    Worker pools for the heavy actions of the bot, so that they don't block the event loop of the bot (which serves every
+    user conversation).
+
+    Blocking I/O (such as database reads) is run in a thread pool, while CPU-bound work (pandas aggregations, matplotlib
+    rendering, spreadsheet writing) is run in a process pool, as it would hold the GIL otherwise. Functions run in the
+    process pool, their arguments and their results must be picklable.
+
+    The number of concurrent executions of each action is limited independently (see `CONF.action_concurrency`), so
+    that a burst of requests of one action can't take every worker.
+
+    Usage example:
+
+        >>> workers = get_action_workers()
+        >>> rollups = await workers.run("stats", load_rollups, relay_db, nodes_addresses)
+        >>> image_bytes = await workers.run("stats", render_graph, rollups, process=True)
+    """
+    def __init__(self, max_threads=None, max_processes=None, action_concurrency=None):
+        """
+        Constructor of the class.
+
+        :param max_threads:
+            Number of workers of the thread pool. By default, it is loaded from config param CONF.worker_threads.
+
+        :param max_processes:
+            Number of workers of the process pool. By default, it is loaded from config param CONF.worker_processes.
+            0 to run CPU-bound work in the thread pool instead.
+
+        :param action_concurrency:
+            Dictionary with the maximum number of concurrent executions of each action. Actions not listed are only
+            limited by the size of the pools. By default, it is loaded from config param CONF.action_concurrency.
+        """
+        if max_threads is None or max_processes is None or action_concurrency is None:
+            config = get_config()
+
+            max_threads = config.get("CONF.worker_threads", 4) if max_threads is None else max_threads
+            max_processes = config.get("CONF.worker_processes", 2) if max_processes is None else max_processes
+            action_concurrency = config.get("CONF.action_concurrency", None) if action_concurrency is None \
+                else action_concurrency
+
+        self._logger = poktbot_logging.get_logger("ActionWorkers")
+        self._max_threads = int(max_threads)
+        self._max_processes = int(max_processes)
+        self._action_concurrency = dict(action_concurrency or {})
+        self._thread_pool = None
+        self._process_pool = None
+        self._semaphores = {}
+        self._lock = Lock()
+
+    def _get_thread_pool(self):
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self._max_threads,
+                                                       thread_name_prefix="ActionWorker")
+
+        return self._thread_pool
+
+    def _get_process_pool(self):
+        if self._max_processes <= 0:
+            return self._get_thread_pool()
+
+        with self._lock:
+            if self._process_pool is None:
+                # Processes are spawned instead of forked, as the bot process runs several threads (observers,
+                # scheduler, telegram loop) whose locks could be copied while held
+                self._process_pool = ProcessPoolExecutor(max_workers=self._max_processes,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+
+        return self._process_pool
+
+    def _get_semaphore(self, action):
+        """
+        Retrieves the semaphore limiting the concurrent executions of the given action in the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        limit = self._action_concurrency.get(action)
+
+        if limit is None:
+            return None
+
+        with self._lock:
+            semaphore = self._semaphores.get((loop, action))
+
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(int(limit))
+                self._semaphores[(loop, action)] = semaphore
+
+        return semaphore
+
+    async def run(self, action, func, *args, process=False, **kwargs):
+        """
+        Runs the given function in a worker, waiting for a free slot of the action first.
+
+        :param action:
+            Name of the action (for example, "stats"). Used to limit its concurrent executions.
+
+        :param func:
+            Function to run. It must be a module-level function (or a static method) if `process` is set.
+
+        :param process:
+            Boolean flag to run the function in the process pool (CPU-bound work) instead of the thread pool.
+
+        :returns:
+            The result of the function.
+        """
+        semaphore = self._get_semaphore(action)
+        executor = self._get_process_pool() if process else self._get_thread_pool()
+        loop = asyncio.get_running_loop()
+
+        if semaphore is not None:
+            await semaphore.acquire()
+
+        try:
+            start = timer()
+            result = await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+            self._logger.debug(f"Action {action}: {getattr(func, '__qualname__', func)} run in the "
+                               f"{'process' if process else 'thread'} pool ({timedelta(seconds=timer() - start)} s)")
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        return result
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools = [self._thread_pool, self._process_pool]
+            self._thread_pool = None
+            self._process_pool = None
+
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+
+_action_workers = None
+_action_workers_lock = Lock()
+
+
+def get_action_workers():
+    """
+    Global singleton for retrieving the worker pools of the bot actions.
+
+    Pool sizes are loaded from the config parameters `CONF.worker_threads` and `CONF.worker_processes`, and the limits
+    of each action from `CONF.action_concurrency`.
+
+    :return:
+        The ActionWorkers object
+    """
+    global _action_workers
+
+    with _action_workers_lock:
+        if _action_workers is None:
+            _action_workers = ActionWorkers()
+
+    return _action_workers
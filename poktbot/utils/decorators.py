@@ -1,5 +1,7 @@
 from time import sleep
 
+import asyncio
+
 
 def retry(max_attempts=3, attempt_interval=None, on_exception=None, raise_last=True):
     """
@@ -60,3 +62,66 @@ def retry(max_attempts=3, attempt_interval=None, on_exception=None, raise_last=T
         return pre_execution
 
     return decorator
+
+
+def retry_async(max_attempts=3, attempt_interval=None, on_exception=None, raise_last=True):
+    """
+    Decorator for coroutine methods that allows to retry its execution when a given exception is raised.
+
+    Same as `retry()`, but the wait time between attempts doesn't block the event loop.
+
+    :param max_attempts:
+        Number of attempts to try to execute the method before giving up.
+
+    :param attempt_interval:
+        Float number of seconds to wait between attempts. None for no wait time.
+
+    :param on_exception:
+        Exception to capture and use to try. None to capture any exception
+
+    :param raise_last:
+        Flag to determine if should we raise the exception or not in the last attempt if it fails.
+
+    :returns:
+        Result of the decorated method.
+    """
+    if on_exception is None:
+        on_exception = Exception
+
+    def decorator(func):
+
+        async def pre_execution(self, *args, **kwargs):
+
+            attempts = 0
+            success = False
+            result = None
+            last_exception = None
+
+            while attempts < max_attempts and not success:
+                attempts += 1
+
+                try:
+                    result = await func(self, *args, **kwargs)
+                    success = True
+                except on_exception as e:
+                    last_exception = e
+
+                    if hasattr(self, "_logger"):
+                        self._logger.warning(
+                            f"Exception {str(e)} executing {func.__name__}, attempt {attempts}/{max_attempts}")
+
+                    if attempt_interval is not None:
+                        await asyncio.sleep(attempt_interval)
+
+            if not success:
+                if hasattr(self, "_logger"):
+                    self._logger.error(f"Exception {str(last_exception)} executing {func.__name__}. Giving up.")
+
+                if raise_last and last_exception is not None:
+                    raise last_exception
+
+            return result
+
+        return pre_execution
+
+    return decorator
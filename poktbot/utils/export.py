@@ -0,0 +1,230 @@
+import gzip
+import os
+import shutil
+
+import pandas as pd
+import xlsxwriter
+
+
+# Maximum number of rows of an XLSX worksheet (header included)
+XLSX_MAX_ROWS = 1048576
+
+
+def estimate_column_widths(df, sample_size=1000, seed=0):
+    """
+    Estimates the width of each column of the dataframe from the length of the values of a sample of its rows (and the
+    length of the column names).
+
+    :param df:
+        DataFrame to estimate the column widths of.
+
+    :param sample_size:
+        Maximum number of rows sampled.
+
+    :returns:
+        List with the width of each column.
+    """
+    if df.shape[0] > sample_size:
+        df = df.sample(n=sample_size, random_state=seed)
+
+    widths = []
+
+    for column in df.columns:
+        values_length = df[column].astype(str).map(len).max() if df.shape[0] > 0 else 0
+        widths.append(int(max(values_length if not pd.isna(values_length) else 0, len(str(column)))))
+
+    return widths
+
+
+class CSVExporter:
+    """
+    Writes a CSV file incrementally, chunk by chunk, so that only one chunk is kept in memory.
+
+    The index of the chunks is replaced by a running row number (as if the whole dataframe was written at once).
+
+    Usage example:
+
+        >>> with CSVExporter("balances.csv", columns) as exporter:
+        ...     for chunk_df in chunks:
+        ...         exporter.write(chunk_df)
+    """
+    def __init__(self, path, columns, index=True):
+        """
+        Constructor of the class.
+
+        :param path:
+            Path of the CSV file.
+
+        :param columns:
+            Columns of the CSV file, in order.
+
+        :param index:
+            Boolean flag specifying if the row number should be written as the first column.
+        """
+        self._path = path
+        self._columns = list(columns)
+        self._index = index
+        self._rows = 0
+        self._file = open(path, "w", newline="")
+
+        # The header is written even if there are no rows
+        pd.DataFrame(columns=self._columns).to_csv(self._file, index=self._index)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def write(self, df):
+        df = df.set_axis(pd.RangeIndex(self._rows, self._rows + df.shape[0]), axis=0)
+        df[self._columns].to_csv(self._file, header=False, index=self._index)
+        self._rows += df.shape[0]
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class XLSXExporter:
+    """
+    Writes an XLSX file incrementally, chunk by chunk, with xlsxwriter in constant memory mode (each row is flushed to
+    disk once written), so that only one chunk is kept in memory.
+
+    Column widths are estimated from a sample of the first chunk. Rows beyond the limit of a worksheet continue in a new
+    worksheet.
+
+    Usage example:
+
+        >>> with XLSXExporter("balances.xlsx", columns, sheet_name="Balances") as exporter:
+        ...     for chunk_df in chunks:
+        ...         exporter.write(chunk_df)
+    """
+    def __init__(self, path, columns, sheet_name, na_rep="NaN", width_sample_size=1000):
+        """
+        Constructor of the class.
+
+        :param path:
+            Path of the XLSX file.
+
+        :param columns:
+            Columns of the XLSX file, in order.
+
+        :param sheet_name:
+            Name of the worksheet. Following worksheets (if the rows don't fit in one) are suffixed with a number.
+
+        :param na_rep:
+            Representation for NaN values in the excel.
+
+        :param width_sample_size:
+            Maximum number of rows of the first chunk sampled to estimate the column widths.
+        """
+        self._path = path
+        self._columns = list(columns)
+        self._sheet_name = sheet_name
+        self._na_rep = na_rep
+        self._width_sample_size = width_sample_size
+        self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self._header_format = self._workbook.add_format({"bold": True, "border": 1, "align": "center"})
+        self._worksheets = []
+        self._worksheet = None
+        self._worksheet_row = 0
+        self._widths = None
+        self._rows = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def _add_worksheet(self):
+        sheet_name = self._sheet_name if len(self._worksheets) == 0 else \
+            f"{self._sheet_name} ({len(self._worksheets) + 1})"
+        self._worksheet = self._workbook.add_worksheet(sheet_name)
+        self._worksheets.append(self._worksheet)
+
+        if self._widths is not None:
+            for col_idx, width in enumerate(self._widths):
+                self._worksheet.set_column(col_idx, col_idx, width)
+
+        self._worksheet.write_row(0, 0, self._columns, self._header_format)
+        self._worksheet_row = 1
+
+    def write(self, df):
+        df = df[self._columns]
+
+        if self._widths is None:
+            self._widths = estimate_column_widths(df, sample_size=self._width_sample_size)
+
+        # NaN values are written with their representation, as xlsxwriter can't write them
+        values = df.astype(object).where(df.notna(), self._na_rep).values.tolist()
+        position = 0
+
+        while position < len(values):
+            if self._worksheet is None or self._worksheet_row >= XLSX_MAX_ROWS:
+                self._add_worksheet()
+
+            rows_count = min(len(values) - position, XLSX_MAX_ROWS - self._worksheet_row)
+            write_row = self._worksheet.write_row
+
+            for row in values[position:position + rows_count]:
+                write_row(self._worksheet_row, 0, row)
+                self._worksheet_row += 1
+
+            position += rows_count
+
+        self._rows += len(values)
+
+    def close(self):
+        if self._workbook is None:
+            return
+
+        if self._worksheet is None:
+            self._add_worksheet()
+
+        self._workbook.close()
+        self._workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def gzip_file(path, min_size=0):
+    """
+    Compresses the given file with gzip (streaming it, so it is never loaded whole in memory) if it is larger than the
+    given size. The original file is removed.
+
+    :param path:
+        Path of the file to compress.
+
+    :param min_size:
+        Minimum size in bytes of the file to be compressed.
+
+    :returns:
+        Path of the resulting file (the original path if it wasn't compressed).
+    """
+    if os.path.getsize(path) <= min_size:
+        return path
+
+    gzip_path = f"{path}.gz"
+
+    with open(path, "rb") as f_in, gzip.open(gzip_path, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+
+    os.remove(path)
+
+    return gzip_path
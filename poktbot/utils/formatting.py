@@ -1,26 +1,44 @@
 from poktbot.config import get_config
+from poktbot.utils.export import estimate_column_widths
 from bokeh.models import ColumnDataSource, DataTable, TableColumn
 from bokeh.io import export_png
 
+from datetime import datetime
 import tempfile
 import os
+import re
+import numpy as np
 import pandas as pd
 
 
-def format_date(date_object):
+# strftime directives that only depend on the time of the day. Every other directive depends on the day and the UTC
+# offset, so it is formatted once per distinct (day, offset) by `format_dates()`.
+TIME_DIRECTIVES = ["%H", "%I", "%p", "%M", "%S", "%f"]
+DAY_DIRECTIVES = ["%a", "%A", "%w", "%d", "%b", "%B", "%m", "%y", "%Y", "%j", "%U", "%W", "%G", "%u", "%V", "%x",
+                  "%z", "%Z", "%%"]
+
+
+def format_date(date_object, timezone=None, date_format=None):
     """
     Formats the given datetime object into the configuration timezone and date format string.
 
     :param date_object:
         Datetime object UTC located.
 
+    :param timezone:
+        Timezone to locate the datetime into. By default, it is loaded from config param CONF.timezone.
+
+    :param date_format:
+        Format of the date string. By default, it is loaded from config param CONF.date_format.
+
     :returns:
         String date time with the configuration timezone and date formats.
     """
-    config = get_config()
+    if timezone is None or date_format is None:
+        config = get_config()
 
-    timezone = config['CONF.timezone']
-    date_format = config['CONF.date_format']
+        timezone = config['CONF.timezone'] if timezone is None else timezone
+        date_format = config['CONF.date_format'] if date_format is None else date_format
 
     if date_object is not None:
         if hasattr(date_object, "dt"):
@@ -36,6 +54,126 @@ def format_date(date_object):
     return date_object
 
 
+def format_dates(times, timezone=None, date_format=None):
+    """
+    Vectorized version of `format_date()` for a whole series of datetimes.
+
+    The date directives of the format are formatted once per distinct local day (and UTC offset), and the time
+    directives are picked from lookup tables, so the cost doesn't grow with a `strftime()` call per element. Formats
+    with directives not supported by this approach fall back to a `strftime()` per element.
+
+    :param times:
+        pd.Series (or array-like) of UTC located datetimes.
+
+    :param timezone:
+        Timezone to locate the datetimes into. By default, it is loaded from config param CONF.timezone.
+
+    :param date_format:
+        Format of the date strings. By default, it is loaded from config param CONF.date_format.
+
+    :returns:
+        np.ndarray of objects with the formatted strings (None for missing datetimes).
+    """
+    if timezone is None or date_format is None:
+        config = get_config()
+
+        timezone = config['CONF.timezone'] if timezone is None else timezone
+        date_format = config['CONF.date_format'] if date_format is None else date_format
+
+    utc_times = pd.DatetimeIndex(times)
+    local_times = utc_times.tz_convert(timezone)
+    result = np.full(len(local_times), None, dtype=object)
+    valid = ~local_times.isna()
+
+    if not valid.any():
+        return result
+
+    local_times = local_times[valid]
+    tokens = re.split(r"(%.)", date_format)
+
+    if any(token.startswith("%") and token not in TIME_DIRECTIVES + DAY_DIRECTIVES for token in tokens):
+        result[valid] = np.asarray(local_times.strftime(date_format), dtype=object)
+        return result
+
+    # Every datetime of the same local day and UTC offset shares the date directives
+    local_naive = local_times.tz_localize(None)
+    days = np.asarray((local_naive.normalize() - pd.Timestamp(0)) // pd.Timedelta(days=1), dtype="int64")
+    offsets = np.asarray((local_naive - utc_times[valid].tz_convert(None)) // pd.Timedelta(minutes=1), dtype="int64")
+    day_codes, _ = pd.factorize(days * (4 * 1440) + offsets + 2 * 1440)
+    _, first_positions = np.unique(day_codes, return_index=True)
+    day_representatives = local_times[first_positions]
+
+    formatted = None
+
+    # Consecutive date tokens are grouped into chunks, formatted once per day
+    chunks = []
+    for token in tokens:
+        if token in TIME_DIRECTIVES or len(chunks) == 0 or chunks[-1] in TIME_DIRECTIVES:
+            chunks.append(token)
+        else:
+            chunks[-1] += token
+
+    for chunk in chunks:
+        if chunk == "":
+            continue
+
+        if chunk in TIME_DIRECTIVES:
+            values = _format_time_directive(chunk, local_naive)
+        else:
+            values = np.asarray(day_representatives.strftime(chunk), dtype=object)[day_codes]
+
+        formatted = values if formatted is None else formatted + values
+
+    result[valid] = formatted if formatted is not None else ""
+    return result
+
+
+def format_decimals(values, decimal_separator=None):
+    """
+    Formats the given numbers as strings (with the shortest representation that round trips, as `str()` does) with
+    the given decimal separator. Each distinct value is formatted only once.
+
+    :param values:
+        pd.Series (or array-like) of numbers.
+
+    :param decimal_separator:
+        Decimal separator of the strings. By default, it is loaded from config param CONF.decimal_separator.
+
+    :returns:
+        np.ndarray of objects with the formatted strings.
+    """
+    if decimal_separator is None:
+        decimal_separator = get_config().get("CONF.decimal_separator", ",")
+
+    # Missing values get the code -1, which picks the last element
+    codes, uniques = pd.factorize(np.asarray(values))
+    formatted = np.asarray([str(value).replace(".", decimal_separator) for value in np.asarray(uniques).tolist()] +
+                           [str(np.nan)], dtype=object)
+
+    return formatted[codes]
+
+
+def _format_time_directive(directive, times):
+    """
+    Formats a time directive (see `TIME_DIRECTIVES`) of the given naive datetimes, picking the strings from a lookup
+    table of every possible value.
+    """
+    if directive == "%f":
+        return np.asarray([f"{microsecond:06d}" for microsecond in times.microsecond.values], dtype=object)
+
+    if directive in ["%H", "%I", "%p"]:
+        table = [datetime(2000, 1, 1, hour).strftime(directive) for hour in range(24)]
+        values = times.hour.values
+    elif directive == "%M":
+        table = [datetime(2000, 1, 1, 0, minute).strftime(directive) for minute in range(60)]
+        values = times.minute.values
+    else:
+        table = [datetime(2000, 1, 1, 0, 0, second).strftime(directive) for second in range(60)]
+        values = times.second.values
+
+    return np.asarray(table, dtype=object)[values]
+
+
 # TODO: I encourage changing this export method to not rely on a web browser, which is a cumbersome solution.\
 #  The matplotlib solution would be faster.
 def df_to_png_bytes(df):
@@ -61,7 +199,7 @@ def df_to_xlsx(df, output_file, sheet_name, index=False, na_rep="NaN"):
     """
     Writes the dataframe into the specified output.
 
-    This function respects the width of each column based on the max length of the contained values.
+    This function respects the width of each column based on the max length of the values of a sample of rows.
 
     :param df:
         DataFrame to store.
@@ -78,12 +216,11 @@ def df_to_xlsx(df, output_file, sheet_name, index=False, na_rep="NaN"):
     :param na_rep:
         Representation for NaN values in the excel.
     """
-    writer = pd.ExcelWriter(output_file)
+    writer = pd.ExcelWriter(output_file, engine="xlsxwriter")
     df.to_excel(writer, sheet_name=sheet_name, index=index, na_rep=na_rep)
 
-    for column in df:
-        column_length = max(df[column].astype(str).map(len).max(), len(column))
-        col_idx = df.columns.get_loc(column)
+    # Widths are estimated from a sample of the rows, as measuring every cell is as expensive as writing them
+    for col_idx, column_length in enumerate(estimate_column_widths(df)):
         writer.sheets[sheet_name].set_column(col_idx, col_idx, column_length)
 
-    writer.save()
+    writer.close()
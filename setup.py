@@ -33,6 +33,7 @@ setup(
         "openpyxl==3.0.9",
         "plotly==5.6.0",
         "requests==2.27.1",
+        "aiohttp==3.8.1",
         "matplotlib==3.5.1",
         "selenium==4.1.0"
     ],
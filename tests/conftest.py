@@ -0,0 +1,48 @@
+import binascii
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from poktbot.config import get_config
+
+
+@pytest.fixture
+def storage_config(tmp_path, monkeypatch):
+    """
+    Builds the config for the storages of the tests, with the given `SERVER` params. Files are written into a temporary
+    folder, which is also the working directory of the test.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def build(**server):
+        server = {"database_secret": f"{tmp_path}/db/", "log_file_location": f"{tmp_path}/poktbot.log", **server}
+        config_filename = tmp_path / "config.yaml"
+        config_filename.write_text("TELEGRAM_API: {api_id: 0, api_hash: '', bot_token: ''}\n"
+                                   f"SERVER: {{{', '.join(f'{key}: {value}' for key, value in server.items())}}}\n")
+
+        return get_config(str(config_filename))
+
+    return build
+
+
+def build_transactions(wallet, rows, first_height=1, seed=0):
+    """
+    Builds transactions of a node as they are stored by `CallbackStoreTransactions` (before being encoded).
+    """
+    rng = np.random.default_rng(seed)
+    amount = rng.integers(1, 20000, rows) * 0.0001
+
+    return pd.DataFrame({
+        "wallet": np.full(rows, wallet, dtype=object),
+        "hash": np.frombuffer(binascii.hexlify(rng.bytes(32 * rows)).upper(), dtype="S64").astype(str).astype(object),
+        "type": np.full(rows, "claim", dtype=object),
+        "chain_id": np.array(["0021", "0009", "0040"], dtype=object)[rng.integers(0, 3, rows)],
+        "height": np.arange(first_height, first_height + rows, dtype="int64"),
+        "time": pd.date_range("2022-01-01", periods=rows, freq="h", tz="UTC") + pd.Timedelta(hours=first_height),
+        "amount": amount,
+        "memo": np.full(rows, "", dtype=object),
+        "in_staking": np.ones(rows, dtype="int64"),
+        "price_eur": np.full(rows, 0.5),
+        "amount_price_eur": amount * 0.5,
+    })
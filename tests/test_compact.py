@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import build_transactions
+from poktbot.storage.compact import HASH_BYTES, concat_tables, decode_transactions, encode_transactions
+
+
+WALLET = f"{0:040x}"
+
+
+def assert_decoded_equal(decoded_df, transactions_df):
+    """
+    Checks that the decoded transactions have the values of the original ones (categoricals and narrow dtypes are kept
+    by the decoding, so they are compared as their original dtypes).
+    """
+    decoded_df = decoded_df.astype(transactions_df.dtypes.to_dict())
+    pd.testing.assert_frame_equal(decoded_df.reset_index(drop=True), transactions_df.reset_index(drop=True))
+
+
+def test_encoding_round_trip():
+    transactions_df = build_transactions(WALLET, 50)
+    encoded_df = encode_transactions(transactions_df)
+
+    assert "wallet" not in encoded_df
+    assert all(isinstance(tx_hash, bytes) and len(tx_hash) == HASH_BYTES for tx_hash in encoded_df["hash"])
+    assert encoded_df["height"].dtype == np.int32
+
+    assert_decoded_equal(decode_transactions(encoded_df, WALLET), transactions_df)
+
+    # Encoded transactions are not encoded again
+    assert encode_transactions(encoded_df) is encoded_df
+
+
+@pytest.mark.parametrize("alter_hashes", [
+    lambda hashes: hashes.str.lower(),
+    lambda hashes: hashes.str[:60],
+    lambda hashes: hashes.str.replace("A", "G"),
+    lambda hashes: hashes.where(np.arange(hashes.shape[0]) % 2 == 0, "not a hash"),
+], ids=["lowercase", "short", "not hex", "mixed"])
+def test_encoding_round_trip_of_non_hex_hashes(alter_hashes):
+    transactions_df = build_transactions(WALLET, 50)
+    transactions_df["hash"] = alter_hashes(transactions_df["hash"])
+
+    # Hashes that can't be encoded back as they were are kept as strings
+    encoded_df = encode_transactions(transactions_df)
+    assert all(isinstance(tx_hash, str) for tx_hash in encoded_df["hash"])
+
+    assert_decoded_equal(decode_transactions(encoded_df, WALLET), transactions_df)
+
+
+def test_encoding_round_trip_of_concatenated_chunks():
+    transactions_df = build_transactions(WALLET, 60)
+    transactions_df.loc[40:, "type"] = "stake_validator"
+    transactions_df.loc[50:, "hash"] = transactions_df.loc[50:, "hash"].str.lower()
+
+    # Chunks with different categories, and with encoded and non-encoded hashes
+    chunks = [encode_transactions(transactions_df.iloc[start:start + 20]) for start in range(0, 60, 20)]
+    concatenated_df = concat_tables(chunks)
+
+    assert isinstance(concatenated_df["type"].dtype, pd.CategoricalDtype)
+    assert_decoded_equal(decode_transactions(concatenated_df, WALLET), transactions_df)
@@ -0,0 +1,34 @@
+import asyncio
+
+from collections import deque
+
+from telethon.errors import FloodWaitError
+
+from poktbot.telegram.dispatcher import MessageDispatcher
+
+
+def test_flood_waits_delay_every_chat_and_the_last_attempt_is_not_waited(storage_config):
+    storage_config()
+    attempts = []
+
+    async def send_func(entity, message):
+        attempts.append((entity, message))
+        raise FloodWaitError(request=None, capture=1)
+
+    async def dispatch():
+        loop = asyncio.get_running_loop()
+        dispatcher = MessageDispatcher(send_func, global_rate=None, chat_rate=None, flood_retries=1)
+        dispatcher._pending["chat"] = deque(["Hello"])
+        dispatcher._senders["chat"] = None
+
+        start = loop.time()
+        await dispatcher._chat_sender("chat")
+
+        return loop.time() - start, dispatcher._global_limiter.idle(loop.time())
+
+    elapsed, global_idle = asyncio.run(dispatch())
+
+    # The message is retried once after the requested wait, and dropped right away after the last attempt
+    assert attempts == [("chat", "Hello")] * 2
+    assert 1 <= elapsed < 1.5
+    assert not global_idle
@@ -0,0 +1,61 @@
+import gc
+
+import pandas as pd
+
+from poktbot.storage.lazy_record import LazyRecord, LazyValue, LRUMemoryBudget
+
+
+def build_record(memory_budget, name, rows=1000):
+    record = LazyRecord(memory_budget=memory_budget, name=name)
+    dict.__setitem__(record, "transactions", LazyValue(lambda: pd.DataFrame({"amount": range(rows)})))
+    return record
+
+
+def test_copies_of_a_record_share_its_tracked_values():
+    memory_budget = LRUMemoryBudget()
+    record = build_record(memory_budget, "node")
+    record["transactions"]
+    tracked_bytes = memory_budget.bytes
+
+    # A copy replacing the record (as bulk operations do) doesn't count its values twice, and they are still stored
+    record_copy = record.copy()
+    record_copy["transactions"]
+
+    assert memory_budget.bytes == tracked_bytes
+    assert memory_budget.is_tracked(record_copy, "transactions")
+
+    # Assigned values are not stored yet
+    record_copy["transactions"] = pd.DataFrame({"amount": [1]})
+    assert not memory_budget.is_tracked(record_copy, "transactions")
+    assert memory_budget.bytes == 0
+
+
+def test_values_are_evicted_from_the_live_record():
+    memory_budget = LRUMemoryBudget(max_bytes=10000)
+    record = build_record(memory_budget, "node")
+    record["transactions"]
+
+    record_copy = record.copy()
+    record_copy["transactions"]
+    del record
+    gc.collect()
+
+    # Loading the values of another record exceeds the budget: the least recently used values are evicted
+    other_record = build_record(memory_budget, "other_node")
+    other_record["transactions"]
+
+    assert not record_copy.is_loaded("transactions")
+    assert other_record.is_loaded("transactions")
+    assert record_copy["transactions"].shape[0] == 1000
+
+
+def test_records_no_longer_referenced_are_released():
+    memory_budget = LRUMemoryBudget()
+    record = build_record(memory_budget, "node")
+    record["transactions"]
+    del record
+    gc.collect()
+
+    build_record(memory_budget, "other_node")["transactions"]
+
+    assert memory_budget.bytes == LRUMemoryBudget._sizeof(pd.DataFrame({"amount": range(1000)}))
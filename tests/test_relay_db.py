@@ -0,0 +1,40 @@
+import pandas as pd
+
+from conftest import build_transactions
+from poktbot.storage import relay_db as relay_db_module
+from poktbot.storage.chunked import ChunkedTable
+from poktbot.storage.compact import decode_transactions, encode_transactions
+from poktbot.storage.relay_db import RelayDB
+
+
+WALLET = f"{0:040x}"
+
+
+def test_time_indexes_are_carried_forward_across_appends(monkeypatch):
+    relay_db = RelayDB()
+    indexed_rows = []
+    time_index_class = relay_db_module.TimeIndex
+    monkeypatch.setattr(relay_db_module, "TimeIndex", lambda times: indexed_rows.append(len(times)) or
+                        time_index_class(times))
+
+    transactions_df = build_transactions(WALLET, 300)
+    start, end = transactions_df["time"].iloc[50], transactions_df["time"].iloc[250]
+    table = ChunkedTable([encode_transactions(transactions_df.iloc[:200])])
+
+    for offset in range(200, 300, 20):
+        table = table.append(encode_transactions(transactions_df.iloc[offset:offset + 20]))
+        dict.__setitem__(relay_db, WALLET, {"transactions": table})
+
+        queried_df = relay_db.query_transactions(start=start, end=end)
+        iterated_df = pd.concat(relay_db.iter_transactions(start=start, end=end, chunk_size=64))
+        expected_df = transactions_df.iloc[50:min(250, offset + 20)]
+
+        assert queried_df["hash"].tolist() == iterated_df["hash"].tolist() == expected_df["hash"].tolist()
+
+    # Only the appended chunks are indexed, and the history is never consolidated
+    assert indexed_rows == [200] + [20] * 5
+    assert table._frame is None
+
+    # Queries without a range return the whole history
+    decoded_df = decode_transactions(table.frame, WALLET)
+    assert relay_db.query_transactions()["hash"].tolist() == decoded_df["hash"].tolist()
@@ -0,0 +1,222 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import build_transactions
+from poktbot.storage.chunked import ChunkedTable, to_frame
+from poktbot.storage.compact import encode_transactions
+from poktbot.storage.local.joblib.relay_db_jl import RelayDBjl
+from poktbot.storage.local.segmented.relay_db_seg import RelayDBSegmented
+from poktbot.storage.local.sqlite.relay_db_sqlite import RelayDBsqlite
+
+
+WALLETS = [f"{i:040x}" for i in range(2)]
+
+
+def store_nodes(relay_db, first_height=1, rows=20):
+    """
+    Stores transactions for every node as `CallbackStoreTransactions` does, returning the stored transactions.
+    """
+    stored = {}
+
+    with relay_db.bulk_op() as db:
+        for wallet in WALLETS:
+            record = db.get(wallet) or {}
+            table = ChunkedTable.wrap(record.get("transactions"))
+            new_df = encode_transactions(build_transactions(wallet, rows, first_height, seed=first_height))
+            record["transactions"] = table.append(new_df) if table is not None else ChunkedTable([new_df])
+            record["last_height"] = first_height + rows - 1
+            db[wallet] = record
+            stored[wallet] = to_frame(record["transactions"])
+
+    return stored
+
+
+def assert_same_content(relay_db, stored):
+    for wallet, transactions_df in stored.items():
+        loaded_df = to_frame(relay_db[wallet]["transactions"])
+        pd.testing.assert_frame_equal(loaded_df.reset_index(drop=True), transactions_df.reset_index(drop=True))
+        assert relay_db[wallet]["last_height"] == transactions_df["height"].max()
+
+    queried_df = relay_db.query_transactions()
+    assert queried_df.shape[0] == sum(transactions_df.shape[0] for transactions_df in stored.values())
+    assert set(queried_df["wallet"]) == set(stored)
+
+
+def test_segmented_compaction_merges_by_size_tiers_out_of_the_lock(storage_config, monkeypatch):
+    storage_config(database_max_segments=4)
+    filename = "db/transactions.db"
+
+    segmented_db = RelayDBSegmented(filename)
+    segmented_db.flush()
+    monkeypatch.setattr(segmented_db, "compact", lambda background=False: None)
+
+    stored = store_nodes(segmented_db, rows=2000)
+
+    for first_height in range(2001, 2021, 2):
+        stored = store_nodes(segmented_db, first_height=first_height, rows=2)
+
+    path = (WALLETS[0], "transactions")
+    first_segment = segmented_db._tables[path]["segments"][0]
+
+    merges = []
+    merge_segments = RelayDBSegmented._merge_segments
+    monkeypatch.setattr(RelayDBSegmented, "_merge_segments", lambda self, segment_names: merges.append(
+        self._lock.locked()) or merge_segments(self, segment_names))
+    RelayDBSegmented.compact(segmented_db)
+
+    # Segments are merged out of the lock, and the biggest segment is not merged again
+    assert len(merges) > 0 and not any(merges)
+    assert len(segmented_db._tables[path]["segments"]) <= 4
+    assert segmented_db._tables[path]["segments"][0] == first_segment
+
+    assert_same_content(RelayDBSegmented(filename), stored)
+
+
+@pytest.mark.parametrize("wal", [False, True])
+def test_joblib_database_is_imported_by_segmented(storage_config, wal):
+    storage_config(database_wal=str(wal).lower(), database_wal_max_mutations=1000,
+                   database_wal_flush_interval=100000)
+    filename = "db/transactions.db"
+
+    joblib_db = RelayDBjl(filename)
+    joblib_db.flush()
+    joblib_db.dump()
+    store_nodes(joblib_db)
+
+    # In WAL mode, the second cycle is only in the WAL
+    stored = store_nodes(joblib_db, first_height=21)
+
+    segmented_db = RelayDBSegmented(filename)
+
+    for wallet in WALLETS:
+        assert isinstance(segmented_db[wallet]["transactions"], (pd.DataFrame, ChunkedTable))
+
+    assert_same_content(segmented_db, stored)
+
+    # Once segmented, it is loaded from its own segments
+    segmented_db.dump()
+    assert_same_content(RelayDBSegmented(filename), stored)
+
+
+def test_joblib_doesnt_rewrite_tables_of_replaced_records(storage_config, monkeypatch):
+    storage_config(database_wal="false")
+    filename = "db/transactions.db"
+
+    joblib_db = RelayDBjl(filename)
+    joblib_db.flush()
+    store_nodes(joblib_db)
+    joblib_db = RelayDBjl(filename)
+
+    written_tables = []
+    write_snapshot = RelayDBjl._write_snapshot
+    monkeypatch.setattr(RelayDBjl, "_write_snapshot", lambda self, *args: written_tables.extend(
+        write_snapshot(self, *args)) or written_tables)
+
+    # The tables loaded by the record are shared by the copy that replaces it, which doesn't modify them
+    joblib_db[WALLETS[0]]["transactions"]
+
+    with joblib_db.bulk_op() as db:
+        record = db[WALLETS[0]].copy()
+        record["transactions"]
+        record["last_height"] += 1
+        db[WALLETS[0]] = record
+
+    assert written_tables == []
+    assert joblib_db._memory_budget.is_tracked(dict.get(joblib_db, WALLETS[0]), "transactions")
+
+
+@pytest.mark.parametrize("memory_budget, loads", [(512, 0), (0, 2 * len(WALLETS))])
+def test_sqlite_keeps_stored_transactions_under_the_memory_budget(storage_config, monkeypatch, memory_budget, loads):
+    storage_config(database_memory_budget=memory_budget)
+
+    sqlite_db = RelayDBsqlite("db/transactions.db")
+    sqlite_db.flush()
+
+    loaded_wallets = []
+    load_node_transactions = RelayDBsqlite._load_node_transactions
+    monkeypatch.setattr(RelayDBsqlite, "_load_node_transactions", lambda self, wallet: loaded_wallets.append(
+        wallet) or load_node_transactions(self, wallet))
+
+    for first_height in [1, 21, 41]:
+        stored = store_nodes(sqlite_db, first_height=first_height)
+
+    # Stored transactions are only loaded again from SQLite if they were released
+    assert len(loaded_wallets) == loads
+    assert_same_content(sqlite_db, stored)
+
+
+@pytest.mark.parametrize("relay_db_class, store_method", [(RelayDBsqlite, "_store_key"),
+                                                          (RelayDBSegmented, "_store_table")])
+def test_commit_stores_only_the_committed_keys(storage_config, monkeypatch, relay_db_class, store_method):
+    storage_config()
+    filename = "db/transactions.db"
+
+    relay_db = relay_db_class(filename)
+    relay_db.flush()
+    relay_db.dump()
+    stored = store_nodes(relay_db)
+
+    stores = []
+    store = getattr(relay_db_class, store_method)
+    monkeypatch.setattr(relay_db_class, store_method, lambda self, *args: stores.append(args) or store(self, *args))
+
+    with relay_db.bulk_op() as db:
+        record = db[WALLETS[0]]
+        new_df = encode_transactions(build_transactions(WALLETS[0], 5, first_height=21, seed=21))
+        record["transactions"] = record["transactions"].append(new_df)
+        record["last_height"] = 25
+        db[WALLETS[0]] = record
+        stored[WALLETS[0]] = to_frame(record["transactions"])
+
+    # Only the committed key is stored
+    assert len(stores) == 1
+
+    # Keys removed since they were stored are removed on the next commit
+    del relay_db[WALLETS[1]]
+    del stored[WALLETS[1]]
+    relay_db["last_update"] = 1
+
+    loaded_db = relay_db_class(filename)
+    assert set(loaded_db.keys()) == set(relay_db.keys())
+    assert loaded_db["last_update"] == 1
+    assert_same_content(loaded_db, stored)
+
+
+@pytest.mark.parametrize("relay_db_class, wal", [(RelayDBjl, False), (RelayDBjl, True), (RelayDBsqlite, False),
+                                                 (RelayDBSegmented, False)],
+                         ids=["joblib", "joblib-wal", "sqlite", "segmented"])
+def test_dump_load_round_trip(storage_config, relay_db_class, wal):
+    storage_config(database_wal=str(wal).lower(), database_wal_max_mutations=1000,
+                   database_wal_flush_interval=100000)
+    filename = "db/transactions.db"
+
+    relay_db = relay_db_class(filename)
+    relay_db.flush()
+    store_nodes(relay_db)
+    relay_db.dump()
+
+    # In WAL mode, the second cycle and the node with hashes that can't be encoded are only in the WAL
+    stored = store_nodes(relay_db, first_height=21)
+
+    non_hex_wallet = f"{len(WALLETS):040x}"
+    non_hex_df = build_transactions(non_hex_wallet, 10)
+    non_hex_df["hash"] = non_hex_df["hash"].str.lower()
+
+    with relay_db.bulk_op() as db:
+        db[non_hex_wallet] = {"transactions": ChunkedTable([encode_transactions(non_hex_df)]), "last_height": 10}
+        db["last_update"] = pd.Timestamp("2022-01-01", tz="UTC")
+
+    stored[non_hex_wallet] = to_frame(relay_db[non_hex_wallet]["transactions"])
+
+    if wal:
+        assert os.path.getsize(f"{filename}.wal") > 0
+
+    loaded_db = relay_db_class(filename)
+
+    assert set(loaded_db.keys()) == set(relay_db.keys())
+    assert loaded_db["last_update"] == relay_db["last_update"]
+    assert_same_content(loaded_db, stored)
+    pd.testing.assert_frame_equal(loaded_db.query_transactions(), relay_db.query_transactions())
+    assert loaded_db.query_transactions(wallets=[non_hex_wallet])["hash"].tolist() == non_hex_df["hash"].tolist()